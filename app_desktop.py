@@ -1,25 +1,59 @@
 # app_desktop.py
 import os
+import contextlib
 import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional, Set, Tuple
 from tkinter import ttk, filedialog, messagebox
 import pandas as pd
 
-from data_loader import pick_split_year, parse_year_like
-from graph_builder import build_graph_and_journals
-from recommender import pick_target, recommend
-
-DEFAULT_AUTHORS_COL = "authors"
-DEFAULT_YEAR_COL = "mdate"
-DEFAULT_VENUE_COL = "journal"
-DEFAULT_MAX_TRAIN_ROWS = 200_000
+from data_loader import DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, DEFAULT_MAX_TRAIN_ROWS
+from graph_cache import GraphCache, cached_ingest, csv_identity
+from temporal import cached_year_layers
+from bipartite import BipartiteGraph, MEGA_PAPER_POLICIES, DEFAULT_MAX_TEAM
+from recommender import pick_target, FeatureCache, DEFAULT_WEIGHTS, DEFAULT_PATH_WEIGHTS
+from name_index import MIN_SUGGEST_BYTES, name_index_for
+from service import RecommendClient
+from instrument import RunRecorder, format_record, stage
+from progress import ProgressReporter, Progress, Finished, Cancelled, checkpoint, format_progress
+from graph_builder import ReadState
+
+POLL_MS = 100  # how often the Tk thread drains the worker's progress queue
+LOOKUP_POLL_MS = 20  # how often the Tk thread checks for a finished type-ahead / re-ranking lookup
+SUGGEST_DELAY_MS = 150  # type-ahead waits for a pause in typing
+
+class RunParams(NamedTuple):
+    """Every input of one run, read on the Tk thread before the worker starts."""
+    service_url: str
+    csv_path: str
+    split_year: Optional[int]
+    train_frac: float
+    max_rows: Optional[int]
+    max_team: Optional[int]
+    mega_policy: str
+    incidence: bool
+    use_cache: bool
+    from_year: Optional[int]
+    half_life: Optional[float]
+    target: str
+    topk: int
+    include_neighbors: bool
+    weights: Tuple[float, float, float]       # JJ, AA, CN
+    path_weights: Tuple[float, float, float]  # RA, Katz, PPR
+    journals: Optional[Set[str]]
+    mode: str
+    profile: bool
+    profile_memory: bool
+    profile_log: Optional[str]
 
 class WeightControl(ttk.Frame):
     """
-    Three scales JJ/AA/CN that always sum to 1.0. When one moves, we renormalize all.
+    Three scales JJ/AA/CN that always sum to 1.0. When one moves, we renormalize all and call on_change.
     """
-    def __init__(self, master, initial=(0.5, 0.3, 0.2)):
+    def __init__(self, master, initial=DEFAULT_WEIGHTS, on_change=None):
         super().__init__(master)
+        self.on_change = on_change
         self.var_jj = tk.DoubleVar(value=initial[0])
         self.var_aa = tk.DoubleVar(value=initial[1])
         self.var_cn = tk.DoubleVar(value=initial[2])
@@ -66,14 +100,17 @@ class WeightControl(ttk.Frame):
     def _on_change_jj(self, _=None):
         if self._building: return
         self._normalize_all()
+        if self.on_change: self.on_change()
 
     def _on_change_aa(self, _=None):
         if self._building: return
         self._normalize_all()
+        if self.on_change: self.on_change()
 
     def _on_change_cn(self, _=None):
         if self._building: return
         self._normalize_all()
+        if self.on_change: self.on_change()
 
     def get_weights(self):
         return (self.var_jj.get(), self.var_aa.get(), self.var_cn.get())
@@ -83,6 +120,19 @@ class App(tk.Tk):
         super().__init__()
         self.title("Author Collaborator Finder (Desktop)")
         self.geometry("1100x700")
+        self._cache = GraphCache()
+        self._name_index = None  # type-ahead over the last built graph
+        self._client = None      # RecommendClient when a query service URL is set
+        self._features = None    # FeatureCache of the last built graph, for re-ranking without recomputing
+        self._last_query = None  # (target, include_neighbors, candidate_mode) of the results on screen
+        self._rerank_job = None
+        self._layers = None      # (csv identity, YearLayers) of the last uncapped build: other split years need no reread
+        self._partial = None     # (read key, ReadState) left by a cancelled build, continued by the next run over the same file
+        self._reporter = None    # ProgressReporter of the running build (progress queue + cancel token)
+        self._suggest_job = None
+        # type-ahead and re-ranking run off the Tk thread, one lookup of each kind at a time; only the latest result is shown
+        self._lookups = {kind: ThreadPoolExecutor(max_workers=1) for kind in ("suggest", "rerank")}
+        self._lookup_seq = {kind: 0 for kind in self._lookups}
         self._build_ui()
 
     def _build_ui(self):
@@ -101,7 +151,15 @@ class App(tk.Tk):
         # Target author
         ttk.Label(frm_top, text="Target author:").grid(row=1, column=0, sticky="w")
         self.var_author = tk.StringVar(value="Ernesto Damiani")
-        ttk.Entry(frm_top, textvariable=self.var_author, width=40).grid(row=1, column=1, sticky="w", padx=4)
+        self.cmb_author = ttk.Combobox(frm_top, textvariable=self.var_author, width=40)
+        self.cmb_author.grid(row=1, column=1, sticky="w", padx=4)
+        self.cmb_author.bind("<KeyRelease>", self._on_author_typed)
+
+        # Training row cap (the CSR graph makes the full dataset affordable); its own frame in column 2, next to the author box
+        frm_rows = ttk.Frame(frm_top); frm_rows.grid(row=1, column=2, sticky="w", padx=4)
+        ttk.Label(frm_rows, text="Max training rows (blank = all):").pack(side="left")
+        self.var_max_rows = tk.StringVar(value=str(DEFAULT_MAX_TRAIN_ROWS))
+        ttk.Entry(frm_rows, textvariable=self.var_max_rows, width=12).pack(side="left", padx=4)
 
         # Split year and train frac
         ttk.Label(frm_top, text="Split year (optional):").grid(row=2, column=0, sticky="w")
@@ -127,12 +185,15 @@ class App(tk.Tk):
 
         # Weights
         ttk.Label(frm_top, text="Weights (sum=1)").grid(row=5, column=0, sticky="w")
-        self.wctrl = WeightControl(frm_top)
+        self.wctrl = WeightControl(frm_top, on_change=self._on_weights_changed)
         self.wctrl.grid(row=5, column=1, columnspan=2, sticky="ew")
 
         # Run button
-        self.btn_run = ttk.Button(frm_top, text="Run recommendation", command=self._on_run_clicked)
-        self.btn_run.grid(row=6, column=0, pady=6, sticky="w")
+        frm_run = ttk.Frame(frm_top); frm_run.grid(row=6, column=0, pady=6, sticky="w")
+        self.btn_run = ttk.Button(frm_run, text="Run recommendation", command=self._on_run_clicked)
+        self.btn_run.pack(side="left")
+        self.btn_cancel = ttk.Button(frm_run, text="Cancel", state="disabled", command=self._on_cancel_clicked)
+        self.btn_cancel.pack(side="left", padx=4)
 
         # Save CSV button (disabled initially)
         self.btn_save = ttk.Button(frm_top, text="Save results as CSV", state="disabled", command=self._save_csv)
@@ -142,16 +203,70 @@ class App(tk.Tk):
         self.var_status = tk.StringVar(value="Ready.")
         ttk.Label(frm_top, textvariable=self.var_status).grid(row=6, column=2, sticky="e")
 
+        # Graph snapshot cache
+        self.var_use_cache = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frm_top, text="Reuse cached graph snapshot", variable=self.var_use_cache).grid(row=7, column=0, sticky="w")
+        ttk.Button(frm_top, text="Clear graph cache", command=self._clear_cache).grid(row=7, column=1, sticky="w")
+
+        # Candidate generation: 2-hop neighborhood, or everyone sharing a journal with the target
+        self.var_journal_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm_top, text="Same-journal authors beyond 2 hops", variable=self.var_journal_mode).grid(row=7, column=2, sticky="w")
+
+        # Graph storage: co-author pairs, or the author–paper incidence (linear in authorships) with a mega-paper policy
+        self.var_incidence = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm_top, text="Store author–paper incidence", variable=self.var_incidence).grid(row=8, column=0, sticky="w")
+        ttk.Label(frm_top, text="Papers with more authors than:").grid(row=8, column=1, sticky="w")
+        self.var_max_team = tk.StringVar(value=str(DEFAULT_MAX_TEAM))
+        ttk.Entry(frm_top, textvariable=self.var_max_team, width=6).grid(row=8, column=1, sticky="e", padx=4)
+        self.var_mega_policy = tk.StringVar(value="keep")
+        ttk.Combobox(frm_top, textvariable=self.var_mega_policy, values=MEGA_PAPER_POLICIES, state="readonly", width=12).grid(row=8, column=2, sticky="w")
+
+        # Optional warm-graph query service (python service.py serve ...); the local build options are then ignored
+        ttk.Label(frm_top, text="Query service URL (optional):").grid(row=9, column=0, sticky="w")
+        self.var_service = tk.StringVar(value="")
+        ttk.Entry(frm_top, textvariable=self.var_service, width=40).grid(row=9, column=1, sticky="w", padx=4)
+
+        # Per-stage timings (shown under Summary; optionally appended to a JSONL log)
+        self.var_profile = tk.BooleanVar(value=False)
+        self.var_profile_memory = tk.BooleanVar(value=False)
+        self.var_profile_log = tk.StringVar(value="")
+        ttk.Checkbutton(frm_top, text="Record stage timings", variable=self.var_profile).grid(row=10, column=0, sticky="w")
+        ttk.Checkbutton(frm_top, text="Trace memory (slower)", variable=self.var_profile_memory).grid(row=10, column=1, sticky="w")
+        ttk.Label(frm_top, text="Timing log (.jsonl, optional):").grid(row=10, column=1, sticky="e")
+        ttk.Entry(frm_top, textvariable=self.var_profile_log, width=30).grid(row=10, column=2, sticky="w", padx=4)
+
+        # Path-based scores on top of JJ/AA/CN (0 = off): resource allocation, truncated Katz, personalized PageRank
+        ttk.Label(frm_top, text="Extra weights RA / Katz / PPR:").grid(row=11, column=0, sticky="w")
+        frm_path = ttk.Frame(frm_top); frm_path.grid(row=11, column=1, sticky="w", padx=4)
+        self.var_path_weights = [tk.StringVar(value=str(w)) for w in DEFAULT_PATH_WEIGHTS]
+        for var in self.var_path_weights:
+            ttk.Spinbox(frm_path, from_=0.0, to=1.0, increment=0.05, textvariable=var, width=6).pack(side="left", padx=(0, 6))
+            var.trace_add("write", lambda *_: self._on_weights_changed())
+
+        # Temporal what-if (no row cap): train on the rows of [from year, split year] only
+        ttk.Label(frm_top, text="From year (optional, no row cap):").grid(row=12, column=0, sticky="w")
+        self.var_from_year = tk.StringVar(value="")
+        ttk.Entry(frm_top, textvariable=self.var_from_year, width=10).grid(row=12, column=1, sticky="w", padx=4)
+
+        # Build progress (bytes of the CSV read so far)
+        self.var_progress = tk.DoubleVar(value=0.0)
+        ttk.Progressbar(frm_top, variable=self.var_progress, maximum=100.0).grid(row=12, column=2, sticky="ew", padx=4)
+
+        # Recency (no row cap): a paper's link weight halves every half-life years before the split year
+        ttk.Label(frm_top, text="Half-life in years (optional, no row cap):").grid(row=13, column=0, sticky="w")
+        self.var_half_life = tk.StringVar(value="")
+        ttk.Entry(frm_top, textvariable=self.var_half_life, width=10).grid(row=13, column=1, sticky="w", padx=4)
+
         # Summary frame
         self.frm_sum = ttk.LabelFrame(self, text="Summary", padding=8)
         self.frm_sum.pack(side="top", fill="x", padx=8, pady=4)
-        self._sum_vars = {k: tk.StringVar(value="-") for k in ["split_year","rows","nodes","edges","target","num_recs"]}
+        self._sum_vars = {k: tk.StringVar(value="-") for k in ["split_year","rows","nodes","edges","target","num_recs","stages"]}
         row = 0
         for key, label in [("split_year","Split year"), ("rows","Training rows used"),
                            ("nodes","Nodes"), ("edges","Edges"),
-                           ("target","Resolved target"), ("num_recs","Recommendations")]:
-            ttk.Label(self.frm_sum, text=f"{label}:").grid(row=row, column=0, sticky="w")
-            ttk.Label(self.frm_sum, textvariable=self._sum_vars[key]).grid(row=row, column=1, sticky="w", padx=6)
+                           ("target","Resolved target"), ("num_recs","Recommendations"), ("stages","Stage timings")]:
+            ttk.Label(self.frm_sum, text=f"{label}:").grid(row=row, column=0, sticky="nw")
+            ttk.Label(self.frm_sum, textvariable=self._sum_vars[key], wraplength=950, justify="left").grid(row=row, column=1, sticky="w", padx=6)
             row += 1
 
         # Table (Treeview)
@@ -211,87 +326,318 @@ class App(tk.Tk):
         if path:
             self.var_csv.set(path)
 
+    def _off_thread(self, kind: str, job, on_done):
+        """Run job() on the lookup thread of kind; on_done(result) then runs on the Tk thread, unless a newer lookup
+        of the same kind was started meanwhile."""
+        self._lookup_seq[kind] += 1; seq = self._lookup_seq[kind]
+        fut = self._lookups[kind].submit(job)
+        def check():
+            if not fut.done(): self.after(LOOKUP_POLL_MS, check); return
+            if seq == self._lookup_seq[kind]: on_done(fut.result())
+        self.after(LOOKUP_POLL_MS, check)
+
+    def _on_author_typed(self, event=None):
+        if (self._name_index is None and self._client is None) or (event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab")):
+            return
+        if self._suggest_job is not None: self.after_cancel(self._suggest_job)
+        self._suggest_job = self.after(SUGGEST_DELAY_MS, self._suggest)
+
+    def _suggest(self):
+        """Type-ahead for the text in the target field (name index, or the query service's /suggest)."""
+        self._suggest_job = None
+        text = self.var_author.get().strip()
+        if len(text.casefold().encode("utf-8")) < MIN_SUGGEST_BYTES:
+            self._lookup_seq["suggest"] += 1  # drop a lookup still running for older text
+            self.cmb_author["values"] = []
+            return
+        client, index = self._client, self._name_index
+        def job():
+            if client is None: return index.suggest(text, 15)
+            try:
+                return client.suggest(text, 15)
+            except (OSError, RuntimeError):
+                return None
+        def show(names):
+            if names is not None: self.cmb_author["values"] = names
+        self._off_thread("suggest", job, show)
+
     def _on_run_clicked(self):
+        try:
+            params = self._collect_params()
+        except (ValueError, FileNotFoundError, tk.TclError) as e:
+            self.var_status.set(f"Error: {e}")
+            return
+        self._reporter = ProgressReporter()
+        self._lookup_seq["rerank"] += 1  # a re-ranking still running must not overwrite this run's results
         self.btn_run.config(state="disabled")
+        self.btn_cancel.config(state="normal")
+        self.var_progress.set(0.0)
         self.var_status.set("Running...")
-        threading.Thread(target=self._run_logic, daemon=True).start()
+        threading.Thread(target=self._run_logic, args=(params, self._reporter), daemon=True).start()
+        self.after(POLL_MS, self._poll)
+
+    def _on_cancel_clicked(self):
+        if self._reporter is not None: self._reporter.token.cancel()
+        self.btn_cancel.config(state="disabled")
+        self.var_status.set("Cancelling after the current chunk...")
+
+    def _collect_params(self) -> RunParams:
+        """Read every input on the Tk thread; the worker only sees this snapshot."""
+        url = self.var_service.get().strip()
+        csv_path = self.var_csv.get().strip()
+        if not url and not os.path.exists(csv_path):
+            raise FileNotFoundError(csv_path)
+
+        split_text = self.var_split.get().strip()
+        split_year = None
+        if split_text:
+            try:
+                split_year = int(split_text)
+            except ValueError:
+                raise ValueError("Split year must be an integer.")
+
+        max_rows_text = self.var_max_rows.get().strip().replace("_", "").replace(",", "")
+        max_rows = None
+        if max_rows_text:
+            try:
+                max_rows = int(max_rows_text)
+            except ValueError:
+                raise ValueError("Max training rows must be an integer.")
+
+        max_team_text = self.var_max_team.get().strip()
+        try:
+            max_team = int(max_team_text) if max_team_text else None
+        except ValueError:
+            raise ValueError("Mega-paper team size must be an integer.")
 
-    def _run_logic(self):
+        from_text = self.var_from_year.get().strip()
         try:
-            csv_path = self.var_csv.get().strip()
-            if not os.path.exists(csv_path):
-                raise FileNotFoundError(csv_path)
+            from_year = int(from_text) if from_text else None
+        except ValueError:
+            raise ValueError("From year must be an integer.")
+        if from_year is not None and (max_rows is not None or self.var_incidence.get()):
+            raise ValueError("From year needs a blank Max training rows and pair storage.")
 
-            split_text = self.var_split.get().strip()
-            if split_text:
+        half_life_text = self.var_half_life.get().strip()
+        try:
+            half_life = float(half_life_text) if half_life_text else None
+        except ValueError:
+            raise ValueError("Half-life must be a number of years.")
+        if half_life is not None and half_life <= 0:
+            raise ValueError("Half-life must be positive.")
+        if half_life is not None and (max_rows is not None or self.var_incidence.get()):
+            raise ValueError("Half-life needs a blank Max training rows and pair storage.")
+
+        return RunParams(url, csv_path, split_year, self.var_train_frac.get(), max_rows, max_team, self.var_mega_policy.get(),
+                         self.var_incidence.get(), self.var_use_cache.get(), from_year, half_life, self.var_author.get().strip(), int(self.var_topk.get()),
+                         self.var_include.get(), self.wctrl.get_weights(), self._path_weights(), self._filter_set(),
+                         "journal" if self.var_journal_mode.get() else "two_hop",
+                         self.var_profile.get(), self.var_profile_memory.get(), self.var_profile_log.get().strip() or None)
+
+    def _run_service(self, p: RunParams):
+        """Run the query against the warm-graph service instead of building locally."""
+        client = RecommendClient(p.service_url)
+        target, recs = client.recommend(p.target, p.topk, p.include_neighbors, p.weights, sorted(p.journals) if p.journals else None,
+                                        p.mode, p.path_weights)
+        graph = client.stats()["graph"]
+        return {"target": target, "recs": recs, "summary": (graph["split_year"], graph["used_rows"], graph["nodes"], str(graph["edges"])),
+                "status": "Done (query service).", "client": client}
+
+    def _run_logic(self, p: RunParams, reporter: ProgressReporter):
+        """Worker thread: never touches Tk. Progress and the outcome go through the reporter's queue (see _poll)."""
+        stages = "-"
+        with reporter.active():
+            try:
+                if p.service_url:
+                    reporter.finish("done", self._run_service(p))
+                    return
+                recorder = RunRecorder("desktop", p.profile_memory, p.profile_log, csv=p.csv_path, target=p.target) if p.profile else None
                 try:
-                    split_year = int(split_text)
-                except ValueError:
-                    raise ValueError("Split year must be an integer.")
-            else:
-                split_year = pick_split_year(csv_path, DEFAULT_YEAR_COL, self.var_train_frac.get())
-
-            adj, nodes, author_journals, used_rows = build_graph_and_journals(
-                csv_path,
+                    with recorder.active() if recorder else contextlib.nullcontext():
+                        result = self._run_local(p)
+                finally:
+                    if recorder: stages = format_record(recorder.finish())
+                result["stages"] = stages
+                reporter.finish("done", result)
+            except Cancelled:
+                reporter.finish("cancelled", stages)
+            except Exception as e:
+                reporter.finish("error", (str(e), stages))
+
+    def _read_state(self, p: RunParams, kind: str) -> ReadState:
+        """The read left by a cancelled run over the same file, storage and row cap, or a fresh one."""
+        key = (csv_identity(p.csv_path), DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, kind, p.incidence, p.max_rows)
+        if self._partial is None or self._partial[0] != key: self._partial = (key, ReadState(kind))
+        return self._partial[1]
+
+    def _run_local(self, p: RunParams):
+        """Build (or load) the graph and rank, on the worker thread; stages are timed when a RunRecorder is active."""
+        if p.max_rows is None and not p.incidence:
+            # No row cap: the CSV is read once into year layers; a new split year / train fraction is assembled from them.
+            ident = (csv_identity(p.csv_path), DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL)
+            reused = self._layers is not None and self._layers[0] == ident; cache_hit = False
+            if not reused:
+                # a new session memory-maps the layers saved by an earlier one instead of reading the CSV
+                self._layers = None
+                layers, cache_hit = cached_year_layers(self._cache if p.use_cache else None, p.csv_path, DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL,
+                                                       DEFAULT_VENUE_COL, state=self._read_state(p, "layers"))
+                self._layers = (ident, layers); self._partial = None
+            layers = self._layers[1]
+            split_year = p.split_year if p.split_year is not None else layers.split_year(p.train_frac)
+            if p.from_year is not None and split_year is not None: res = layers.window(p.from_year, split_year, p.half_life)
+            else: res = layers.as_of(split_year, p.half_life)
+            split_year, _, adj, nodes, author_journals, used_rows = res
+            status = ("Done (graph from year layers, no reread)." if reused else
+                      "Done (year layers from cache)." if cache_hit else "Done.")
+        else:
+            # One pass over the CSV: the split year (if not given) and the graph come from the same read.
+            (split_year, _, adj, nodes, author_journals, used_rows), cache_hit = cached_ingest(
+                self._cache if p.use_cache else None,
+                p.csv_path,
                 DEFAULT_AUTHORS_COL,
                 DEFAULT_YEAR_COL,
                 DEFAULT_VENUE_COL,
-                split_year,
-                DEFAULT_MAX_TRAIN_ROWS,
-            )
-            num_edges = sum(len(nei) for nei in adj.values()) // 2
-
-            if not adj:
-                raise RuntimeError("Empty graph. Check the CSV and columns.")
-
-            target = pick_target(adj, self.var_author.get().strip())
-            jj, aa, cn = self.wctrl.get_weights()
-
-            filter_set = None
-            if self.var_filter.get().strip():
-                filter_set = {j.strip() for j in self.var_filter.get().split(";") if j.strip()}
-
-            recs = recommend(
-                adj, author_journals, target, int(self.var_topk.get()), self.var_include.get(),
-                w_aa=aa, w_cn=cn, w_jj=jj, filter_journals=filter_set
+                p.split_year,
+                p.train_frac,
+                p.max_rows,
+                incidence=p.incidence,
+                max_team=p.max_team,
+                mega_policy=p.mega_policy,
+                state=self._read_state(p, "parts"),
             )
-
-            # Update summary
-            self._sum_vars["split_year"].set(str(split_year))
-            self._sum_vars["rows"].set(str(used_rows))
-            self._sum_vars["nodes"].set(str(len(nodes)))
-            self._sum_vars["edges"].set(str(num_edges))
-            self._sum_vars["target"].set(target)
-            self._sum_vars["num_recs"].set(str(len(recs)))
-
-            # Fill table
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            rows = []
-            for (v, score, aa_val, cn_val, jj_val, cj, cnbr, expl) in recs:
-                rows.append((v, f"{score:.6f}", f"{aa_val:.4f}", cn_val, f"{jj_val:.4f}",
-                             "; ".join(cj), "; ".join(cnbr), expl))
-            for r in rows:
-                self.tree.insert("", "end", values=r)
-
-            # Keep DataFrame for saving
-            self._last_df = pd.DataFrame([
-                {"Candidate": v,
-                "Score": float(score),
-                "Adamic–Adar": float(aa_val),
-                "Common Neighbors": int(cn_val),
-                "Journal Jaccard": float(jj_val),
-                "Common Journals": "; ".join(cj),
-                "Common Neighbors (names)": "; ".join(cnbr),
-                "Explanation": expl}
-                for (v, score, aa_val, cn_val, jj_val, cj, cnbr, expl) in recs
-            ])
-            self.btn_save.config(state="normal")
-            self.var_status.set("Done.")
-        except Exception as e:
-            self.var_status.set(f"Error: {e}")
-        finally:
-            self.btn_run.config(state="normal")
+            self._partial = None  # the parsed chunks are not needed once the graph is built (or cached)
+            status = "Done (graph from cache)." if cache_hit else "Done."
+        num_edges = str(adj.num_edges)
+        if isinstance(adj, BipartiteGraph):
+            num_edges += f" ({adj.num_papers} papers, {adj.num_authorships} authorships)"
+
+        if not adj:
+            raise RuntimeError("Empty graph. Check the CSV and columns.")
+
+        checkpoint("rank")
+        with stage("name_index"): name_index = name_index_for(adj)
+        target = pick_target(adj, p.target)
+        jj, aa, cn = p.weights
+
+        features = self._features
+        if features is None or features.graph is not adj:
+            features = FeatureCache(adj, author_journals)
+        w_ra, w_katz, w_ppr = p.path_weights
+        recs = features.recommend(target, p.topk, p.include_neighbors, w_aa=aa, w_cn=cn, w_jj=jj,
+                                  filter_journals=p.journals, candidate_mode=p.mode, w_ra=w_ra, w_katz=w_katz, w_ppr=w_ppr)
+        return {"target": target, "recs": recs, "summary": (split_year, used_rows, len(nodes), num_edges), "status": status,
+                "features": features, "name_index": name_index, "last_query": (target, p.include_neighbors, p.mode)}
+
+    def _poll(self):
+        """Tk thread: apply the worker's progress records, then its outcome, to the widgets."""
+        reporter = self._reporter
+        for msg in reporter.drain():
+            if isinstance(msg, Progress):
+                self.var_status.set(format_progress(msg))
+                if msg.fraction is not None: self.var_progress.set(100.0 * msg.fraction)
+            else:
+                self._finish_run(msg)
+                return
+        self.after(POLL_MS, self._poll)
+
+    def _finish_run(self, msg: Finished):
+        self._reporter = None
+        self.btn_run.config(state="normal")
+        self.btn_cancel.config(state="disabled")
+        if msg.status == "done":
+            r = msg.value
+            self._client = r.get("client"); self._last_query = r.get("last_query")  # no local re-ranking of service results
+            if "features" in r:
+                self._features, self._name_index = r["features"], r["name_index"]
+                self._sum_vars["stages"].set(r["stages"])
+            self.var_progress.set(100.0)
+            self._show_results(r["target"], r["recs"], *r["summary"], r["status"])
+        elif msg.status == "cancelled":
+            self._sum_vars["stages"].set(msg.value)
+            rows = self._partial[1].rows if self._partial is not None else 0
+            self.var_status.set(f"Cancelled. {rows:,} rows already read are reused if you run again with the same CSV." if rows else "Cancelled.")
+        else:
+            error, stages = msg.value
+            self._sum_vars["stages"].set(stages)
+            self.var_status.set(f"Error: {error}")
+
+    def _path_weights(self):
+        try:
+            return tuple(max(0.0, float(v.get() or 0)) for v in self.var_path_weights)
+        except ValueError:
+            raise ValueError("Extra weights must be numbers.")
+
+    def _filter_set(self):
+        text = self.var_filter.get().strip()
+        return {j.strip() for j in text.split(";") if j.strip()} if text else None
+
+    def _on_weights_changed(self):
+        """Slider moved: re-rank the results on screen from cached features, debounced to the last move."""
+        if self._last_query is None or str(self.btn_run["state"]) == "disabled": return
+        if self._rerank_job is not None: self.after_cancel(self._rerank_job)
+        self._rerank_job = self.after(30, self._rerank)
+
+    def _rerank(self):
+        """Ranking stage on the lookup thread (Katz / PPR weights can take a while on a large graph)."""
+        self._rerank_job = None
+        if self._last_query is None or str(self.btn_run["state"]) == "disabled": return
+        target, include_neighbors, mode = self._last_query
+        jj, aa, cn = self.wctrl.get_weights()
+        try:
+            w_ra, w_katz, w_ppr = self._path_weights(); topk = int(self.var_topk.get())
+        except (ValueError, tk.TclError):
+            return
+        features, journals = self._features, self._filter_set()
+        def job():
+            try:
+                return features.recommend(target, topk, include_neighbors, w_aa=aa, w_cn=cn, w_jj=jj, filter_journals=journals,
+                                          candidate_mode=mode, w_ra=w_ra, w_katz=w_katz, w_ppr=w_ppr)
+            except ValueError:
+                return None
+        def show(recs):
+            if recs is not None and str(self.btn_run["state"]) != "disabled": self._fill_results(target, recs, "Re-ranked.")
+        self._off_thread("rerank", job, show)
+
+    def _show_results(self, target, recs, split_year, used_rows, num_nodes, num_edges, status):
+        # Update summary
+        self._sum_vars["split_year"].set(str(split_year))
+        self._sum_vars["rows"].set(str(used_rows))
+        self._sum_vars["nodes"].set(str(num_nodes))
+        self._sum_vars["edges"].set(num_edges)
+        self._fill_results(target, recs, status)
+
+    def _fill_results(self, target, recs, status):
+        self._sum_vars["target"].set(target)
+        self._sum_vars["num_recs"].set(str(len(recs)))
+
+        # Fill table
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        rows = []
+        for (v, score, aa_val, cn_val, jj_val, cj, cnbr, expl) in recs:
+            rows.append((v, f"{score:.6f}", f"{aa_val:.4f}", f"{cn_val:g}", f"{jj_val:.4f}",
+                         "; ".join(cj), "; ".join(cnbr), expl))
+        for r in rows:
+            self.tree.insert("", "end", values=r)
+
+        # Keep DataFrame for saving
+        self._last_df = pd.DataFrame([
+            {"Candidate": v,
+            "Score": float(score),
+            "Adamic–Adar": float(aa_val),
+            "Common Neighbors": cn_val,
+            "Journal Jaccard": float(jj_val),
+            "Common Journals": "; ".join(cj),
+            "Common Neighbors (names)": "; ".join(cnbr),
+            "Explanation": expl}
+            for (v, score, aa_val, cn_val, jj_val, cj, cnbr, expl) in recs
+        ])
+        self.btn_save.config(state="normal")
+        self.var_status.set(status)
+
+    def _clear_cache(self):
+        removed = self._cache.invalidate()
+        self.var_status.set(f"Cleared {removed} cached graph snapshot(s).")
 
     def _save_csv(self):
         if self._last_df is None:
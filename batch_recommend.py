@@ -0,0 +1,165 @@
+# batch_recommend.py
+"""
+Headless top-k collaborator lists for every author of the graph.
+
+The graph is built once (or taken from the snapshot cache) and every worker process memory-maps the
+same snapshot, so the CSR arrays are shared through the OS page cache instead of copied per worker.
+Authors are split into shards of consecutive ids; finished shards are appended to the output and
+recorded in a checkpoint so an interrupted run resumes where it stopped.
+
+    python batch_recommend.py --csv dataset/dblp_2021_2023.csv --out recs.jsonl --workers 8
+"""
+import os, io, sys, csv, json, time, argparse, hashlib
+import multiprocessing as mp
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from data_loader import DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, DEFAULT_MAX_TRAIN_ROWS
+from graph_builder import default_workers
+from graph_cache import GraphCache, DEFAULT_CACHE_DIR, cached_ingest, ensure_snapshot, load_snapshot
+from recommender import recommend_for_id, DEFAULT_WEIGHTS, DEFAULT_PATH_WEIGHTS
+from bipartite import MEGA_PAPER_POLICIES, DEFAULT_MAX_TEAM
+
+CSV_FIELDS = ["target", "rank", "candidate", "score", "aa", "cn", "jj", "common_journals", "common_neighbors"]
+
+_worker = {}
+
+def _init_worker(snapshot_dir: str, params: Dict):
+    graph, journals, _ = load_snapshot(snapshot_dir)
+    _worker.update(graph=graph, journals=journals, params=params)
+
+def _run_shard(shard: Tuple[int, int, int]):
+    """Recommendations for author ids [lo, hi) with at least one co-author; returns (shard, pid, seconds, authors, rows)."""
+    shard_id, lo, hi = shard
+    graph, journals, p = _worker["graph"], _worker["journals"], _worker["params"]
+    t0 = time.perf_counter(); out = []
+    ids = graph.connected_ids(); ids = ids[(ids >= lo) & (ids < hi)]
+    for u in ids.tolist():
+        recs = recommend_for_id(graph, journals, u, p["topk"], p["include_neighbors"], w_aa=p["w_aa"], w_cn=p["w_cn"], w_jj=p["w_jj"],
+                                w_ra=p["w_ra"], w_katz=p["w_katz"], w_ppr=p["w_ppr"])
+        out.append((graph.names[u], recs))
+    return shard_id, os.getpid(), time.perf_counter() - t0, len(ids), out
+
+def _format_rows(fmt: str, results) -> str:
+    if fmt == "jsonl":
+        lines = []
+        for target, recs in results:
+            lines.append(json.dumps({"target": target, "recommendations": [
+                {"candidate": v, "score": s, "aa": aa, "cn": cn, "jj": jj, "common_journals": cj, "common_neighbors": cnbr}
+                for (v, s, aa, cn, jj, cj, cnbr, _) in recs]}, ensure_ascii=False))
+        return "".join(l + "\n" for l in lines)
+    buf = io.StringIO(); w = csv.writer(buf, lineterminator="\n")
+    for target, recs in results:
+        for rank, (v, s, aa, cn, jj, cj, cnbr, _) in enumerate(recs, 1):
+            w.writerow([target, rank, v, f"{s:.6f}", f"{aa:.4f}", cn, f"{jj:.4f}", "; ".join(cj), "; ".join(cnbr)])
+    return buf.getvalue()
+
+class Checkpoint:
+    """Done shards plus the output size after the last committed shard (anything beyond it is discarded on resume)."""
+    def __init__(self, path: str, run_id: str):
+        self.path = path
+        self.run_id = run_id
+        self.done: set = set()
+        self.offset = 0
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("run_id") != self.run_id:
+            raise RuntimeError(f"Checkpoint {self.path} belongs to a different run; pass --restart to discard it.")
+        self.done = set(data["done"]); self.offset = data["offset"]
+        return True
+
+    def commit(self, shard_id: int, offset: int):
+        self.done.add(shard_id); self.offset = offset
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump({"run_id": self.run_id, "done": sorted(self.done), "offset": offset}, f)
+        os.replace(tmp, self.path)
+
+def run_batch(snapshot_dir: str, out_path: str, fmt: str = "jsonl", topk: int = 25, include_neighbors: bool = False,
+              weights=DEFAULT_WEIGHTS, workers: Optional[int] = None, shard_size: int = 2000, restart: bool = False,
+              path_weights=DEFAULT_PATH_WEIGHTS, log=print) -> Dict:
+    """Run (or resume) the all-authors job over a snapshot directory; returns the throughput report."""
+    w_jj, w_aa, w_cn = weights; w_ra, w_katz, w_ppr = path_weights
+    params = {"topk": topk, "include_neighbors": include_neighbors, "w_aa": w_aa, "w_cn": w_cn, "w_jj": w_jj, "w_ra": w_ra, "w_katz": w_katz, "w_ppr": w_ppr}
+    graph, _, meta = load_snapshot(snapshot_dir)
+    n = graph.num_nodes
+    shards = [(i, lo, min(lo + shard_size, n)) for i, lo in enumerate(range(0, n, shard_size))]
+    run_id = hashlib.sha256(json.dumps([meta.get("key"), params, fmt, shard_size], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    ckpt = Checkpoint(out_path + ".ckpt", run_id)
+    if restart and os.path.exists(ckpt.path): os.remove(ckpt.path)
+    resumed = ckpt.load() and os.path.exists(out_path)
+    if not resumed: ckpt.done, ckpt.offset = set(), 0
+    mode = "r+b" if resumed else "wb"
+    pending = [s for s in shards if s[0] not in ckpt.done]
+    workers = max(1, workers or os.cpu_count() or 1)
+    per_worker = defaultdict(lambda: {"authors": 0, "seconds": 0.0, "shards": 0})
+    t0 = time.perf_counter(); total = 0
+    with open(out_path, mode) as out:
+        out.truncate(ckpt.offset); out.seek(ckpt.offset)
+        if fmt == "csv" and ckpt.offset == 0: out.write((",".join(CSV_FIELDS) + "\n").encode("utf-8"))
+        if workers == 1:
+            _init_worker(snapshot_dir, params); results = map(_run_shard, pending); pool = None
+        else:
+            pool = mp.get_context().Pool(workers, initializer=_init_worker, initargs=(snapshot_dir, params))
+            results = pool.imap_unordered(_run_shard, pending)
+        try:
+            for shard_id, pid, secs, count, rows in results:
+                out.write(_format_rows(fmt, rows).encode("utf-8")); out.flush(); os.fsync(out.fileno())
+                ckpt.commit(shard_id, out.tell())
+                w = per_worker[pid]; w["authors"] += count; w["seconds"] += secs; w["shards"] += 1
+                total += count
+                elapsed = time.perf_counter() - t0
+                log(f"shard {shard_id + 1}/{len(shards)} done, {total} authors, {total / elapsed:.1f} authors/sec")
+        finally:
+            if pool is not None: pool.close(); pool.join()
+    elapsed = time.perf_counter() - t0
+    report = {"output": out_path, "format": fmt, "resumed": resumed, "shards_total": len(shards), "shards_run": len(pending),
+              "authors": total, "seconds": round(elapsed, 3), "authors_per_sec": round(total / elapsed, 2) if elapsed > 0 else None,
+              "workers": workers,
+              "per_worker": {str(pid): dict(w, authors_per_sec=round(w["authors"] / w["seconds"], 2) if w["seconds"] > 0 else None)
+                             for pid, w in per_worker.items()}}
+    with open(out_path + ".report.json", "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Top-k collaborator recommendations for every author.")
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--out", required=True, help="output path (.jsonl or .csv)")
+    ap.add_argument("--format", choices=["jsonl", "csv"], default=None, help="defaults to the output extension")
+    ap.add_argument("--split-year", type=int, default=None)
+    ap.add_argument("--train-frac", type=float, default=0.8)
+    ap.add_argument("--max-rows", type=int, default=DEFAULT_MAX_TRAIN_ROWS, help="0 = all rows")
+    ap.add_argument("--topk", type=int, default=25)
+    ap.add_argument("--include-neighbors", action="store_true")
+    ap.add_argument("--weights", type=float, nargs=3, metavar=("JJ", "AA", "CN"), default=DEFAULT_WEIGHTS)
+    ap.add_argument("--path-weights", type=float, nargs=3, metavar=("RA", "KATZ", "PPR"), default=DEFAULT_PATH_WEIGHTS,
+                    help="resource allocation, truncated Katz, personalized PageRank")
+    ap.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    ap.add_argument("--shard-size", type=int, default=2000)
+    ap.add_argument("--incidence", action="store_true", help="store the author–paper incidence instead of co-author pairs")
+    ap.add_argument("--max-team", type=int, default=DEFAULT_MAX_TEAM, help="papers with more authors are mega papers (0 = no limit)")
+    ap.add_argument("--mega-policy", choices=MEGA_PAPER_POLICIES, default="keep")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    ap.add_argument("--ingest-workers", type=int, default=1, help="processes parsing the CSV on a cache miss (0 = one per CPU)")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = ap.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.out.lower().endswith(".csv") else "jsonl")
+    max_rows = args.max_rows or None; chunksize = 20000
+    cache = GraphCache(args.cache_dir)
+    storage = (args.incidence, args.max_team or None, args.mega_policy)
+    result, hit = cached_ingest(cache, args.csv, DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, args.split_year, args.train_frac, max_rows, chunksize, True, *storage,
+                                workers=args.ingest_workers or default_workers())
+    key = cache.key_for(args.csv, DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, args.split_year, args.train_frac, max_rows, chunksize, *storage)
+    print(f"graph {'from cache' if hit else 'built'}: {len(result.nodes)} nodes, {result.adj.num_edges} edges, split year {result.split_year}", file=sys.stderr)
+    try: snapshot = ensure_snapshot(cache, key, result)
+    except OSError as e: raise SystemExit(f"Cannot write the graph snapshot to {args.cache_dir} ({e}); workers load the graph from it, pass a writable --cache-dir.")
+    report = run_batch(snapshot, args.out, fmt, args.topk, args.include_neighbors, tuple(args.weights),
+                       args.workers, args.shard_size, args.restart, tuple(args.path_weights), log=lambda m: print(m, file=sys.stderr))
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
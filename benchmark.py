@@ -0,0 +1,131 @@
+# benchmark.py
+"""
+Micro/macro benchmarks on synthetic DBLP-like data (see synth_data.py), one JSON report per run.
+
+Each scale times the CSV pass (pick_split_year), the graph builds (dict, CSR, author–paper incidence,
+and the CSR build with a process pool of --ingest-workers, reported with its speedup), and the per-query stages (candidate_set, CN / Adamic–Adar / journal overlap, recommend) on a seeded
+sample of targets, for the dict and the id-based paths. Reports carry the git commit and library
+versions so runs can be compared across commits.
+
+    python benchmark.py --scales 10000 100000 1000000 --out bench.json
+"""
+import os, sys, json, time, random, platform, argparse, subprocess
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Sequence
+
+from data_loader import DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, DEFAULT_MAX_TRAIN_ROWS, pick_split_year
+from graph_builder import build_graph_and_journals, ingest_csv, default_workers
+from metrics import candidate_set, candidate_ids, common_neighbors_count, adamic_adar, journal_overlap
+from scoring import score_candidates
+from recommender import recommend, recommend_for_id, DEFAULT_WEIGHTS
+from synth_data import ensure_dataset, DEFAULT_SEED
+
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~"), ".author_recs_bench")
+COLS = (DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL)
+
+def timed(fn: Callable, repeat: int = 1) -> Dict:
+    """Best and median wall time of repeat calls (seconds); the last result is kept under "result"."""
+    times = []; result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); result = fn(); times.append(time.perf_counter() - t0)
+    return {"best": round(min(times), 6), "median": round(float(np.median(times)), 6), "runs": len(times), "result": result}
+
+def per_query(fn: Callable, items: List, repeat: int = 1) -> Dict:
+    """Time fn over every item; reports the total and the mean per item in milliseconds."""
+    t = timed(lambda: [fn(x) for x in items], repeat); t.pop("result")
+    t["queries"] = len(items); t["mean_ms"] = round(t["best"] * 1000.0 / max(len(items), 1), 4)
+    return t
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment() -> Dict:
+    return {"commit": git_commit(), "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def bench_scale(csv_path: str, max_rows: Optional[int], targets: int = 50, repeat: int = 3, seed: int = 0,
+                with_dict: bool = True, with_incidence: bool = True, ingest_workers: Sequence[int] = (), log=print) -> Dict:
+    """Every benchmark for one CSV; build stages run repeat times, query stages repeat times over the sampled targets."""
+    w_jj, w_aa, w_cn = DEFAULT_WEIGHTS; out = {"csv_bytes": os.path.getsize(csv_path)}
+    t = timed(lambda: pick_split_year(csv_path, DEFAULT_YEAR_COL), repeat); split = t.pop("result")
+    out["pick_split_year"] = t; out["split_year"] = split
+    log(f"  pick_split_year {t['best']:.3f}s")
+    t = timed(lambda: ingest_csv(csv_path, *COLS, split, max_rows=max_rows, as_csr=True), repeat); res = t.pop("result")
+    out["build_csr"] = t; graph, journals = res.adj, res.author_journals
+    out["graph"] = {"nodes": graph.num_nodes, "edges": graph.num_edges, "used_rows": res.used_rows, "csr_bytes": graph.nbytes()}
+    log(f"  build_csr {t['best']:.3f}s ({graph.num_nodes} nodes, {graph.num_edges} edges)")
+    for w in ingest_workers:
+        t = timed(lambda: ingest_csv(csv_path, *COLS, split, max_rows=max_rows, as_csr=True, workers=w), repeat); t.pop("result")
+        t["speedup"] = round(out["build_csr"]["best"] / t["best"], 3); out.setdefault("build_csr_parallel", {})[str(w)] = t
+        log(f"  build_csr workers={w} {t['best']:.3f}s (x{t['speedup']:.2f})")
+    if with_incidence:
+        t = timed(lambda: ingest_csv(csv_path, *COLS, split, max_rows=max_rows, incidence=True), repeat); bres = t.pop("result")
+        out["build_incidence"] = t; out["graph"]["incidence_bytes"] = bres.adj.nbytes()
+        log(f"  build_incidence {t['best']:.3f}s")
+    ids = graph.connected_ids().tolist()
+    sample = sorted(random.Random(seed).sample(ids, min(targets, len(ids))))
+    pairs = [(u, int(v)) for u in sample for v in candidate_ids(graph, u)[:20].tolist()]
+    out["targets"] = len(sample); out["pairs"] = len(pairs)
+    out["candidate_ids"] = per_query(lambda u: candidate_ids(graph, u), sample, repeat)
+    out["score_candidates"] = per_query(lambda u: score_candidates(graph, journals, u, False), sample, repeat)
+    out["recommend_csr"] = per_query(lambda u: recommend_for_id(graph, journals, u, 25, False, w_aa, w_cn, w_jj), sample, repeat)
+    if with_incidence:
+        bip, bjournals = bres.adj, bres.author_journals  # ids differ from the CSR build, so map the targets by name
+        bsample = [bip.id_of(graph.names[u]) for u in sample]
+        out["recommend_incidence"] = per_query(lambda u: recommend_for_id(bip, bjournals, u, 25, False, w_aa, w_cn, w_jj), bsample, repeat)
+    log(f"  recommend_csr {out['recommend_csr']['mean_ms']:.2f} ms/query")
+    if with_dict:
+        t = timed(lambda: build_graph_and_journals(csv_path, *COLS, split, max_rows), repeat); adj, _, author_journals, _ = t.pop("result")
+        out["build_graph_and_journals"] = t
+        log(f"  build_graph_and_journals {t['best']:.3f}s")
+        names = [graph.names[u] for u in sample]; name_pairs = [(graph.names[u], graph.names[v]) for u, v in pairs]
+        out["candidate_set"] = per_query(lambda u: candidate_set(adj, u), names, repeat)
+        out["common_neighbors_count"] = per_query(lambda p: common_neighbors_count(adj, *p), name_pairs, repeat)
+        out["adamic_adar"] = per_query(lambda p: adamic_adar(adj, *p), name_pairs, repeat)
+        out["journal_overlap"] = per_query(lambda p: journal_overlap(author_journals, *p), name_pairs, repeat)
+        out["recommend_dict"] = per_query(lambda u: recommend(adj, author_journals, u, 25, False, w_aa, w_cn, w_jj), names, repeat)
+        log(f"  recommend_dict {out['recommend_dict']['mean_ms']:.2f} ms/query")
+    return out
+
+def run_benchmarks(scales=DEFAULT_SCALES, data_dir: str = DEFAULT_DATA_DIR, max_rows: Optional[int] = DEFAULT_MAX_TRAIN_ROWS,
+                   targets: int = 50, repeat: int = 3, seed: int = DEFAULT_SEED, dict_max_rows: Optional[int] = 1_000_000,
+                   with_incidence: bool = True, ingest_workers: Sequence[int] = (), log=print) -> Dict:
+    """Generate (or reuse) one synthetic CSV per scale and benchmark it; dict-path stages are skipped above dict_max_rows."""
+    report = {"environment": environment(), "params": {"max_rows": max_rows, "targets": targets, "repeat": repeat, "seed": seed,
+                                                       "dict_max_rows": dict_max_rows, "incidence": with_incidence,
+                                                       "ingest_workers": list(ingest_workers)}, "scales": {}}
+    for rows in scales:
+        log(f"scale {rows} rows")
+        t0 = time.perf_counter(); path = ensure_dataset(data_dir, rows, seed)
+        log(f"  dataset ready in {time.perf_counter() - t0:.1f}s: {path}")
+        with_dict = dict_max_rows is None or min(rows, max_rows or rows) <= dict_max_rows
+        report["scales"][str(rows)] = bench_scale(path, max_rows, targets, repeat, seed, with_dict, with_incidence, ingest_workers, log)
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    ap.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="CSV rows per scale")
+    ap.add_argument("--out", default="bench.json")
+    ap.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated CSVs are kept between runs")
+    ap.add_argument("--max-rows", type=int, default=DEFAULT_MAX_TRAIN_ROWS, help="training row cap, 0 = all rows")
+    ap.add_argument("--targets", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    ap.add_argument("--dict-max-rows", type=int, default=1_000_000, help="skip the dict path above this many training rows (0 = never skip)")
+    ap.add_argument("--no-incidence", action="store_true")
+    ap.add_argument("--ingest-workers", type=int, nargs="*", default=None, help="process counts for the parallel CSR build (default: one per CPU)")
+    args = ap.parse_args(argv)
+    ingest_workers = args.ingest_workers if args.ingest_workers is not None else [w for w in (default_workers(),) if w > 1]
+    report = run_benchmarks(args.scales, args.data_dir, args.max_rows or None, args.targets, args.repeat, args.seed,
+                            args.dict_max_rows or None, not args.no_incidence, ingest_workers, log=lambda m: print(m, file=sys.stderr))
+    with open(args.out, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    print(f"saved {args.out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# bipartite.py
+import numpy as np
+from typing import Optional
+from csr_graph import IdGraph, NameTable, csr_positions, grow_indptr
+
+MEGA_PAPER_POLICIES = ("keep", "skip", "cap", "downweight")
+DEFAULT_MAX_TEAM = 50
+DEGREE_BATCH = 4096  # authors per projection batch when computing degrees
+
+class BipartiteGraph(IdGraph):
+    """
+    Co-authorship stored as the author–paper incidence instead of its clique expansion.
+    paper -> authors and author -> papers are both CSR; neighbors, CN and Adamic–Adar are derived on demand
+    by expanding only the papers of the requested authors, so storage and build are linear in authorships.
+    Edge weights are sums of per-paper weights (1, or 1/(n-1) for down-weighted mega papers); with down-weighted
+    papers scoring weights each common neighbor by its link strengths (see scoring.link_strength).
+    """
+    def __init__(self, names: NameTable, paper_indptr: np.ndarray, paper_authors: np.ndarray, paper_weight: np.ndarray,
+                 author_indptr: Optional[np.ndarray] = None, author_papers: Optional[np.ndarray] = None):
+        self.names = names
+        self.paper_indptr = paper_indptr
+        self.paper_authors = paper_authors
+        self.paper_weight = paper_weight
+        n = len(names)
+        if author_indptr is None:  # transpose (snapshots store it, so loading stays a memory map)
+            sizes = np.diff(paper_indptr); order = np.argsort(paper_authors, kind="stable")
+            author_papers = np.repeat(np.arange(len(sizes), dtype=np.int32), sizes)[order]
+            author_indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(paper_authors, minlength=n), out=author_indptr[1:])
+        self.author_indptr = author_indptr
+        self.author_papers = author_papers
+        self._degree = np.full(n, -1, dtype=np.int64)  # filled lazily by degree_of
+        self._connected = np.flatnonzero(self.author_indptr[1:] > self.author_indptr[:-1])  # every kept paper has >= 2 authors
+        self.fractional_links = bool(np.any(paper_weight < 1))
+
+    @classmethod
+    def from_authorships(cls, names: NameTable, paper_ids: np.ndarray, author_ids: np.ndarray, positions: np.ndarray,
+                         max_team: Optional[int] = DEFAULT_MAX_TEAM, policy: str = "keep") -> "BipartiteGraph":
+        """
+        Build from (paper, author, position-in-author-list) records with distinct (paper, author).
+        Papers with more than max_team authors are kept as is, skipped, capped to their first max_team authors,
+        or down-weighted to 1/(n-1) per co-author pair, depending on policy. Single-author papers carry no edges and are dropped.
+        """
+        if policy not in MEGA_PAPER_POLICIES: raise ValueError(f"Unknown mega-paper policy: {policy}")
+        paper_ids = np.asarray(paper_ids, dtype=np.int64); author_ids = np.asarray(author_ids, dtype=np.int64)
+        _, pinv, sizes = np.unique(paper_ids, return_inverse=True, return_counts=True)
+        keep = np.ones(len(paper_ids), dtype=bool)
+        if max_team is not None and policy == "skip": keep &= sizes[pinv] <= max_team
+        if max_team is not None and policy == "cap": keep &= np.asarray(positions) < max_team
+        pinv, author_ids = pinv[keep], author_ids[keep]
+        sizes = np.bincount(pinv, minlength=len(sizes))
+        keep = sizes[pinv] >= 2
+        pinv, author_ids = pinv[keep], author_ids[keep]
+        used, pinv = np.unique(pinv, return_inverse=True); sizes = sizes[used]
+        order = np.lexsort((author_ids, pinv))
+        indptr = np.zeros(len(used) + 1, dtype=np.int64); np.cumsum(sizes, out=indptr[1:])
+        weight = np.ones(len(used))
+        if max_team is not None and policy == "downweight":
+            mega = sizes > max_team; weight[mega] = 1.0 / (sizes[mega] - 1)
+        return cls(names, indptr, author_ids[order].astype(np.int32), weight)
+
+    def add_papers(self, paper_indptr: np.ndarray, paper_authors: np.ndarray, paper_weight: np.ndarray):
+        """Append papers (as built by from_authorships, author ids may include appended names) in place.
+        New papers get the highest ids, so they go at the end of their authors' rows."""
+        n = len(self.names); first = self.num_papers
+        sizes = np.diff(paper_indptr); pa = np.asarray(paper_authors, dtype=np.int64)
+        pid = np.repeat(np.arange(first, first + len(sizes), dtype=np.int32), sizes)
+        order = np.lexsort((pid, pa)); pa, pid = pa[order], pid[order]
+        author_indptr = grow_indptr(self.author_indptr, n)
+        self.author_papers = np.insert(self.author_papers, author_indptr[pa + 1], pid)
+        self.author_indptr = author_indptr + np.concatenate([[0], np.cumsum(np.bincount(pa, minlength=n))])
+        self.paper_indptr = np.concatenate([self.paper_indptr, self.paper_indptr[-1] + np.asarray(paper_indptr[1:], dtype=np.int64)])
+        self.paper_authors = np.concatenate([self.paper_authors, np.asarray(paper_authors, dtype=np.int32)])
+        self.paper_weight = np.concatenate([self.paper_weight, paper_weight])
+        self.fractional_links = self.fractional_links or bool(np.any(paper_weight < 1))
+        degree = np.full(n, -1, dtype=np.int64); degree[:len(self._degree)] = self._degree
+        degree[np.unique(pa)] = -1  # only the new papers' authors gain neighbors
+        self._degree = degree
+        self._connected = np.flatnonzero(self.author_indptr[1:] > self.author_indptr[:-1])
+        self.__dict__.pop("_name_index", None)
+
+    @property
+    def num_papers(self) -> int:
+        return len(self.paper_indptr) - 1
+
+    @property
+    def num_authorships(self) -> int:
+        return len(self.paper_authors)
+
+    @property
+    def num_edges(self) -> int:
+        """Edges of the projected graph (computes every degree on first use)."""
+        return int(self.degree_of(self._connected).sum()) // 2
+
+    def expand(self, ids: np.ndarray, with_weights: bool = False, skip_papers: Optional[np.ndarray] = None):
+        """Neighbor lists of ids (see IdGraph.expand); papers in skip_papers are left out of the projection."""
+        ids = np.asarray(ids, dtype=np.int64); n = self.num_nodes
+        papers = self.author_papers[csr_positions(self.author_indptr, ids)]
+        prow = np.repeat(np.arange(len(ids)), self.author_indptr[ids + 1] - self.author_indptr[ids])
+        if skip_papers is not None and len(skip_papers):
+            keep = ~np.isin(papers, skip_papers); papers, prow = papers[keep], prow[keep]
+        sizes = self.paper_indptr[papers + 1] - self.paper_indptr[papers]
+        rows = np.repeat(prow, sizes); dst = self.paper_authors[csr_positions(self.paper_indptr, papers)].astype(np.int64)
+        other = dst != ids[rows]
+        keys, inv = np.unique(rows[other] * n + dst[other], return_inverse=True)
+        rows, dst = keys // n, keys % n
+        if not with_weights: return rows, dst
+        return rows, dst, np.bincount(inv, weights=np.repeat(self.paper_weight[papers], sizes)[other], minlength=len(keys))
+
+    def expand_beyond(self, u: int, ids: np.ndarray, with_weights: bool = False):
+        """Skips u's own papers: expanding the co-authors of u's mega paper would otherwise list that paper's
+        whole team once per co-author, and everyone on it is u's neighbor anyway."""
+        return self.expand(ids, with_weights, self.author_papers[self.author_indptr[u]:self.author_indptr[u + 1]])
+
+    def degree_of(self, ids: np.ndarray) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        missing = np.unique(ids[self._degree[ids] < 0])
+        for k in range(0, len(missing), DEGREE_BATCH):
+            batch = missing[k:k + DEGREE_BATCH]
+            self._degree[batch] = np.bincount(self.expand(batch)[0], minlength=len(batch))
+        return self._degree[ids]
+
+    def connected_ids(self) -> np.ndarray:
+        return self._connected
+
+    def nbytes(self) -> int:
+        return int(self.paper_indptr.nbytes + self.paper_authors.nbytes + self.paper_weight.nbytes + self.author_indptr.nbytes
+                   + self.author_papers.nbytes + self._degree.nbytes + self.names.nbytes())
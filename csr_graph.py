@@ -0,0 +1,352 @@
+# csr_graph.py
+import numpy as np
+from abc import abstractmethod
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Set, Tuple, Iterable
+
+def encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings into one utf-8 byte blob plus an offsets array (len(values) + 1)."""
+    raw = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(raw) + 1, dtype=np.int64)
+    if raw: np.cumsum([len(b) for b in raw], out=offsets[1:])
+    return np.frombuffer(b"".join(raw), dtype=np.uint8), offsets
+
+def decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = bytes(blob); off = offsets.tolist()
+    return [data[off[i]:off[i + 1]].decode("utf-8") for i in range(len(off) - 1)]
+
+def csr_positions(indptr: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Positions in a CSR payload array of the concatenated rows of ids."""
+    starts = indptr[ids]; counts = indptr[np.asarray(ids) + 1] - starts
+    return np.arange(int(counts.sum()), dtype=np.int64) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+
+def csr_find(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized binary search of cols within the (sorted) CSR rows: (lower-bound position, found)."""
+    rows = np.asarray(rows, dtype=np.int64); cols = np.asarray(cols)
+    lo = indptr[rows].astype(np.int64); hi = indptr[rows + 1].astype(np.int64); end = hi.copy()
+    if len(indices) == 0: return lo, np.zeros(len(rows), dtype=bool)
+    active = lo < hi
+    while active.any():
+        mid = (lo + hi) // 2
+        right = active & (indices[np.minimum(mid, len(indices) - 1)] < cols)
+        lo = np.where(right, mid + 1, lo); hi = np.where(active & ~right, mid, hi)
+        active = lo < hi
+    return lo, (lo < end) & (indices[np.minimum(lo, len(indices) - 1)] == cols)
+
+def grow_indptr(indptr: np.ndarray, n: int) -> np.ndarray:
+    """indptr extended with empty rows up to n rows."""
+    if len(indptr) - 1 >= n: return indptr
+    return np.concatenate([indptr, np.full(n + 1 - len(indptr), indptr[-1], dtype=indptr.dtype)])
+
+def writable(a: np.ndarray) -> np.ndarray:
+    """a itself, or a private copy when it is a read-only memory map."""
+    return a if a.flags.writeable else np.array(a)
+
+class NameTable:
+    """
+    Interned strings. id -> name decodes from a utf-8 blob (which may be memory-mapped);
+    the decoded list and the name -> id map are only built on first use.
+    """
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self._names: Optional[List[str]] = None
+        self._ids: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_list(cls, names: List[str]) -> "NameTable":
+        t = cls(*encode_strings(names)); t._names = list(names)
+        return t
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if self._names is not None: return self._names[i]
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def to_list(self) -> List[str]:
+        if self._names is None: self._names = decode_strings(self.blob, self.offsets)
+        return self._names
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def id_of(self, name: str) -> Optional[int]:
+        ids = self._ids
+        if ids is None:
+            ids = {n: i for i, n in enumerate(self.to_list())}
+            self._ids = ids  # published complete: threads may race to build it, never see it half built
+        return ids.get(name)
+
+    def ids_of(self, names: Iterable[str]) -> np.ndarray:
+        """Ids of names, -1 where unknown."""
+        return np.asarray([-1 if i is None else i for i in map(self.id_of, names)], dtype=np.int64)
+
+    def extend(self, names: List[str]):
+        """Append new names in place; they get the next ids."""
+        if not names: return
+        blob, offsets = encode_strings(names); start = len(self)
+        self.blob = np.concatenate([self.blob, blob]); self.offsets = np.concatenate([self.offsets, offsets[1:] + self.offsets[-1]])
+        if self._names is not None: self._names.extend(names)
+        if self._ids is not None: self._ids.update((n, start + k) for k, n in enumerate(names))
+
+    def nbytes(self) -> int:
+        return int(self.blob.nbytes + self.offsets.nbytes)
+
+class IdGraph(Mapping):
+    """
+    Co-authorship graph over interned author ids (see CSRGraph, bipartite.BipartiteGraph).
+    Scoring only goes through expand / degree_of / connected_ids, so either storage can be used.
+    As a Mapping it is a string-keyed view compatible with Adjacency (graph[name] -> Counter of neighbor names).
+    """
+    names: NameTable
+    fractional_links = False  # True when some co-author links weigh less than one paper (bipartite "downweight" policy, time decay)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.names)
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self.names.id_of(name)
+
+    @abstractmethod
+    def expand(self, ids: np.ndarray, with_weights: bool = False):
+        """Neighbor lists of ids as (row, neighbor id[, weight]) arrays; row indexes into ids, neighbors ascending per row."""
+
+    def expand_beyond(self, u: int, ids: np.ndarray, with_weights: bool = False):
+        """expand(ids) for the second hop from u. A storage may leave out what is only reached through u's own
+        papers (u's neighbors, or weight shared with them), so rows are exact for every author not adjacent to u."""
+        return self.expand(ids, with_weights)
+
+    @abstractmethod
+    def degree_of(self, ids: np.ndarray) -> np.ndarray:
+        """Number of distinct co-authors of each of ids."""
+
+    @abstractmethod
+    def connected_ids(self) -> np.ndarray:
+        """Sorted ids of authors with at least one co-author."""
+
+    def neighbors(self, i: int) -> np.ndarray:
+        return self.expand(np.array([i]))[1]
+
+    def neighbor_weights(self, i: int) -> np.ndarray:
+        return self.expand(np.array([i]), with_weights=True)[2]
+
+    def nodes(self):
+        """Authors with at least one co-author (the nodes of the original adjacency dict)."""
+        return self.keys()
+
+    def to_adjacency(self):
+        names = self.names.to_list(); adj = defaultdict(Counter)
+        for i in self.connected_ids().tolist(): adj[names[i]] = self[names[i]]
+        return adj
+
+    # Mapping (compatibility view)
+    def __getitem__(self, name: str) -> Counter:
+        i = self.names.id_of(name)
+        if i is None or self.degree_of(np.array([i]))[0] == 0: raise KeyError(name)
+        return Counter(dict(zip((self.names[j] for j in self.neighbors(i).tolist()), self.neighbor_weights(i).tolist())))
+
+    def __contains__(self, name) -> bool:
+        i = self.names.id_of(name) if isinstance(name, str) else None
+        return i is not None and self.degree_of(np.array([i]))[0] > 0
+
+    def __iter__(self):
+        names = self.names.to_list()
+        return (names[i] for i in self.connected_ids().tolist())
+
+    def __len__(self):
+        return len(self.connected_ids())
+
+class CSRGraph(IdGraph):
+    """
+    Undirected weighted co-authorship graph in CSR form.
+    Row i of (indptr, indices, weights) lists the neighbors of author i, sorted by id; degree is precomputed.
+    """
+    def __init__(self, names: NameTable, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.names = names
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.degree = np.diff(indptr)
+        self.fractional_links = weights.dtype.kind == "f" and bool(np.any(weights < 1))  # decayed weights (temporal half_life)
+
+    @classmethod
+    def from_edges(cls, names: NameTable, u: np.ndarray, v: np.ndarray, w: np.ndarray) -> "CSRGraph":
+        """Build from distinct undirected pairs (each pair given once, u != v)."""
+        n = len(names)
+        src = np.concatenate([u, v]).astype(np.int64); dst = np.concatenate([v, u]).astype(np.int32)
+        ww = np.concatenate([w, w]).astype(np.int32)
+        order = np.lexsort((dst, src))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(names, indptr, dst[order], ww[order])
+
+    @classmethod
+    def from_adjacency(cls, adj, extra_names: Iterable[str] = ()) -> "CSRGraph":
+        names = [n for n, nb in adj.items() if nb]; ids = {n: i for i, n in enumerate(names)}
+        for a in extra_names:
+            if a not in ids: ids[a] = len(names); names.append(a)
+        u, v, w = [], [], []
+        for a, nb in adj.items():
+            ia = ids[a]
+            for b, c in nb.items():
+                if ia < ids[b]: u.append(ia); v.append(ids[b]); w.append(c)
+        return cls.from_edges(NameTable.from_list(names), np.asarray(u, dtype=np.int64), np.asarray(v, dtype=np.int64), np.asarray(w, dtype=np.int64))
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def add_edges(self, u: np.ndarray, v: np.ndarray, w: np.ndarray):
+        """
+        Merge distinct undirected pairs (u != v) in place: existing edges gain w, new ones are inserted in row order.
+        Ids may include names appended since the build. Existing entries are located by binary search, so
+        only the insertion itself touches the whole payload.
+        """
+        n = len(self.names); indptr = grow_indptr(self.indptr, n)
+        src = np.concatenate([u, v]).astype(np.int64); dst = np.concatenate([v, u]).astype(np.int32); ww = np.concatenate([w, w]).astype(np.int32)
+        order = np.lexsort((dst, src)); src, dst, ww = src[order], dst[order], ww[order]
+        pos, found = csr_find(indptr, self.indices, src, dst)
+        weights = writable(self.weights)
+        weights[pos[found]] += ww[found]
+        new = ~found
+        if new.any():
+            self.indices = np.insert(self.indices, pos[new], dst[new]); weights = np.insert(weights, pos[new], ww[new])
+            indptr = indptr + np.concatenate([[0], np.cumsum(np.bincount(src[new], minlength=n))])
+        self.indptr, self.weights = indptr, weights
+        self.degree = np.diff(indptr)
+        self.__dict__.pop("_name_index", None)
+
+    def neighbors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbor_weights(self, i: int) -> np.ndarray:
+        return self.weights[self.indptr[i]:self.indptr[i + 1]]
+
+    def expand(self, ids: np.ndarray, with_weights: bool = False):
+        ids = np.asarray(ids, dtype=np.int64)
+        pos = csr_positions(self.indptr, ids); rows = np.repeat(np.arange(len(ids)), self.degree[ids])
+        return (rows, self.indices[pos], self.weights[pos]) if with_weights else (rows, self.indices[pos])
+
+    def degree_of(self, ids: np.ndarray) -> np.ndarray:
+        return self.degree[ids]
+
+    def connected_ids(self) -> np.ndarray:
+        return np.flatnonzero(self.degree)
+
+    def nbytes(self) -> int:
+        return int(self.indptr.nbytes + self.indices.nbytes + self.weights.nbytes + self.degree.nbytes + self.names.nbytes())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.degree))
+
+class AuthorJournalsCSR(Mapping):
+    """
+    Author -> journal ids in CSR form, rows aligned with a CSRGraph's author ids, plus the inverted
+    journal -> authors posting lists (built on first use).
+    As a Mapping it is compatible with AuthorJournals (journals[name] -> set of venue names).
+    """
+    def __init__(self, authors: NameTable, journals: NameTable, indptr: np.ndarray, indices: np.ndarray):
+        self.authors = authors
+        self.journals = journals
+        self.indptr = indptr
+        self.indices = indices
+        self._postings: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lower_ids: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def from_pairs(cls, authors: NameTable, journals: NameTable, author_ids: np.ndarray, journal_ids: np.ndarray) -> "AuthorJournalsCSR":
+        """Build from (author, journal) pairs; duplicates are dropped."""
+        keys = np.unique(author_ids.astype(np.int64) * max(len(journals), 1) + journal_ids.astype(np.int64))
+        a = keys // max(len(journals), 1); j = (keys % max(len(journals), 1)).astype(np.int32)
+        indptr = np.zeros(len(authors) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(a, minlength=len(authors)), out=indptr[1:])
+        return cls(authors, journals, indptr, j)
+
+    @classmethod
+    def from_mapping(cls, author_journals, authors: NameTable) -> "AuthorJournalsCSR":
+        journals = sorted({j for js in author_journals.values() for j in js}); jids = {j: i for i, j in enumerate(journals)}
+        a, j = [], []
+        for name, js in author_journals.items():
+            i = authors.id_of(name)
+            if i is None: continue
+            for x in js: a.append(i); j.append(jids[x])
+        return cls.from_pairs(authors, NameTable.from_list(journals), np.asarray(a, dtype=np.int64), np.asarray(j, dtype=np.int64))
+
+    def add_pairs(self, author_ids: np.ndarray, journal_ids: np.ndarray):
+        """Insert (author, journal) pairs in place (known pairs are skipped); ids may include appended names."""
+        m = max(len(self.journals), 1)
+        keys = np.unique(np.asarray(author_ids, dtype=np.int64) * m + np.asarray(journal_ids, dtype=np.int64))
+        a = keys // m; j = (keys % m).astype(np.int32)
+        indptr = grow_indptr(self.indptr, len(self.authors))
+        pos, found = csr_find(indptr, self.indices, a, j); new = ~found
+        if new.any():
+            self.indices = np.insert(self.indices, pos[new], j[new])
+            indptr = indptr + np.concatenate([[0], np.cumsum(np.bincount(a[new], minlength=len(self.authors)))])
+        self.indptr = indptr
+        self._postings = None; self._lower_ids = None
+
+    def journals_of(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def counts(self, ids: np.ndarray) -> np.ndarray:
+        return self.indptr[np.asarray(ids) + 1] - self.indptr[ids]
+
+    def postings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(indptr, author ids) of the journal -> authors lists; authors are sorted within each journal."""
+        postings = self._postings
+        if postings is None:
+            rows = np.repeat(np.arange(len(self.authors), dtype=np.int32), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            jindptr = np.zeros(len(self.journals) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=len(self.journals)), out=jindptr[1:])
+            postings = self._postings = (jindptr, rows[order])
+        return postings
+
+    def posting_size(self, jids: np.ndarray) -> int:
+        jindptr, _ = self.postings()
+        return int(np.sum(jindptr[np.asarray(jids) + 1] - jindptr[jids]))
+
+    def authors_of(self, jids: np.ndarray) -> np.ndarray:
+        """Sorted distinct authors publishing in any of jids."""
+        jindptr, authors = self.postings()
+        return np.unique(authors[csr_positions(jindptr, np.asarray(jids, dtype=np.int64))])
+
+    def journal_ids_named(self, names: Iterable[str]) -> np.ndarray:
+        """Ids of journals whose stripped, lower-cased name is in names (compared the same way)."""
+        lower_ids = self._lower_ids
+        if lower_ids is None:
+            # built in a local and published once complete: service threads may call this concurrently
+            lower_ids = defaultdict(list)
+            for j, name in enumerate(self.journals.to_list()): lower_ids[name.strip().lower()].append(j)
+            self._lower_ids = lower_ids
+        wanted = {n.strip().lower() for n in names if n.strip()}
+        return np.asarray(sorted(j for n in wanted for j in lower_ids.get(n, ())), dtype=np.int64)
+
+    def nbytes(self) -> int:
+        return int(self.indptr.nbytes + self.indices.nbytes + self.journals.nbytes())
+
+    def to_mapping(self) -> Dict[str, Set[str]]:
+        out = defaultdict(set); counts = np.diff(self.indptr)
+        for i in np.flatnonzero(counts).tolist(): out[self.authors[i]] = self[self.authors[i]]
+        return out
+
+    # Mapping (compatibility view)
+    def __getitem__(self, name: str) -> Set[str]:
+        i = self.authors.id_of(name)
+        if i is None or self.indptr[i + 1] == self.indptr[i]: raise KeyError(name)
+        return {self.journals[j] for j in self.journals_of(i).tolist()}
+
+    def __contains__(self, name) -> bool:
+        i = self.authors.id_of(name) if isinstance(name, str) else None
+        return i is not None and self.indptr[i + 1] > self.indptr[i]
+
+    def __iter__(self):
+        names = self.authors.to_list()
+        return (names[i] for i in np.flatnonzero(np.diff(self.indptr)).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.indptr)))
@@ -1,7 +1,16 @@
 # data_loader.py
-import pandas as pd, re
+import os, re
+import pandas as pd, numpy as np
 from collections import Counter
-from typing import Optional
+from typing import Optional, Iterable
+from instrument import stage
+from progress import checkpoint
+
+DEFAULT_AUTHORS_COL = "authors"
+DEFAULT_YEAR_COL = "mdate"
+DEFAULT_VENUE_COL = "journal"
+DEFAULT_MAX_TRAIN_ROWS = 200_000
+YEAR_PATTERN = r"((?:19|20)\d{2})"
 
 def parse_year_like(x) -> Optional[int]:
     if pd.isna(x): return None
@@ -13,15 +22,39 @@ def parse_year_like(x) -> Optional[int]:
     try: return int(float(s))
     except: return None
 
-def pick_split_year(csv_path: str, year_col: str, train_frac: float = 0.8, chunksize: int = 20000) -> Optional[int]:
-    counts = Counter()
-    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str):
-        if year_col not in chunk.columns: continue
-        yrs = chunk[year_col].map(parse_year_like).dropna().astype(int)
-        counts.update(yrs.values.tolist())
+def parse_years(values: pd.Series) -> np.ndarray:
+    """Vectorized parse_year_like: float array of years, NaN where nothing parses."""
+    s = values.astype("string")
+    found = pd.to_numeric(s.str.extract(YEAR_PATTERN, expand=False), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    num = pd.to_numeric(s, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    num = np.where(np.isfinite(num), np.trunc(num), np.nan)
+    return np.where(np.isnan(found), num, found)
+
+def read_columns(csv_path, columns: Iterable[str], chunksize: int = 20000, skip_rows: int = 0):
+    """Chunked reader that only materializes the requested columns (missing ones are skipped).
+    csv_path may be an open binary file (its tell() then tracks the bytes read); skip_rows skips data rows."""
+    wanted = set(columns)
+    return pd.read_csv(csv_path, chunksize=chunksize, dtype=str, usecols=lambda c: c in wanted,
+                       skiprows=range(1, skip_rows + 1) if skip_rows else None)
+
+def year_counts(years: np.ndarray) -> Counter:
+    ys = years[~np.isnan(years)].astype(np.int64)
+    vals, cnts = np.unique(ys, return_counts=True)
+    return Counter(dict(zip(vals.tolist(), cnts.tolist())))
+
+def split_year_from_counts(counts: Counter, train_frac: float = 0.8) -> Optional[int]:
     if not counts: return None
     total = sum(counts.values()); target = total * train_frac; cum = 0
     for y, cnt in sorted(counts.items()):
         cum += cnt
         if cum >= target: return y
     return max(counts.keys())
+
+def pick_split_year(csv_path: str, year_col: str, train_frac: float = 0.8, chunksize: int = 20000) -> Optional[int]:
+    counts = Counter(); rows = 0; size = os.path.getsize(csv_path)
+    with stage("pick_split_year") as st, open(csv_path, "rb") as f:
+        for chunk in read_columns(f, [year_col], chunksize):
+            st.add(rows=len(chunk)); rows += len(chunk); checkpoint("pick_split_year", rows, f.tell(), size)
+            if year_col not in chunk.columns: continue
+            counts.update(year_counts(parse_years(chunk[year_col])))
+        return split_year_from_counts(counts, train_frac)
@@ -0,0 +1,209 @@
+# evaluate.py
+"""
+Temporal holdout evaluation: does a configuration still predict who collaborates next?
+
+The graph is built from the rows up to the split year (as the app does); co-author pairs that first
+appear after the split year, between two authors already in the graph, are the ground truth.
+For a seeded sample of authors with at least one new co-author, the top-k recommendations are
+scored with precision@k, recall@k, MRR and coverage, next to per-query latency percentiles, build
+time and peak memory. Workers memory-map the same graph snapshot, as in batch_recommend.
+
+    python evaluate.py --csv dataset/dblp_2021_2023.csv --sample 2000 --k 5 10 25 --out eval.json
+"""
+import os, sys, json, time, random, argparse
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from data_loader import DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, DEFAULT_MAX_TRAIN_ROWS, parse_years, read_columns
+from graph_builder import explode_authors, default_workers
+from graph_cache import GraphCache, DEFAULT_CACHE_DIR, cached_ingest, ensure_snapshot, load_snapshot
+from csr_graph import IdGraph
+from scoring import CANDIDATE_MODES
+from recommender import recommend_for_id, DEFAULT_WEIGHTS, DEFAULT_PATH_WEIGHTS
+from bipartite import MEGA_PAPER_POLICIES, DEFAULT_MAX_TEAM
+from instrument import peak_rss_mb
+
+DEFAULT_KS = (5, 10, 25)
+
+class Holdout:
+    """New co-authors per target after the split year, as CSR over author ids (targets sorted)."""
+    def __init__(self, targets: np.ndarray, indptr: np.ndarray, truth: np.ndarray, stats: Dict):
+        self.targets = targets
+        self.indptr = indptr
+        self.truth = truth
+        self.stats = stats
+
+    def truth_of(self, k: int) -> np.ndarray:
+        return self.truth[self.indptr[k]:self.indptr[k + 1]]
+
+def _row_pairs(chunk: pd.DataFrame, authors_col: str, rows: np.ndarray, index: pd.Index, among: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """Ordered co-author pairs (both directions) of the chunk rows marked in rows, authors as graph ids (-1 unknown);
+    with among, only pairs of those (sorted) author ids."""
+    e = explode_authors(chunk[authors_col]); e = e[rows[e["row"].to_numpy()]]
+    e = e.assign(author=index.get_indexer(e["author"]))
+    if among is not None: e = e[np.isin(e["author"].to_numpy(), among, assume_unique=True)]
+    m = e.merge(e, on="row", suffixes=("_u", "_v"))
+    return m[m["author_u"] != m["author_v"]]
+
+def holdout_pairs(csv_path, authors_col, year_col, graph: IdGraph, split_year: int, chunksize: int = 20000,
+                  used_rows: Optional[int] = None) -> Holdout:
+    """
+    Co-author pairs of the rows dated after split_year whose authors are both in graph and never co-authored up to split_year.
+    used_rows is the number of rows dated up to split_year the graph was built from; when it covers all of them (or
+    is None), pairs already connected in graph are exactly the earlier ones. Otherwise (a max_rows cap) a second read
+    drops the pairs of the earlier rows left out of the graph, so they are not counted as new.
+    """
+    index = pd.Index(graph.names.to_list()); frames = []; rows = pairs_seen = unknown = earlier_rows = 0
+    for chunk in read_columns(csv_path, [authors_col, year_col], chunksize):
+        if authors_col not in chunk.columns or year_col not in chunk.columns: continue
+        years = parse_years(chunk[year_col]); later = years > split_year
+        rows += int(later.sum()); earlier_rows += int((years <= split_year).sum())
+        m = _row_pairs(chunk, authors_col, later, index)
+        pairs_seen += len(m) // 2
+        known = (m["author_u"] >= 0) & (m["author_v"] >= 0)
+        unknown += int((~known).sum()) // 2
+        frames.append(m.loc[known, ["author_u", "author_v"]])
+    n = graph.num_nodes
+    keys = np.unique(np.concatenate([f["author_u"].to_numpy(np.int64) * n + f["author_v"].to_numpy(np.int64) for f in frames])) if frames else np.zeros(0, dtype=np.int64)
+    u, v = keys // n, keys % n
+    srcs = np.unique(u); rows_, dst = graph.expand(srcs)
+    new = ~np.isin(keys, srcs[rows_] * n + dst)  # drop pairs already connected before the split
+    uncapped = 0
+    if used_rows is not None and used_rows < earlier_rows and new.any():
+        among = np.unique(u[new])  # pairs are listed both ways, so this holds both ends of every candidate pair
+        for chunk in read_columns(csv_path, [authors_col, year_col], chunksize):
+            if authors_col not in chunk.columns or year_col not in chunk.columns: continue
+            m = _row_pairs(chunk, authors_col, parse_years(chunk[year_col]) <= split_year, index, among)
+            before = new & np.isin(keys, m["author_u"].to_numpy(np.int64) * n + m["author_v"].to_numpy(np.int64))
+            uncapped += int(before.sum()) // 2; new &= ~before
+    u, v = u[new], v[new]
+    targets, counts = np.unique(u, return_counts=True)
+    indptr = np.zeros(len(targets) + 1, dtype=np.int64); np.cumsum(counts, out=indptr[1:])
+    stats = {"test_rows": rows, "test_pair_occurrences": pairs_seen, "pairs_with_unknown_author": unknown,
+             "new_pairs": int(new.sum()) // 2, "repeat_pairs": int((~new).sum()) // 2, "repeat_pairs_beyond_max_rows": uncapped,
+             "targets_with_new_pairs": len(targets)}
+    return Holdout(targets, indptr, v, stats)
+
+_worker = {}
+
+def _init_worker(snapshot_dir: str, params: Dict):
+    graph, journals, _ = load_snapshot(snapshot_dir)
+    _worker.update(graph=graph, journals=journals, params=params)
+
+def _eval_shard(shard: List[Tuple[int, np.ndarray]]):
+    """(ranks of the true co-authors found, #truth, #recs, seconds) per target, plus the recommended ids."""
+    graph, journals, p = _worker["graph"], _worker["journals"], _worker["params"]
+    out = []; recommended = set()
+    for u, truth in shard:
+        t0 = time.perf_counter()
+        recs = recommend_for_id(graph, journals, u, p["topk"], p["include_neighbors"], w_aa=p["w_aa"], w_cn=p["w_cn"], w_jj=p["w_jj"],
+                                candidate_mode=p["candidate_mode"], w_ra=p["w_ra"], w_katz=p["w_katz"], w_ppr=p["w_ppr"])
+        secs = time.perf_counter() - t0
+        ids = [graph.names.id_of(r[0]) for r in recs]; wanted = set(truth.tolist())
+        out.append(([rank for rank, v in enumerate(ids, 1) if v in wanted], len(wanted), len(ids), secs))
+        recommended.update(ids)
+    return out, recommended
+
+def summarize(results: List[Tuple[List[int], int, int, float]], ks: Sequence[int], recommended: set, num_authors: int) -> Dict:
+    """precision@k, recall@k, hit rate@k, MRR, coverage and latency percentiles over per-target results."""
+    if not results: return {"targets": 0}
+    n = len(results); quality = {}
+    for k in ks:
+        hits = np.array([sum(1 for r in ranks if r <= k) for ranks, _, _, _ in results], dtype=float)
+        truth = np.array([t for _, t, _, _ in results], dtype=float)
+        quality[f"precision@{k}"] = round(float((hits / k).mean()), 6)
+        quality[f"recall@{k}"] = round(float((hits / truth).mean()), 6)
+        quality[f"hit_rate@{k}"] = round(float((hits > 0).mean()), 6)
+    quality["mrr"] = round(float(np.mean([1.0 / ranks[0] if ranks else 0.0 for ranks, _, _, _ in results])), 6)
+    quality["coverage"] = round(sum(1 for _, _, c, _ in results if c > 0) / n, 6)  # targets that got any recommendation
+    quality["catalog_coverage"] = round(len(recommended) / num_authors, 6) if num_authors else None
+    ms = np.array([s for _, _, _, s in results]) * 1000.0
+    latency = {"mean": round(float(ms.mean()), 3), **{f"p{q}": round(float(np.percentile(ms, q)), 3) for q in (50, 90, 95, 99)},
+               "max": round(float(ms.max()), 3)}
+    return {"targets": n, "quality": quality, "latency_ms": latency}
+
+def run_evaluation(snapshot_dir: str, holdout: Holdout, ks: Sequence[int] = DEFAULT_KS, sample: Optional[int] = 1000, seed: int = 0,
+                   include_neighbors: bool = False, weights=DEFAULT_WEIGHTS, candidate_mode: str = "two_hop",
+                   workers: Optional[int] = None, shard_size: int = 100, path_weights=DEFAULT_PATH_WEIGHTS) -> Dict:
+    """Recommend for a seeded sample of holdout targets in a process pool and aggregate the metrics."""
+    w_jj, w_aa, w_cn = weights; w_ra, w_katz, w_ppr = path_weights
+    params = {"topk": max(ks), "include_neighbors": include_neighbors, "w_aa": w_aa, "w_cn": w_cn, "w_jj": w_jj, "candidate_mode": candidate_mode,
+              "w_ra": w_ra, "w_katz": w_katz, "w_ppr": w_ppr}
+    picks = list(range(len(holdout.targets)))
+    if sample is not None and sample < len(picks): picks = sorted(random.Random(seed).sample(picks, sample))
+    tasks = [(int(holdout.targets[k]), holdout.truth_of(k)) for k in picks]
+    shards = [tasks[i:i + shard_size] for i in range(0, len(tasks), shard_size)]
+    workers = max(1, workers or os.cpu_count() or 1)
+    t0 = time.perf_counter(); results = []; recommended = set()
+    if workers == 1:
+        _init_worker(snapshot_dir, params); outs = map(_eval_shard, shards); pool = None
+    else:
+        pool = mp.get_context().Pool(workers, initializer=_init_worker, initargs=(snapshot_dir, params))
+        outs = pool.imap_unordered(_eval_shard, shards)
+    try:
+        for rows, recs in outs: results.extend(rows); recommended.update(recs)
+    finally:
+        if pool is not None: pool.close(); pool.join()
+    elapsed = time.perf_counter() - t0
+    graph, _, _ = load_snapshot(snapshot_dir)
+    report = summarize(results, ks, recommended, len(graph.connected_ids()))
+    report.update(params=params, ks=list(ks), sample_seed=seed, workers=workers, seconds=round(elapsed, 3),
+                  queries_per_sec=round(len(results) / elapsed, 2) if elapsed > 0 else None)
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Temporal holdout evaluation of the recommender.")
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--out", default=None, help="also write the JSON report here")
+    ap.add_argument("--split-year", type=int, default=None)
+    ap.add_argument("--train-frac", type=float, default=0.8)
+    ap.add_argument("--max-rows", type=int, default=DEFAULT_MAX_TRAIN_ROWS, help="0 = all rows")
+    ap.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_KS))
+    ap.add_argument("--sample", type=int, default=1000, help="authors to evaluate (0 = all with new co-authors)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--include-neighbors", action="store_true")
+    ap.add_argument("--candidate-mode", choices=CANDIDATE_MODES, default="two_hop")
+    ap.add_argument("--weights", type=float, nargs=3, metavar=("JJ", "AA", "CN"), default=DEFAULT_WEIGHTS)
+    ap.add_argument("--path-weights", type=float, nargs=3, metavar=("RA", "KATZ", "PPR"), default=DEFAULT_PATH_WEIGHTS,
+                    help="resource allocation, truncated Katz, personalized PageRank")
+    ap.add_argument("--incidence", action="store_true")
+    ap.add_argument("--max-team", type=int, default=DEFAULT_MAX_TEAM, help="0 = no limit")
+    ap.add_argument("--mega-policy", choices=MEGA_PAPER_POLICIES, default="keep")
+    ap.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    ap.add_argument("--ingest-workers", type=int, default=1, help="processes parsing the CSV on a cache miss (0 = one per CPU)")
+    args = ap.parse_args(argv)
+
+    max_rows = args.max_rows or None; chunksize = 20000
+    cols = (DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL)
+    storage = (args.incidence, args.max_team or None, args.mega_policy)
+    cache = GraphCache(args.cache_dir)
+    t0 = time.perf_counter()
+    result, hit = cached_ingest(cache, args.csv, *cols, args.split_year, args.train_frac, max_rows, chunksize, True, *storage,
+                                workers=args.ingest_workers or default_workers())
+    build_secs = time.perf_counter() - t0
+    if result.split_year is None: raise SystemExit("No parsable years in the CSV; a temporal split is impossible.")
+    key = cache.key_for(args.csv, *cols, args.split_year, args.train_frac, max_rows, chunksize, *storage)
+    try: snapshot = ensure_snapshot(cache, key, result)
+    except OSError as e: raise SystemExit(f"Cannot write the graph snapshot to {args.cache_dir} ({e}); workers load the graph from it, pass a writable --cache-dir.")
+    print(f"graph {'from cache' if hit else 'built'} in {build_secs:.1f}s: {len(result.nodes)} nodes, split year {result.split_year}", file=sys.stderr)
+    t0 = time.perf_counter()
+    holdout = holdout_pairs(args.csv, DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, result.adj, result.split_year, chunksize, result.used_rows)
+    holdout_secs = time.perf_counter() - t0
+    print(f"holdout: {holdout.stats['new_pairs']} new pairs for {len(holdout.targets)} authors", file=sys.stderr)
+    report = run_evaluation(snapshot, holdout, args.k, args.sample or None, args.seed, args.include_neighbors,
+                            tuple(args.weights), args.candidate_mode, args.workers, path_weights=tuple(args.path_weights))
+    report.update(csv=os.path.abspath(args.csv), split_year=result.split_year, training_rows=result.used_rows,
+                  graph={"nodes": len(result.nodes), "edges": result.adj.num_edges, "storage": "bipartite" if args.incidence else "csr",
+                         "max_team": storage[1], "mega_policy": args.mega_policy, "cache_hit": hit},
+                  holdout=holdout.stats, build_seconds=round(build_secs, 3), holdout_seconds=round(holdout_secs, 3),
+                  peak_rss_mb={"main": peak_rss_mb(), "workers": peak_rss_mb(children=True)})
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 # graph_builder.py
-import pandas as pd
-from collections import Counter, defaultdict
-from itertools import combinations
-from typing import Dict, Set, Tuple
-from data_loader import parse_year_like
+import os
+import pandas as pd, numpy as np
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Set, Tuple, List, Optional, NamedTuple
+from data_loader import parse_years, read_columns, year_counts, split_year_from_counts
+from csr_graph import CSRGraph, AuthorJournalsCSR, NameTable
+from bipartite import BipartiteGraph, DEFAULT_MAX_TEAM
+from instrument import stage
+from progress import checkpoint
 
 Adjacency = Dict[str, Counter]
 AuthorJournals = Dict[str, Set[str]]
@@ -19,23 +24,311 @@ def clean_venue(raw):
     v = str(raw).strip()
     return "" if v.lower() in BAD_VENUES else v
 
-def build_graph_and_journals(csv_path, authors_col, year_col, venue_col, split_year, max_rows=200000, chunksize=20000) -> Tuple[Adjacency, Set[str], AuthorJournals, int]:
-    adj = defaultdict(Counter); author_journals = defaultdict(set); nodes_seen = set(); used_rows = 0
-    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str):
-        df = chunk
-        if split_year is not None and year_col in df.columns:
-            yrs = df[year_col].map(parse_year_like)
-            mask = yrs.apply(lambda v: (v is not None and v <= split_year))
-            df = df[mask.fillna(False)].copy()
-        if authors_col not in df.columns: continue
-        for _, row in df.iterrows():
-            authors = split_authors(row.get(authors_col, ""))
-            venue_val = clean_venue(row.get(venue_col, "")) if venue_col in df.columns else ""
-            if len(authors) >= 2:
-                for u, v in combinations(authors, 2):
-                    adj[u][v] += 1; adj[v][u] += 1; nodes_seen.add(u); nodes_seen.add(v)
-            if venue_val:
-                for a in authors: author_journals[a].add(venue_val)
-        used_rows += len(df)
-        if used_rows >= max_rows: break
+def explode_authors(authors: pd.Series) -> pd.DataFrame:
+    """Vectorized split_authors: one (row, author) record per distinct author of each row."""
+    s = authors.reset_index(drop=True).astype("string").str.split(";").explode().str.strip()
+    df = pd.DataFrame({"row": s.index.to_numpy(), "author": s.to_numpy(dtype=object, na_value=None)})
+    df = df[df["author"].notna() & (df["author"] != "")]
+    return df.drop_duplicates(["row", "author"], ignore_index=True)
+
+def clean_venues(venues: pd.Series) -> np.ndarray:
+    """Vectorized clean_venue: object array with "" for missing/placeholder venues."""
+    v = venues.reset_index(drop=True).astype("string").str.strip()
+    bad = v.isna() | v.str.lower().isin(BAD_VENUES)
+    return v.mask(bad, "").to_numpy(dtype=object, na_value="")
+
+class Interner:
+    """Dense integer ids for strings, assigned in first-seen order."""
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, values: np.ndarray) -> np.ndarray:
+        codes, uniq = pd.factorize(values)
+        gids = np.empty(len(uniq), dtype=np.int64)
+        for k, s in enumerate(uniq.tolist()):
+            i = self.ids.get(s)
+            if i is None: i = self.ids[s] = len(self.names); self.names.append(s)
+            gids[k] = i
+        return gids[codes]
+
+class ChunkParts(NamedTuple):
+    dated: bool          # False when the chunk has no year column (rows pass any split filter)
+    row_years: Counter   # year -> number of rows (None: the year does not parse)
+    pairs: pd.DataFrame  # year (float, NaN when undated), u, v, w as interned author ids with u < v
+    venues: pd.DataFrame # year, author, venue as interned ids (distinct)
+    authorships: pd.DataFrame  # year, paper, author, pos (incidence mode only; paper = row number in the file)
+
+class ParsedCSV(NamedTuple):
+    parts: List[ChunkParts]
+    year_counts: Counter
+    authors: Interner
+    venues: Interner
+
+class IngestResult(NamedTuple):
+    split_year: Optional[int]
+    year_counts: Counter
+    adj: Adjacency
+    nodes: Set[str]
+    author_journals: AuthorJournals
+    used_rows: int
+
+def _empty(*columns: str) -> pd.DataFrame:
+    return pd.DataFrame({c: np.array([], dtype=np.int64) for c in columns})
+
+def parse_chunk(chunk: pd.DataFrame, authors_col: str, year_col: str, venue_col: str, authors: Interner, venues: Interner,
+                incidence: bool = False, row_offset: int = 0) -> Tuple[np.ndarray, Optional[ChunkParts]]:
+    """Parse one CSV chunk into year codes and aggregated co-author pairs / author venues (interned ids).
+    With incidence, (paper, author) records are kept instead of the pairs, so the chunk costs O(authorships)."""
+    n = len(chunk); dated = year_col in chunk.columns
+    years = parse_years(chunk[year_col]) if dated else np.full(n, np.nan)
+    if authors_col not in chunk.columns: return years, None
+    row_years = year_counts(years); undated = int(np.isnan(years).sum())
+    if undated: row_years[None] = undated
+    e = explode_authors(chunk[authors_col])
+    e["author"] = authors.intern(e["author"].to_numpy())
+    rows = e["row"].to_numpy()
+    if incidence:
+        pairs = _empty("year", "u", "v", "w")
+        authorships = pd.DataFrame({"year": years[rows], "paper": rows + row_offset, "author": e["author"].to_numpy(),
+                                    "pos": e.groupby("row").cumcount().to_numpy()})
+    else:
+        # pairs are taken in author position order (not id order), so the frame does not depend on how ids were assigned
+        e["pos"] = e.groupby("row").cumcount().to_numpy()
+        m = e.merge(e, on="row", suffixes=("_u", "_v"))
+        m = m[m["pos_u"] < m["pos_v"]]
+        a, b = m["author_u"].to_numpy(), m["author_v"].to_numpy()
+        pairs = (pd.DataFrame({"year": years[m["row"].to_numpy()], "u": np.minimum(a, b), "v": np.maximum(a, b)})
+                 .groupby(["year", "u", "v"], sort=False, dropna=False).size().rename("w").reset_index())
+        e = e.drop(columns="pos")
+        authorships = _empty("year", "paper", "author", "pos")
+    if venue_col in chunk.columns:
+        vv = clean_venues(chunk[venue_col])[rows]
+        keep = vv != ""
+        av = pd.DataFrame({"year": years[rows[keep]], "author": e["author"].to_numpy()[keep], "venue": venues.intern(vv[keep])}).drop_duplicates()
+    else:
+        av = _empty("year", "author", "venue")
+    return years, ChunkParts(dated, row_years, pairs, av, authorships)
+
+def _rows_in_split(p: ChunkParts, split_year: Optional[int]) -> int:
+    if split_year is None or not p.dated: return sum(p.row_years.values())
+    return sum(c for y, c in p.row_years.items() if y is not None and y <= split_year)
+
+def _in_split(df: pd.DataFrame, p: ChunkParts, split_year: Optional[int]) -> pd.DataFrame:
+    if split_year is None or not p.dated: return df
+    y = df["year"]
+    return df[y.notna() & (y <= split_year)]
+
+def _of_years(df: pd.DataFrame, years: List[Optional[int]]) -> pd.Series:
+    """Rows of df dated in years (None: undated rows)."""
+    y = df["year"]; mask = y.isin([v for v in years if v is not None])
+    return mask | y.isna() if None in years else mask
+
+def _trim(p: ChunkParts, seen: Counter, max_rows: Optional[int]) -> ChunkParts:
+    # Rows of year y are never used once max_rows rows of that year were already read:
+    # for any split that includes y, the row budget ran out before this chunk.
+    if max_rows is None: return p
+    full = [y for y in p.row_years if seen[y] >= max_rows]
+    if not full: return p
+    return p._replace(pairs=p.pairs[~_of_years(p.pairs, full)], venues=p.venues[~_of_years(p.venues, full)],
+                      authorships=p.authorships[~_of_years(p.authorships, full)])
+
+def _parse_local(chunk: pd.DataFrame, authors_col: str, year_col: str, venue_col: str, incidence: bool, row_offset: int):
+    """Worker side of the parallel read: parse_chunk with chunk-local id tables, returned with their names."""
+    authors = Interner(); venues = Interner()
+    years, p = parse_chunk(chunk, authors_col, year_col, venue_col, authors, venues, incidence, row_offset)
+    return year_counts(years), p, authors.names, venues.names
+
+def _globalize(p: ChunkParts, authors: Interner, venues: Interner, local_authors: List[str], local_venues: List[str]) -> ChunkParts:
+    """Re-express chunk-local ids in the global tables. Local names are in first-seen order, so interning them
+    chunk by chunk hands out exactly the ids the serial read would."""
+    amap = authors.intern(np.asarray(local_authors, dtype=object)); vmap = venues.intern(np.asarray(local_venues, dtype=object))
+    u = amap[p.pairs["u"].to_numpy()]; v = amap[p.pairs["v"].to_numpy()]
+    return p._replace(pairs=p.pairs.assign(u=np.minimum(u, v), v=np.maximum(u, v)),
+                      venues=p.venues.assign(author=amap[p.venues["author"].to_numpy()], venue=vmap[p.venues["venue"].to_numpy()]),
+                      authorships=p.authorships.assign(author=amap[p.authorships["author"].to_numpy()]))
+
+def parsed_chunks(csv_path, authors_col, year_col, venue_col, authors: Interner, venues: Interner, chunksize: int, incidence: bool,
+                  workers: int, skip_rows: int = 0):
+    """(year counts, parts, rows) per chunk in file order, from data row skip_rows on; with workers > 1 chunks are
+    parsed by a process pool (at most 2 * workers in flight) and merged here in chunk order. Each chunk passes a
+    progress checkpoint (rows, bytes read) before it is parsed, so a cancelled read leaves the id tables consistent."""
+    size = os.path.getsize(csv_path); offset = skip_rows
+    with open(csv_path, "rb") as fh:
+        reader = read_columns(fh, [authors_col, year_col, venue_col], chunksize, skip_rows)
+        if workers <= 1:
+            for chunk in reader:
+                checkpoint("read_csv", offset, fh.tell(), size)
+                years, p = parse_chunk(chunk, authors_col, year_col, venue_col, authors, venues, incidence, offset)
+                offset += len(chunk); yield year_counts(years), p, len(chunk)
+            return
+        with ProcessPoolExecutor(workers) as pool:
+            pending = deque()
+            try:
+                for chunk in reader:
+                    checkpoint("read_csv", offset, fh.tell(), size)
+                    pending.append((pool.submit(_parse_local, chunk, authors_col, year_col, venue_col, incidence, offset), len(chunk))); offset += len(chunk)
+                    while len(pending) >= 2 * workers:
+                        fut, n = pending.popleft(); counts, p, la, lv = fut.result()
+                        yield counts, p if p is None else _globalize(p, authors, venues, la, lv), n
+                while pending:
+                    checkpoint("read_csv", offset, fh.tell(), size)
+                    fut, n = pending.popleft(); counts, p, la, lv = fut.result()
+                    yield counts, p if p is None else _globalize(p, authors, venues, la, lv), n
+            finally:
+                for fut, _ in pending: fut.cancel()
+
+class ReadState:
+    """
+    How far a read of one CSV got: the id tables, the data rows consumed and what the reader kept of them
+    (kind "parts": the parsed chunks as trimmed to max_rows, for read_parts; "layers": compact year-layer records,
+    for temporal.py). A read cancelled at a checkpoint leaves it consistent, and passing it to the same call again
+    continues after the last consumed chunk. Reuse a state only for the same CSV file, columns, chunksize, storage
+    mode and max_rows.
+    """
+    def __init__(self, kind: str = "parts"):
+        self.kind = kind
+        self.authors = Interner()
+        self.venues = Interner()
+        self.rows = 0
+        self.complete = False
+        self.chunks: List[Tuple[Counter, Optional[ChunkParts]]] = []
+        self.seen = Counter()  # rows per year in self.chunks, for _trim
+        self.max_rows: Optional[int] = None
+        self.collector = None
+
+    def check(self, kind: str, max_rows: Optional[int] = None):
+        if self.kind != kind: raise ValueError(f"read state of kind {self.kind!r} cannot resume a {kind!r} read")
+        if self.rows and self.max_rows != max_rows:
+            raise ValueError(f"read state trimmed to max_rows={self.max_rows} cannot resume a read with max_rows={max_rows}")
+        self.max_rows = max_rows
+
+def _resumed_chunks(state: ReadState, csv_path, authors_col, year_col, venue_col, chunksize, incidence, workers):
+    """The chunks already in state, then the rest of the file; new chunks are trimmed to state.max_rows and
+    recorded in state as they are yielded, so the state holds no more than the read itself keeps."""
+    yield from list(state.chunks)
+    if state.complete: return
+    for counts, p, n in parsed_chunks(csv_path, authors_col, year_col, venue_col, state.authors, state.venues, chunksize, incidence, workers, state.rows):
+        if p is not None: p = _trim(p, state.seen, state.max_rows); state.seen.update(p.row_years)
+        state.chunks.append((counts, p)); state.rows += n
+        yield counts, p
+    state.complete = True
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+def read_parts(csv_path, authors_col, year_col, venue_col, split_year=None, max_rows=200000, chunksize=20000, stop_early=True,
+               incidence=False, workers=1, state: Optional[ReadState] = None) -> ParsedCSV:
+    """Single pass over the CSV: per-chunk parts (in file order), the year histogram and the id tables.
+    With stop_early, reading stops once max_rows training rows were seen. workers > 1 parses chunks in
+    that many processes; the result is identical to the serial read. With state, chunks read by an earlier
+    (cancelled) call are reused and the read continues after them."""
+    parts: List[ChunkParts] = []; counts = Counter(); used = 0
+    if state is None: state = ReadState()
+    state.check("parts", max_rows); authors, venues = state.authors, state.venues
+    with stage("read_parts") as st:
+        for chunk_counts, p in _resumed_chunks(state, csv_path, authors_col, year_col, venue_col, chunksize, incidence, workers):
+            counts.update(chunk_counts)
+            if p is None: continue
+            parts.append(p); st.add(rows=sum(p.row_years.values()), chunks=1)
+            used += _rows_in_split(p, split_year)
+            if stop_early and max_rows is not None and used >= max_rows: break
+    return ParsedCSV(parts, counts, authors, venues)
+
+class TrainingSet(NamedTuple):
+    u: np.ndarray            # distinct edges (u, v, w) with u < v
+    v: np.ndarray
+    w: np.ndarray
+    venues: pd.DataFrame     # distinct (author, venue)
+    authorships: pd.DataFrame  # paper, author, pos (incidence mode)
+    used_rows: int
+
+def select_training(parts: List[ChunkParts], split_year: Optional[int], max_rows: Optional[int] = 200000) -> TrainingSet:
+    """Select the training chunks for split_year (same row budget rules as the streaming build)."""
+    used_rows = 0; pair_frames = []; venue_frames = []; paper_frames = []
+    for p in parts:
+        pair_frames.append(_in_split(p.pairs, p, split_year)); venue_frames.append(_in_split(p.venues, p, split_year))
+        paper_frames.append(_in_split(p.authorships, p, split_year))
+        used_rows += _rows_in_split(p, split_year)
+        if max_rows is not None and used_rows >= max_rows: break
+    if pair_frames:
+        edges = pd.concat(pair_frames, ignore_index=True).groupby(["u", "v"], sort=False)["w"].sum()
+        u = edges.index.get_level_values(0).to_numpy(dtype=np.int64); v = edges.index.get_level_values(1).to_numpy(dtype=np.int64); w = edges.to_numpy(dtype=np.int64)
+    else:
+        u = v = w = np.array([], dtype=np.int64)
+    av = pd.concat(venue_frames, ignore_index=True)[["author", "venue"]].drop_duplicates() if venue_frames else _empty("author", "venue")
+    ap = pd.concat(paper_frames, ignore_index=True)[["paper", "author", "pos"]] if paper_frames else _empty("paper", "author", "pos")
+    return TrainingSet(u, v, w, av, ap, used_rows)
+
+def assemble_graph(parsed: ParsedCSV, split_year: Optional[int], max_rows: Optional[int] = 200000) -> Tuple[Adjacency, Set[str], AuthorJournals, int]:
+    with stage("assemble_graph") as st:
+        checkpoint("assemble_graph")
+        u, v, w, av, _, used_rows = select_training(parsed.parts, split_year, max_rows)
+        names = parsed.authors.names; vnames = parsed.venues.names
+        adj = defaultdict(Counter); author_journals = defaultdict(set); nodes_seen = set()
+        for a, b, c in zip(u.tolist(), v.tolist(), w.tolist()):
+            na, nb = names[a], names[b]
+            adj[na][nb] = c; adj[nb][na] = c; nodes_seen.add(na); nodes_seen.add(nb)
+        for a, j in zip(av["author"].tolist(), av["venue"].tolist()): author_journals[names[a]].add(vnames[j])
+        st.add(rows=used_rows)
     return adj, nodes_seen, author_journals, used_rows
+
+def assemble_csr(parsed: ParsedCSV, split_year: Optional[int], max_rows: Optional[int] = 200000) -> Tuple[CSRGraph, AuthorJournalsCSR, int]:
+    """Like assemble_graph, but emits the compact CSR graph; ids are the first-seen order of authors in the training rows."""
+    with stage("assemble_csr") as st:
+        checkpoint("assemble_csr")
+        u, v, w, av, _, used_rows = select_training(parsed.parts, split_year, max_rows)
+        aa = av["author"].to_numpy(dtype=np.int64); jj = av["venue"].to_numpy(dtype=np.int64)
+        used = np.unique(np.concatenate([u, v, aa])); jused = np.unique(jj)
+        names = NameTable.from_list([parsed.authors.names[i] for i in used.tolist()])
+        journals = NameTable.from_list([parsed.venues.names[j] for j in jused.tolist()])
+        graph = CSRGraph.from_edges(names, np.searchsorted(used, u), np.searchsorted(used, v), w)
+        author_journals = AuthorJournalsCSR.from_pairs(names, journals, np.searchsorted(used, aa), np.searchsorted(jused, jj))
+        st.add(rows=used_rows)
+    return graph, author_journals, used_rows
+
+def assemble_bipartite(parsed: ParsedCSV, split_year: Optional[int], max_rows: Optional[int] = 200000,
+                       max_team: Optional[int] = DEFAULT_MAX_TEAM, policy: str = "keep") -> Tuple[BipartiteGraph, AuthorJournalsCSR, int]:
+    """Like assemble_csr, from incidence-mode parts: the author–paper BipartiteGraph with the given mega-paper policy."""
+    with stage("assemble_bipartite") as st:
+        checkpoint("assemble_bipartite")
+        _, _, _, av, ap, used_rows = select_training(parsed.parts, split_year, max_rows)
+        aa = av["author"].to_numpy(dtype=np.int64); jj = av["venue"].to_numpy(dtype=np.int64)
+        pa = ap["author"].to_numpy(dtype=np.int64)
+        used = np.unique(np.concatenate([pa, aa])); jused = np.unique(jj)
+        names = NameTable.from_list([parsed.authors.names[i] for i in used.tolist()])
+        journals = NameTable.from_list([parsed.venues.names[j] for j in jused.tolist()])
+        graph = BipartiteGraph.from_authorships(names, ap["paper"].to_numpy(), np.searchsorted(used, pa), ap["pos"].to_numpy(), max_team, policy)
+        author_journals = AuthorJournalsCSR.from_pairs(names, journals, np.searchsorted(used, aa), np.searchsorted(jused, jj))
+        st.add(rows=used_rows)
+    return graph, author_journals, used_rows
+
+def build_graph_and_journals(csv_path, authors_col, year_col, venue_col, split_year, max_rows=200000, chunksize=20000, workers=1) -> Tuple[Adjacency, Set[str], AuthorJournals, int]:
+    parsed = read_parts(csv_path, authors_col, year_col, venue_col, split_year, max_rows, chunksize, workers=workers)
+    return assemble_graph(parsed, split_year, max_rows)
+
+def build_csr_graph(csv_path, authors_col, year_col, venue_col, split_year, max_rows=200000, chunksize=20000, workers=1) -> Tuple[CSRGraph, AuthorJournalsCSR, int]:
+    parsed = read_parts(csv_path, authors_col, year_col, venue_col, split_year, max_rows, chunksize, workers=workers)
+    return assemble_csr(parsed, split_year, max_rows)
+
+def ingest_csv(csv_path, authors_col, year_col, venue_col, split_year=None, train_frac=0.8, max_rows=200000, chunksize=20000, as_csr=False,
+               incidence=False, max_team=DEFAULT_MAX_TEAM, mega_policy="keep", workers=1, state: Optional[ReadState] = None) -> IngestResult:
+    """One read of the authors/year/venue columns yielding both the year histogram and the graph.
+    When split_year is None it is picked from the histogram with train_frac (as pick_split_year does).
+    With as_csr the result holds a CSRGraph / AuthorJournalsCSR (string-keyed Mapping views) instead of dicts;
+    with incidence it holds a BipartiteGraph (author–paper storage, mega papers handled by mega_policy / max_team).
+    workers > 1 parses the CSV chunks in a process pool (same result); state resumes a cancelled read (see ReadState)."""
+    parsed = read_parts(csv_path, authors_col, year_col, venue_col, split_year, max_rows, chunksize, stop_early=split_year is not None,
+                        incidence=incidence, workers=workers, state=state)
+    if split_year is None: split_year = split_year_from_counts(parsed.year_counts, train_frac)
+    if incidence:
+        graph, author_journals, used_rows = assemble_bipartite(parsed, split_year, max_rows, max_team, mega_policy)
+        return IngestResult(split_year, parsed.year_counts, graph, graph.nodes(), author_journals, used_rows)
+    if as_csr:
+        graph, author_journals, used_rows = assemble_csr(parsed, split_year, max_rows)
+        return IngestResult(split_year, parsed.year_counts, graph, graph.nodes(), author_journals, used_rows)
+    adj, nodes, author_journals, used_rows = assemble_graph(parsed, split_year, max_rows)
+    return IngestResult(split_year, parsed.year_counts, adj, nodes, author_journals, used_rows)
@@ -0,0 +1,205 @@
+# graph_cache.py
+import os, json, time, shutil, hashlib
+import numpy as np
+from collections import Counter
+from typing import Optional, List, Dict, Tuple
+from graph_builder import IngestResult, ReadState, ingest_csv
+from instrument import stage
+from csr_graph import IdGraph, CSRGraph, AuthorJournalsCSR, NameTable
+from bipartite import BipartiteGraph, DEFAULT_MAX_TEAM
+from name_index import NameIndex, name_index_for
+
+FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".author_recs_cache")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_ENTRIES = 8
+META_FILE = "meta.json"
+
+def csv_identity(csv_path: str, content_hash: bool = False) -> Dict:
+    st = os.stat(csv_path)
+    ident = {"path": os.path.abspath(csv_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if content_hash:
+        h = hashlib.sha256()
+        with open(csv_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+        ident["sha256"] = h.hexdigest()
+    return ident
+
+def graph_to_arrays(graph: IdGraph, journals: AuthorJournalsCSR) -> Dict[str, np.ndarray]:
+    arrs = {"name_blob": graph.names.blob, "name_off": graph.names.offsets,
+            "journal_blob": journals.journals.blob, "journal_off": journals.journals.offsets,
+            "aj_indptr": journals.indptr, "aj_indices": journals.indices}
+    if isinstance(graph, BipartiteGraph):
+        arrs.update(paper_indptr=graph.paper_indptr, paper_authors=graph.paper_authors, paper_weight=graph.paper_weight,
+                    author_indptr=graph.author_indptr, author_papers=graph.author_papers)
+    else:
+        arrs.update(indptr=graph.indptr, indices=graph.indices, weights=graph.weights)
+    arrs.update(name_index_for(graph).to_arrays())  # saved so loading skips the trigram build
+    return arrs
+
+def arrays_to_graph(arrs: Dict[str, np.ndarray]) -> Tuple[IdGraph, AuthorJournalsCSR]:
+    names = NameTable(arrs["name_blob"], arrs["name_off"])
+    if "paper_indptr" in arrs:
+        graph = BipartiteGraph(names, arrs["paper_indptr"], arrs["paper_authors"], arrs["paper_weight"], arrs["author_indptr"], arrs["author_papers"])
+    else:
+        graph = CSRGraph(names, arrs["indptr"], arrs["indices"], arrs["weights"])
+    if "ni_tri_codes" in arrs: graph._name_index = NameIndex.from_arrays(graph, arrs)
+    return graph, AuthorJournalsCSR(names, NameTable(arrs["journal_blob"], arrs["journal_off"]), arrs["aj_indptr"], arrs["aj_indices"])
+
+def read_arrays(snapshot_dir: str, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """(arrays, meta) of one snapshot directory, the arrays memory-mapped unless mmap=False."""
+    with open(os.path.join(snapshot_dir, META_FILE), "r", encoding="utf-8") as f: meta = json.load(f)
+    arrs = {name: np.load(os.path.join(snapshot_dir, name + ".npy"), mmap_mode="r" if mmap else None) for name in meta["arrays"]}
+    return arrs, meta
+
+def load_snapshot(snapshot_dir: str, mmap: bool = True) -> Tuple[IdGraph, AuthorJournalsCSR, Dict]:
+    """Memory-map one snapshot directory; processes that load the same directory share its pages.
+    mmap=False reads the arrays into memory, leaving no open mapping of the directory's files."""
+    arrs, meta = read_arrays(snapshot_dir, mmap)
+    graph, author_journals = arrays_to_graph(arrs)
+    return graph, author_journals, meta
+
+class GraphCache:
+    """
+    On-disk snapshots of built graphs, one directory of CSR (or author–paper) .npy arrays per key (memory-mapped on load).
+    Keys cover the CSV identity and every build parameter; least recently used snapshots are evicted
+    beyond max_bytes / max_entries.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, content_hash: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.content_hash = content_hash
+
+    def key_for(self, csv_path, authors_col, year_col, venue_col, split_year, train_frac, max_rows, chunksize,
+                incidence=False, max_team=DEFAULT_MAX_TEAM, mega_policy="keep") -> Dict:
+        key = {"version": FORMAT_VERSION, "csv": csv_identity(csv_path, self.content_hash),
+               "columns": [authors_col, year_col, venue_col], "split_year": split_year,
+               # train_frac only matters when the split year is derived from the histogram
+               "train_frac": None if split_year is not None else round(float(train_frac), 6),
+               "max_rows": max_rows, "chunksize": chunksize}
+        if incidence: key["storage"] = {"kind": "bipartite", "max_team": max_team, "mega_policy": mega_policy}
+        return key
+
+    def key_for_layers(self, csv_path, authors_col, year_col, venue_col) -> Dict:
+        """Key of the year layers of a CSV (temporal.cached_year_layers); layers are never capped or split."""
+        return {"version": FORMAT_VERSION, "csv": csv_identity(csv_path, self.content_hash),
+                "columns": [authors_col, year_col, venue_col], "kind": "year_layers"}
+
+    def snapshot_dir(self, key: Dict) -> str:
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, digest)
+
+    def load(self, key: Dict, as_csr: bool = True, mmap: bool = True) -> Optional[IngestResult]:
+        """The snapshot for key, or None. Load with mmap=False a result that will be saved back under the same key:
+        save() replaces the directory, which fails on Windows while its files are mapped."""
+        stored = self.load_arrays(key, mmap)
+        if stored is None: return None
+        try:
+            (graph, author_journals), meta = arrays_to_graph(stored[0]), stored[1]
+        except KeyError:
+            return None  # a year-layers snapshot, or one from an older layout
+        counts = Counter({int(y): c for y, c in meta["year_counts"].items()})
+        if not as_csr:
+            adj = graph.to_adjacency()
+            return IngestResult(meta["split_year"], counts, adj, set(adj), author_journals.to_mapping(), meta["used_rows"])
+        return IngestResult(meta["split_year"], counts, graph, graph.nodes(), author_journals, meta["used_rows"])
+
+    def save(self, key: Dict, result: IngestResult) -> str:
+        graph, author_journals = result.adj, result.author_journals
+        if not isinstance(graph, IdGraph):
+            graph = CSRGraph.from_adjacency(graph, author_journals)
+            author_journals = AuthorJournalsCSR.from_mapping(author_journals, graph.names)
+        return self.save_arrays(key, graph_to_arrays(graph, author_journals),
+                                {"split_year": result.split_year, "used_rows": result.used_rows,
+                                 "year_counts": {str(y): c for y, c in result.year_counts.items()}})
+
+    def load_arrays(self, key: Dict, mmap: bool = True) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+        """(arrays, meta) stored under key by save_arrays, or None."""
+        d = self.snapshot_dir(key)
+        try:
+            arrs, meta = read_arrays(d, mmap)
+        except (OSError, ValueError, KeyError):
+            return None
+        if meta.get("key") != key: return None
+        os.utime(os.path.join(d, META_FILE))  # LRU bookkeeping
+        return arrs, meta
+
+    def save_arrays(self, key: Dict, arrs: Dict[str, np.ndarray], meta: Dict) -> str:
+        """Write arrs (one .npy each) and the JSON-able meta as the snapshot of key, replacing any older one."""
+        d = self.snapshot_dir(key); tmp = d + ".tmp-%d" % os.getpid()
+        shutil.rmtree(tmp, ignore_errors=True); os.makedirs(tmp)
+        for name, a in arrs.items(): np.save(os.path.join(tmp, name + ".npy"), a)
+        meta = dict(meta, key=key, arrays=sorted(arrs), created=time.time())
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f: json.dump(meta, f)
+        shutil.rmtree(d, ignore_errors=True); os.replace(tmp, d)
+        self.enforce_limits(keep=d)
+        return d
+
+    def entries(self) -> List[Tuple[str, float, int, Dict]]:
+        """(dir, last_used, bytes, key) for every snapshot, most recently used first."""
+        out = []
+        if not os.path.isdir(self.cache_dir): return out
+        for name in os.listdir(self.cache_dir):
+            d = os.path.join(self.cache_dir, name); meta_path = os.path.join(d, META_FILE)
+            if not os.path.isfile(meta_path): continue
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f: key = json.load(f).get("key", {})
+            except (OSError, ValueError):
+                key = {}
+            size = sum(os.path.getsize(os.path.join(d, fn)) for fn in os.listdir(d))
+            out.append((d, os.path.getmtime(meta_path), size, key))
+        out.sort(key=lambda e: e[1], reverse=True)
+        return out
+
+    def total_bytes(self) -> int:
+        return sum(e[2] for e in self.entries())
+
+    def enforce_limits(self, keep: Optional[str] = None) -> int:
+        entries = self.entries(); total = sum(e[2] for e in entries); removed = 0
+        for i in range(len(entries) - 1, -1, -1):
+            d, _, size, _ = entries[i]
+            if total <= self.max_bytes and len(entries) - removed <= self.max_entries: break
+            if d == keep: continue
+            shutil.rmtree(d, ignore_errors=True); total -= size; removed += 1
+        return removed
+
+    def invalidate(self, csv_path: Optional[str] = None, stale_only: bool = False) -> int:
+        """Drop snapshots of csv_path (all snapshots when None). stale_only keeps the ones matching the file on disk."""
+        target = os.path.abspath(csv_path) if csv_path else None; removed = 0
+        for d, _, _, key in self.entries():
+            ident = key.get("csv", {})
+            if target is not None and ident.get("path") != target: continue
+            if stale_only:
+                try:
+                    st = os.stat(ident.get("path", ""))
+                    if (st.st_size, st.st_mtime_ns) == (ident.get("size"), ident.get("mtime_ns")): continue
+                except OSError:
+                    pass
+            shutil.rmtree(d, ignore_errors=True); removed += 1
+        return removed
+
+def ensure_snapshot(cache: GraphCache, key: Dict, result: IngestResult) -> str:
+    """Snapshot directory of key, written from result when the cache holds none (cached_ingest skips failed writes).
+    Batch and evaluation workers memory-map this directory, so here a failed write raises OSError."""
+    d = cache.snapshot_dir(key)
+    if not os.path.isfile(os.path.join(d, META_FILE)): d = cache.save(key, result)
+    return d
+
+def cached_ingest(cache: Optional[GraphCache], csv_path, authors_col, year_col, venue_col, split_year=None, train_frac=0.8, max_rows=200000, chunksize=20000, as_csr=True,
+                  incidence=False, max_team=DEFAULT_MAX_TEAM, mega_policy="keep", workers=1, state: Optional[ReadState] = None) -> Tuple[IngestResult, bool]:
+    """ingest_csv behind the snapshot cache; returns (result, cache_hit). workers and state (a cancelled read to
+    continue) only change how a miss is built."""
+    build = lambda: ingest_csv(csv_path, authors_col, year_col, venue_col, split_year, train_frac, max_rows, chunksize, as_csr, incidence, max_team,
+                               mega_policy, workers, state)
+    with stage("cached_ingest") as st:
+        if cache is None: return build(), False
+        key = cache.key_for(csv_path, authors_col, year_col, venue_col, split_year, train_frac, max_rows, chunksize, incidence, max_team, mega_policy)
+        hit = cache.load(key, as_csr)
+        st.add(hit=int(hit is not None))
+        if hit is not None: return hit, True
+        result = build()
+        try: cache.save(key, result)
+        except OSError: pass  # a read-only or full disk should not fail the build
+        return result, False
@@ -0,0 +1,236 @@
+# graph_update.py
+"""
+Incremental updates: append the papers of a delta CSV (e.g. a monthly DBLP increment) to a built graph
+or to a cached snapshot, without re-reading the history.
+
+A DeltaLedger records every applied source (content hash, path and row ranges) and the hashes of the
+applied papers' keys, so re-applying a file, an overlapping row range or a paper seen in an earlier delta
+is skipped. Edge weights, degrees and author journals are updated in place; the cost is the delta parse
+plus an ordered insert into the existing arrays.
+
+    python graph_update.py --csv dataset/dblp_2021_2023.csv --delta dblp_2024_01.csv
+"""
+import os, json, time, argparse
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from data_loader import DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, DEFAULT_MAX_TRAIN_ROWS, parse_years, read_columns, year_counts
+from graph_builder import IngestResult, Interner, parse_chunk, select_training
+from csr_graph import IdGraph, CSRGraph
+from bipartite import BipartiteGraph, DEFAULT_MAX_TEAM, MEGA_PAPER_POLICIES
+from graph_cache import GraphCache, DEFAULT_CACHE_DIR, csv_identity
+
+TITLE_COL = "title"
+LEDGER_FILE = "ledger.json"
+KEYS_FILE = "paper_keys.npy"
+
+def key_columns(authors_col: str, venue_col: str, key_cols: Optional[Sequence[str]] = None) -> List[str]:
+    """Columns identifying a paper: key_cols, by default title, authors and venue together (a title alone would
+    merge distinct papers that share one, e.g. "Editorial"). The date column is left out: DBLP's mdate is the
+    record's modification date, so a record touched again by a later dump would otherwise count twice."""
+    return list(key_cols) if key_cols else [TITLE_COL, authors_col, venue_col]
+
+def paper_keys(chunk: pd.DataFrame, key_cols: Sequence[str]) -> np.ndarray:
+    """64-bit hashes identifying each row's paper from those of key_cols present in chunk."""
+    cols = [c for c in key_cols if c in chunk.columns]
+    return pd.util.hash_pandas_object(chunk[cols].fillna(""), index=False).to_numpy().view(np.int64)
+
+class DeltaLedger:
+    """Applied delta sources (by content hash, with row ranges) and the sorted key hashes of applied papers."""
+    def __init__(self, sources: Optional[List[Dict]] = None, keys: Optional[np.ndarray] = None):
+        self.sources = sources or []
+        self.keys = keys if keys is not None else np.zeros(0, dtype=np.int64)
+
+    def applied_ranges(self, sha256: str) -> List[Tuple[int, Optional[int]]]:
+        return [tuple(r) for s in self.sources if s["sha256"] == sha256 for r in s["rows"]]
+
+    def pending_ranges(self, sha256: str, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, Optional[int]]]:
+        """[start, end) minus the row ranges already applied from the same content (None = end of file)."""
+        pending = [(start, end)]
+        for a, b in self.applied_ranges(sha256):
+            nxt = []
+            for s, e in pending:
+                if b is not None and b <= s or e is not None and e <= a: nxt.append((s, e)); continue
+                if s < a: nxt.append((s, a))
+                if b is not None and (e is None or b < e): nxt.append((b, e))
+            pending = nxt
+        return [(s, e) for s, e in pending if e is None or s < e]
+
+    def seen(self, keys: np.ndarray) -> np.ndarray:
+        pos = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        return (self.keys[pos] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+
+    def record(self, ident: Dict, ranges: List[Tuple[int, Optional[int]]], keys: np.ndarray, stats: Dict):
+        self.sources.append({**ident, "rows": [list(r) for r in ranges], "applied": time.time(), **stats})
+        self.keys = np.union1d(self.keys, keys)
+
+    def seed_base(self, csv_path: str, authors_col: str, year_col: str, venue_col: str, split_year: Optional[int],
+                  max_rows: Optional[int], chunksize: int = 20000, key_cols: Optional[Sequence[str]] = None):
+        """Record the keys of the rows a build with these parameters used, so deltas overlapping the base file are deduplicated.
+        Follows the build's chunk-granular row budget; reads only the key and year columns."""
+        keys = []; used = 0; cols = key_columns(authors_col, venue_col, key_cols)
+        for chunk in read_columns(csv_path, cols + [year_col], chunksize):
+            k = paper_keys(chunk, cols)
+            if split_year is not None and year_col in chunk.columns:
+                k = k[parse_years(chunk[year_col]) <= split_year]
+            keys.append(k); used += len(k)
+            if max_rows is not None and used >= max_rows: break
+        self.record({"path": os.path.abspath(csv_path), "sha256": None, "base": True}, [], np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64),
+                    {"papers": used, "split_year": split_year})
+
+    def save(self, directory: str):
+        with open(os.path.join(directory, LEDGER_FILE), "w", encoding="utf-8") as f: json.dump({"sources": self.sources}, f, indent=1)
+        np.save(os.path.join(directory, KEYS_FILE), self.keys)
+
+    @classmethod
+    def load(cls, directory: str) -> "DeltaLedger":
+        try:
+            with open(os.path.join(directory, LEDGER_FILE), "r", encoding="utf-8") as f: sources = json.load(f)["sources"]
+            return cls(sources, np.load(os.path.join(directory, KEYS_FILE)))
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+class DeltaStats(NamedTuple):
+    rows_read: int
+    papers_applied: int
+    duplicates_skipped: int
+    new_authors: Optional[int]  # None for dict graphs
+    links_added: int            # co-author edges (CSR / dict) or authorships (incidence)
+    seconds: float
+
+def _in_ranges(index: np.ndarray, ranges) -> np.ndarray:
+    mask = np.zeros(len(index), dtype=bool)
+    for s, e in ranges: mask |= (index >= s) & ((index < e) if e is not None else True)
+    return mask
+
+def apply_delta(result: IngestResult, delta_path: str, authors_col: str, year_col: str, venue_col: str, ledger: DeltaLedger,
+                split_year: Optional[int] = None, key_cols: Optional[Sequence[str]] = None, start_row: int = 0, end_row: Optional[int] = None,
+                chunksize: int = 20000, max_team: Optional[int] = DEFAULT_MAX_TEAM, mega_policy: str = "keep") -> Tuple[IngestResult, DeltaStats]:
+    """
+    Append rows [start_row, end_row) of delta_path to result's graph and journals in place and record them in ledger.
+    Rows already applied from the same content, and papers whose key (see key_columns) was applied before, are skipped.
+    split_year, when given, drops rows dated after it (as in the training build); the default keeps every row.
+    Works for CSRGraph, BipartiteGraph (max_team / mega_policy as used for the build) and dict results.
+    """
+    t0 = time.perf_counter()
+    ident = csv_identity(delta_path, content_hash=True)
+    ranges = ledger.pending_ranges(ident["sha256"], start_row, end_row)
+    graph = result.adj; incidence = isinstance(graph, BipartiteGraph)
+    authors, venues = Interner(), Interner(); parts = []; counts = Counter(); keys_all = []
+    rows_read = dups = offset = kept = 0; key_cols = key_columns(authors_col, venue_col, key_cols)
+    accepted = np.zeros(0, dtype=np.int64)  # sorted keys taken from earlier chunks of this call
+    last = max(e for _, e in ranges) if ranges and all(e is not None for _, e in ranges) else None
+    for chunk in (read_columns(delta_path, [authors_col, year_col, venue_col] + key_cols, chunksize) if ranges else ()):
+        idx = np.arange(offset, offset + len(chunk)); offset += len(chunk)
+        if last is not None and idx[0] >= last: break
+        chunk = chunk[_in_ranges(idx, ranges)]
+        if len(chunk) == 0: continue
+        rows_read += len(chunk)
+        keys = paper_keys(chunk, key_cols)
+        _, first = np.unique(keys, return_index=True); fresh = np.zeros(len(keys), dtype=bool); fresh[first] = True
+        fresh &= ~ledger.seen(keys) & ~np.isin(keys, accepted); dups += int((~fresh).sum())
+        chunk = chunk[fresh].reset_index(drop=True); keys = keys[fresh]; accepted = np.union1d(accepted, keys)
+        years, p = parse_chunk(chunk, authors_col, year_col, venue_col, authors, venues, incidence, kept)
+        kept += len(chunk); counts.update(year_counts(years))
+        if p is None: continue
+        parts.append(p)
+        # only papers that pass the split filter count as applied
+        keys_all.append(keys if split_year is None or not p.dated else keys[years <= split_year])
+    train = select_training(parts, split_year, None)
+    amap, vmap, new_names = _merge_names(graph, result.author_journals, train, authors.names, venues.names)
+    links_before = _link_count(graph)
+    if isinstance(graph, CSRGraph):
+        if len(train.u): graph.add_edges(amap[train.u], amap[train.v], train.w)
+    elif incidence:
+        ap = train.authorships
+        if len(ap):
+            delta = BipartiteGraph.from_authorships(graph.names, ap["paper"].to_numpy(), amap[ap["author"].to_numpy()], ap["pos"].to_numpy(), max_team, mega_policy)
+            graph.add_papers(delta.paper_indptr, delta.paper_authors, delta.paper_weight)
+    else:
+        names = authors.names
+        for a, b, c in zip(train.u.tolist(), train.v.tolist(), train.w.tolist()):
+            graph[names[a]][names[b]] += c; graph[names[b]][names[a]] += c
+            result.nodes.add(names[a]); result.nodes.add(names[b])
+    av = train.venues
+    if not isinstance(graph, IdGraph):
+        for a, j in zip(av["author"].tolist(), av["venue"].tolist()): result.author_journals[authors.names[a]].add(venues.names[j])
+    elif len(av):
+        result.author_journals.add_pairs(amap[av["author"].to_numpy()], vmap[av["venue"].to_numpy()])
+    keys = np.concatenate(keys_all) if keys_all else np.zeros(0, dtype=np.int64)
+    new_authors = len(new_names) if isinstance(graph, IdGraph) else None
+    stats = DeltaStats(rows_read, train.used_rows, dups, new_authors, _link_count(graph) - links_before, round(time.perf_counter() - t0, 3))
+    if ranges:
+        read_ranges = [(s, e if e is not None else max(offset, s)) for s, e in ranges]
+        ledger.record(ident, read_ranges, keys, {"papers": stats.papers_applied, "duplicates": dups, "split_year": split_year})
+    nodes = graph.nodes() if isinstance(graph, IdGraph) else result.nodes
+    return result._replace(year_counts=result.year_counts + counts, nodes=nodes, used_rows=result.used_rows + train.used_rows), stats
+
+def _link_count(graph) -> int:
+    if isinstance(graph, CSRGraph): return graph.num_edges
+    if isinstance(graph, BipartiteGraph): return graph.num_authorships
+    return sum(len(nb) for nb in graph.values()) // 2
+
+def _merge_names(graph, journals, train, author_names: List[str], venue_names: List[str]):
+    """Global ids for the delta authors / venues used by train (new ones appended in first-seen order); None for dict graphs."""
+    if not isinstance(graph, IdGraph): return None, None, []
+    used = np.unique(np.concatenate([train.u, train.v, train.venues["author"].to_numpy(np.int64), train.authorships["author"].to_numpy(np.int64)]))
+    amap = np.full(len(author_names), -1, dtype=np.int64)
+    amap[used] = graph.names.ids_of([author_names[i] for i in used.tolist()])
+    fresh = used[amap[used] < 0]; new = [author_names[i] for i in fresh.tolist()]
+    start = len(graph.names); graph.names.extend(new)
+    if journals.authors is not graph.names: journals.authors.extend(new)
+    amap[fresh] = np.arange(start, start + len(new))
+    vused = np.unique(train.venues["venue"].to_numpy(np.int64))
+    vmap = np.full(len(venue_names), -1, dtype=np.int64)
+    vmap[vused] = journals.journals.ids_of([venue_names[j] for j in vused.tolist()])
+    vfresh = vused[vmap[vused] < 0]; vstart = len(journals.journals)
+    journals.journals.extend([venue_names[j] for j in vfresh.tolist()])
+    vmap[vfresh] = np.arange(vstart, vstart + len(vfresh))
+    return amap, vmap, new
+
+def apply_delta_to_snapshot(cache: GraphCache, key: Dict, delta_path: str, authors_col: str, year_col: str, venue_col: str,
+                            split_year: Optional[int] = None, key_cols: Optional[Sequence[str]] = None, start_row: int = 0,
+                            end_row: Optional[int] = None, chunksize: int = 20000) -> DeltaStats:
+    """apply_delta on the cached snapshot for key; the updated snapshot (and its ledger) replaces it under the same key."""
+    result = cache.load(key, mmap=False)  # saved back into the same directory below
+    if result is None: raise FileNotFoundError("No cached snapshot for these build parameters; build it first.")
+    d = cache.snapshot_dir(key); ledger = DeltaLedger.load(d)
+    if not ledger.sources:
+        ledger.seed_base(key["csv"]["path"], authors_col, year_col, venue_col, result.split_year, key["max_rows"], key["chunksize"], key_cols)
+    storage = key.get("storage", {})
+    result, stats = apply_delta(result, delta_path, authors_col, year_col, venue_col, ledger, split_year, key_cols, start_row, end_row,
+                                chunksize, storage.get("max_team", DEFAULT_MAX_TEAM), storage.get("mega_policy", "keep"))
+    if stats.rows_read:
+        d = cache.save(key, result); ledger.save(d)
+    return stats
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Append delta CSVs to a cached graph snapshot.")
+    ap.add_argument("--csv", required=True, help="CSV the snapshot was built from")
+    ap.add_argument("--delta", required=True, nargs="+", help="delta CSVs, applied in order")
+    ap.add_argument("--split-year", type=int, default=None, help="build parameter of the snapshot")
+    ap.add_argument("--train-frac", type=float, default=0.8)
+    ap.add_argument("--max-rows", type=int, default=DEFAULT_MAX_TRAIN_ROWS, help="0 = all rows")
+    ap.add_argument("--incidence", action="store_true")
+    ap.add_argument("--max-team", type=int, default=DEFAULT_MAX_TEAM, help="0 = no limit")
+    ap.add_argument("--mega-policy", choices=MEGA_PAPER_POLICIES, default="keep")
+    ap.add_argument("--delta-split-year", type=int, default=None, help="drop delta rows dated after this year")
+    ap.add_argument("--key-cols", nargs="+", default=None, help="columns identifying a paper (default: title, authors and venue; the date column is left out "
+                    "because DBLP's mdate changes whenever a record is modified)")
+    ap.add_argument("--start-row", type=int, default=0)
+    ap.add_argument("--end-row", type=int, default=None)
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = ap.parse_args(argv)
+
+    cols = (DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL); chunksize = 20000
+    cache = GraphCache(args.cache_dir)
+    key = cache.key_for(args.csv, *cols, args.split_year, args.train_frac, args.max_rows or None, chunksize,
+                        args.incidence, args.max_team or None, args.mega_policy)
+    for path in args.delta:
+        stats = apply_delta_to_snapshot(cache, key, path, *cols, args.delta_split_year, args.key_cols, args.start_row, args.end_row, chunksize)
+        print(json.dumps({"delta": path, **stats._asdict()}))
+
+if __name__ == "__main__":
+    main()
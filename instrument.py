@@ -0,0 +1,127 @@
+# instrument.py
+"""
+Opt-in per-stage instrumentation: wall time, rows/sec, peak RSS and tracemalloc deltas, and counters
+(candidate-set sizes, ...) for each stage of a run, collected into one JSON-able record.
+
+Library code marks stages with `with stage("read_parts") as st: ...; st.add(rows=n)`. Nothing is recorded
+unless a RunRecorder is active in the current thread (`with recorder.active(): ...`); otherwise stage()
+returns a shared no-op, so instrumented code costs one context-variable lookup per stage.
+"""
+import sys, json, time, tracemalloc
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_active: ContextVar = ContextVar("instrument_recorder", default=None)
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak resident set size of this process (with children: of its largest joined child process) in MiB,
+    None where the resource module is missing."""
+    if resource is None: return None
+    scale = 1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return round(resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+class _NullStage:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def add(self, **counters): pass
+
+_NULL = _NullStage()
+
+class _Stage:
+    def __init__(self, recorder: "RunRecorder", name: str):
+        self.recorder, self.name, self.counters = recorder, name, {}
+
+    def add(self, **counters):
+        """Add to this stage's counters (rows, candidates, ...); rows also yields rows_per_sec."""
+        for k, v in counters.items(): self.counters[k] = self.counters.get(k, 0) + v
+
+    def __enter__(self):
+        self.rss0 = peak_rss_mb(); self.recorder._enter(self); self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        secs = time.perf_counter() - self.t0
+        rec = {"stage": self.name, "depth": self.depth, "seconds": round(secs, 6), **self.counters}
+        if "rows" in self.counters and secs > 0: rec["rows_per_sec"] = round(self.counters["rows"] / secs, 1)
+        rss = peak_rss_mb()
+        if rss is not None: rec["peak_rss_mb"] = rss; rec["peak_rss_delta_mb"] = round(rss - self.rss0, 1)
+        self.recorder._exit(self, rec)
+        return False
+
+class RunRecorder:
+    """
+    Collects the stages of one run. With memory, tracemalloc runs during the run (slower) and each stage
+    also reports the peak of traced allocations above what was allocated when it started.
+    finish() returns the record and, with log_path, appends it to that JSONL file.
+    """
+    def __init__(self, run: str, memory: bool = False, log_path: Optional[str] = None, **meta):
+        self.run, self.memory, self.log_path, self.meta = run, memory, log_path, meta
+        self.stages: List[Optional[Dict]] = []; self._open: List[_Stage] = []
+        self._started_tracing = False; self.t0 = time.perf_counter(); self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def active(self):
+        """Context manager making this the recorder of stage() calls in the current thread."""
+        return _Activation(self)
+
+    def _enter(self, st: _Stage):
+        st.depth = len(self._open); st.index = len(self.stages); self.stages.append(None)  # stages are listed in start order
+        if self.memory:
+            if not tracemalloc.is_tracing(): tracemalloc.start(); self._started_tracing = True
+            cur, peak = tracemalloc.get_traced_memory()
+            if self._open: self._open[-1].mem_peak = max(self._open[-1].mem_peak, peak)
+            tracemalloc.reset_peak(); st.mem0 = st.mem_peak = cur
+        self._open.append(st)
+
+    def _exit(self, st: _Stage, rec: Dict):
+        self._open.pop()
+        if self.memory and tracemalloc.is_tracing():
+            st.mem_peak = max(st.mem_peak, tracemalloc.get_traced_memory()[1])
+            rec["tracemalloc_peak_mb"] = round((st.mem_peak - st.mem0) / 1024 ** 2, 3)
+            if self._open: self._open[-1].mem_peak = max(self._open[-1].mem_peak, st.mem_peak)
+        self.stages[st.index] = rec
+
+    def record(self) -> Dict:
+        out = {"run": self.run, "started": self.started, "seconds": round(time.perf_counter() - self.t0, 6), **self.meta}
+        rss = peak_rss_mb()
+        if rss is not None: out["peak_rss_mb"] = rss
+        out["stages"] = [s for s in self.stages if s is not None]
+        return out
+
+    def finish(self) -> Dict:
+        if self._started_tracing: tracemalloc.stop(); self._started_tracing = False
+        rec = self.record()
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f: f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        return rec
+
+class _Activation:
+    def __init__(self, recorder: RunRecorder): self.recorder = recorder
+    def __enter__(self): self.token = _active.set(self.recorder); return self.recorder
+    def __exit__(self, *exc): _active.reset(self.token); return False
+
+def stage(name: str):
+    """Context manager timing one stage of the active run; a shared no-op when none is active."""
+    rec = _active.get()
+    return _NULL if rec is None else _Stage(rec, name)
+
+def count(**counters):
+    """Add counters to the innermost open stage of the active run (no-op when none is active)."""
+    rec = _active.get()
+    if rec is not None and rec._open: rec._open[-1].add(**counters)
+
+def format_record(record: Dict, max_depth: int = 1) -> str:
+    """One-line summary of a run record: time per stage, throughput and counters."""
+    parts = []
+    for s in record["stages"]:
+        if s.get("depth", 0) > max_depth: continue
+        secs = s["seconds"]; text = f"{s['stage']} {secs:.2f}s" if secs >= 1 else f"{s['stage']} {secs * 1000:.1f}ms"
+        extra = [f"{s['rows_per_sec']:,.0f} rows/s"] if "rows_per_sec" in s else []
+        extra += [f"{k} {v:,}" for k, v in s.items() if k in ("candidates", "kept", "hit")]
+        if s.get("tracemalloc_peak_mb") is not None: extra.append(f"+{s['tracemalloc_peak_mb']:.1f} MB")
+        parts.append(text + (f" ({', '.join(extra)})" if extra else ""))
+    return " · ".join(parts)
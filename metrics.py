@@ -1,12 +1,27 @@
 # metrics.py
 import math
+import numpy as np
 from typing import Dict, Set, List, Tuple
 from collections import Counter as TCounter
+from csr_graph import IdGraph, AuthorJournalsCSR
 
 Adjacency = Dict[str, TCounter]
 AuthorJournals = Dict[str, Set[str]]
 
+def candidate_ids(graph: IdGraph, u: int, include_neighbors: bool = False) -> np.ndarray:
+    """candidate_set over author ids: sorted array of 2-hop ids (or every connected author)."""
+    if include_neighbors:
+        ids = graph.connected_ids()
+        return ids[ids != u]
+    neighbors = graph.neighbors(u)
+    mask = np.zeros(graph.num_nodes, dtype=bool)
+    mask[graph.expand(neighbors)[1]] = True
+    mask[neighbors] = False; mask[u] = False
+    return np.flatnonzero(mask)
+
 def candidate_set(adj: Adjacency, u: str, include_neighbors: bool = False) -> Set[str]:
+    if isinstance(adj, IdGraph):
+        return {adj.names[i] for i in candidate_ids(adj, adj.id_of(u), include_neighbors).tolist()}
     neighbors = set(adj[u].keys())
     if include_neighbors: return set(adj.keys()) - {u}
     two_hop = set()
@@ -14,16 +29,38 @@ def candidate_set(adj: Adjacency, u: str, include_neighbors: bool = False) -> Se
     two_hop.discard(u)
     return two_hop - neighbors
 
+def common_neighbor_ids(graph: IdGraph, u: int, v: int) -> np.ndarray:
+    return np.intersect1d(graph.neighbors(u), graph.neighbors(v), assume_unique=True)
+
+def adamic_adar_ids(graph: IdGraph, common: np.ndarray) -> float:
+    deg = graph.degree_of(common); deg = deg[deg > 1]
+    return float(np.sum(1.0 / np.log(deg))) if len(deg) else 0.0
+
 def common_neighbors_count(adj: Adjacency, u: str, v: str) -> int:
+    if isinstance(adj, IdGraph): return int(len(common_neighbor_ids(adj, adj.id_of(u), adj.id_of(v))))
     return len(set(adj[u].keys()) & set(adj[v].keys()))
 
 def adamic_adar(adj: Adjacency, u: str, v: str) -> float:
+    if isinstance(adj, IdGraph): return adamic_adar_ids(adj, common_neighbor_ids(adj, adj.id_of(u), adj.id_of(v)))
     inter = set(adj[u].keys()) & set(adj[v].keys()); s = 0.0
     for z in inter:
         deg = len(adj[z])
         if deg > 1: s += 1.0 / math.log(deg)
     return s
 
+def resource_allocation(adj: Adjacency, u: str, v: str) -> float:
+    """Like adamic_adar with 1 / deg(z) instead of 1 / log(deg(z))."""
+    if isinstance(adj, IdGraph):
+        common = common_neighbor_ids(adj, adj.id_of(u), adj.id_of(v))
+        return float(np.sum(1.0 / adj.degree_of(common))) if len(common) else 0.0
+    return sum(1.0 / len(adj[z]) for z in set(adj[u].keys()) & set(adj[v].keys()))
+
+def journal_overlap_ids(journals: AuthorJournalsCSR, u: int, v: int) -> Tuple[np.ndarray, int, float]:
+    """(common journal ids, union size, Jaccard) for two author ids."""
+    ju = journals.journals_of(u); jv = journals.journals_of(v)
+    inter = np.intersect1d(ju, jv, assume_unique=True); union = len(ju) + len(jv) - len(inter)
+    return inter, union, (len(inter) / union) if union else 0.0
+
 def journal_overlap(author_journals: AuthorJournals, u: str, v: str) -> Tuple[Set[str], Set[str], float]:
     Ju = author_journals.get(u, set()); Jv = author_journals.get(v, set())
     inter = Ju & Jv; union = Ju | Jv
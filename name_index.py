@@ -0,0 +1,135 @@
+# name_index.py
+import numpy as np
+from typing import Dict, List, Optional
+from csr_graph import IdGraph, encode_strings, decode_strings
+
+MIN_SUGGEST_BYTES = 3  # type-ahead needs one trigram; shorter text would scan the whole name blob
+_ARRAYS = ("ids", "blob", "offsets", "degree", "tri_codes", "tri_indptr", "tri_rows")
+
+def _trigram_codes(data: np.ndarray) -> np.ndarray:
+    d = data.astype(np.uint32)
+    return (d[:-2] << 16) | (d[1:-1] << 8) | d[2:]
+
+def _run_starts(sorted_values: np.ndarray) -> np.ndarray:
+    """Mask of the first element of every run of equal values."""
+    mask = np.ones(len(sorted_values), dtype=bool); mask[1:] = sorted_values[1:] != sorted_values[:-1]
+    return mask
+
+class NameIndex:
+    """
+    Case-folded substring index over the connected authors of a graph.
+    Folded names are packed in one utf-8 blob; every byte trigram maps to the sorted ids of the names containing it,
+    so exact, prefix and substring lookups only verify a few candidates. Matches are ranked by degree.
+    The arrays are saved with graph snapshots (to_arrays / from_arrays), so a loaded graph does not rebuild its index.
+    """
+    def __init__(self, graph: IdGraph, arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.graph = graph
+        self._folded: Optional[List[str]] = None
+        if arrays is not None:
+            for name in _ARRAYS: setattr(self, name, arrays["ni_" + name])
+        else:
+            self.ids = graph.connected_ids()  # position in the index -> author id
+            names = graph.names.to_list()
+            self._folded = [names[i].casefold() for i in self.ids.tolist()]
+            self.blob, self.offsets = encode_strings(self._folded)
+            self.degree = graph.degree_of(self.ids)
+            self._build_trigrams()
+        self.max_degree_id = int(self.ids[np.argmax(self.degree)]) if len(self.ids) else None
+
+    @classmethod
+    def from_arrays(cls, graph: IdGraph, arrays: Dict[str, np.ndarray]) -> "NameIndex":
+        """The index stored by to_arrays (arrays keyed "ni_*", possibly memory-mapped) over the same graph."""
+        return cls(graph, arrays)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"ni_" + name: getattr(self, name) for name in _ARRAYS}
+
+    @property
+    def folded(self) -> List[str]:
+        """Case-folded names by index row, decoded from the blob on first use after a load."""
+        if self._folded is None: self._folded = decode_strings(self.blob, self.offsets)
+        return self._folded
+
+    def _build_trigrams(self):
+        if len(self.blob) < 3:
+            self.tri_codes = np.zeros(0, dtype=np.uint32); self.tri_indptr = np.zeros(1, dtype=np.int64); self.tri_rows = np.zeros(0, dtype=np.int32)
+            return
+        codes = _trigram_codes(self.blob); starts = np.arange(len(codes))
+        row = np.searchsorted(self.offsets, starts, side="right") - 1
+        inside = starts + 3 <= self.offsets[row + 1]  # trigram does not cross into the next name
+        # sort + mask instead of np.unique, which took 1.7 s against 0.03 s for 2.4M keys on NumPy 2.4
+        keys = np.sort((codes[inside].astype(np.int64) << 32) | row[inside])
+        keys = keys[_run_starts(keys)]
+        self.tri_rows = (keys & 0xFFFFFFFF).astype(np.int32)
+        tri = (keys >> 32).astype(np.uint32); first = np.flatnonzero(_run_starts(tri))
+        self.tri_codes = tri[first]
+        self.tri_indptr = np.append(first, len(tri)).astype(np.int64)
+
+    def _postings(self, code: int) -> np.ndarray:
+        k = np.searchsorted(self.tri_codes, code)
+        if k == len(self.tri_codes) or self.tri_codes[k] != code: return np.zeros(0, dtype=np.int32)
+        return self.tri_rows[self.tri_indptr[k]:self.tri_indptr[k + 1]]
+
+    def _containing(self, text: str) -> np.ndarray:
+        """Index rows whose folded name contains text (unverified for multi-trigram queries)."""
+        q = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        if len(q) >= 3:
+            posting_lists = sorted((self._postings(int(c)) for c in np.unique(_trigram_codes(q))), key=len)
+            rows = posting_lists[0]
+            for p in posting_lists[1:]:
+                if len(rows) == 0: break
+                rows = np.intersect1d(rows, p, assume_unique=True)
+            return rows
+        hit = np.ones(max(len(self.blob) - len(q) + 1, 0), dtype=bool)
+        for k, b in enumerate(q.tolist()): hit &= self.blob[k:len(self.blob) - len(q) + 1 + k] == b
+        pos = np.flatnonzero(hit)
+        row = np.searchsorted(self.offsets, pos, side="right") - 1
+        return np.unique(row[pos + len(q) <= self.offsets[row + 1]])
+
+    def _rank(self, rows: np.ndarray) -> np.ndarray:
+        return rows[np.lexsort((rows, -self.degree[rows]))]
+
+    def search(self, text: str, limit: Optional[int] = 10, prefix: bool = False) -> List[int]:
+        """Author ids whose name contains (or starts with) text, case-insensitively, highest degree first."""
+        q = text.casefold()
+        if not q: return []
+        out = []
+        for r in self._rank(self._containing(q)).tolist():
+            name = self.folded[r]
+            if (name.startswith(q) if prefix else q in name):
+                out.append(int(self.ids[r]))
+                if limit is not None and len(out) >= limit: break
+        return out
+
+    def exact(self, text: str) -> Optional[int]:
+        """Highest-degree author whose case-folded name equals text."""
+        q = text.casefold()
+        if not q: return None
+        for r in self._rank(self._containing(q)).tolist():
+            if self.folded[r] == q: return int(self.ids[r])
+        return None
+
+    def resolve(self, preferred: str) -> Optional[str]:
+        """pick_target: exact name, then case-insensitive name, then best substring match, then the max-degree author."""
+        names = self.graph.names
+        if preferred in self.graph: return preferred
+        for i in (self.exact(preferred), next(iter(self.search(preferred, 1)), None), self.max_degree_id):
+            if i is not None: return names[i]
+        return None
+
+    def suggest(self, text: str, limit: int = 10) -> List[str]:
+        """Type-ahead: prefix matches first, then other substring matches, each ranked by degree.
+        Text shorter than MIN_SUGGEST_BYTES (utf-8, case-folded) gets no suggestions."""
+        if len(text.casefold().encode("utf-8")) < MIN_SUGGEST_BYTES: return []
+        ids = self.search(text, limit, prefix=True)
+        if len(ids) < limit:
+            seen = set(ids)
+            ids += [i for i in self.search(text, None) if i not in seen][:limit - len(ids)]
+        return [self.graph.names[i] for i in ids]
+
+def name_index_for(graph: IdGraph) -> NameIndex:
+    """The graph's NameIndex, built on first use and kept on the graph."""
+    index = getattr(graph, "_name_index", None)
+    if index is None:
+        index = NameIndex(graph); graph._name_index = index
+    return index
@@ -0,0 +1,95 @@
+# progress.py
+"""
+Progress and cancellation for long builds run off the UI thread.
+
+The thread doing the work activates a ProgressReporter (`with reporter.active(): ...`). Library code calls
+checkpoint(stage, rows=..., bytes_read=..., total_bytes=...) between chunks: it raises Cancelled once the
+reporter's token was cancelled, and otherwise posts a Progress record (at most every min_interval seconds
+per stage) to the reporter's thread-safe queue. The UI thread drains that queue (Tk after()) and is the only
+one touching widgets. Without an active reporter checkpoint() does nothing.
+"""
+import time, queue, threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, NamedTuple, Optional
+
+_active: ContextVar = ContextVar("progress_reporter", default=None)
+
+class Cancelled(Exception):
+    """Raised at a checkpoint after the run's CancelToken was cancelled."""
+
+class CancelToken:
+    """Thread-safe cancellation flag, set from the UI thread and checked by the worker between chunks."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set(): raise Cancelled()
+
+class Progress(NamedTuple):
+    stage: str
+    rows: int
+    bytes_read: int
+    total_bytes: int
+    elapsed: float          # seconds since the stage's first checkpoint
+    eta: Optional[float]    # seconds left, from the byte rate since the stage's first checkpoint
+
+    @property
+    def fraction(self) -> Optional[float]:
+        return min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else None
+
+class Finished(NamedTuple):
+    status: str   # "done", "cancelled" or "error"
+    value: Any
+
+class ProgressReporter:
+    """Queue of Progress records (then one Finished) from one run, plus the run's CancelToken."""
+    def __init__(self, token: Optional[CancelToken] = None, min_interval: float = 0.1):
+        self.token = token or CancelToken(); self.min_interval = min_interval
+        self.queue: "queue.Queue" = queue.Queue(); self._stages: Dict[str, List[float]] = {}
+
+    def active(self):
+        """Context manager making this the reporter of checkpoint() calls in the current thread."""
+        return _Activation(self)
+
+    def post(self, stage: str, rows: int = 0, bytes_read: int = 0, total_bytes: int = 0, force: bool = False):
+        now = time.perf_counter(); st = self._stages.get(stage)
+        if st is None: st = self._stages[stage] = [now, bytes_read, 0.0]  # start time, bytes at start (resumed reads), last post
+        elif not force and now - st[2] < self.min_interval: return
+        st[2] = now; elapsed = now - st[0]; done = bytes_read - st[1]
+        eta = (total_bytes - bytes_read) * elapsed / done if total_bytes and done > 0 else None
+        self.queue.put(Progress(stage, rows, bytes_read, total_bytes, elapsed, eta))
+
+    def finish(self, status: str, value: Any = None):
+        self.queue.put(Finished(status, value))
+
+    def drain(self) -> List:
+        """Everything posted since the last drain (non-blocking; call from the UI thread)."""
+        out = []
+        while True:
+            try: out.append(self.queue.get_nowait())
+            except queue.Empty: return out
+
+class _Activation:
+    def __init__(self, reporter: ProgressReporter): self.reporter = reporter
+    def __enter__(self): self.token = _active.set(self.reporter); return self.reporter
+    def __exit__(self, *exc): _active.reset(self.token); return False
+
+def checkpoint(stage: str, rows: int = 0, bytes_read: int = 0, total_bytes: int = 0):
+    """Cancellation point and progress report of the active run (no-op when none is active)."""
+    rep = _active.get()
+    if rep is None: return
+    rep.token.check(); rep.post(stage, rows, bytes_read, total_bytes)
+
+def format_progress(p: Progress) -> str:
+    if not p.rows and not p.total_bytes: return f"{p.stage}..."
+    text = f"{p.stage}: {p.rows:,} rows"
+    if p.total_bytes: text += f" · {p.bytes_read / 2 ** 20:,.1f} / {p.total_bytes / 2 ** 20:,.1f} MB ({p.fraction:.0%})"
+    if p.eta is not None: text += f" · ETA {int(p.eta) // 60}m {int(p.eta) % 60:02d}s"
+    return text
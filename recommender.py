@@ -1,51 +1,163 @@
 # recommender.py
-from typing import Dict, Set, List, Optional
-from collections import Counter as TCounter
-from metrics import candidate_set, common_neighbors_count, adamic_adar, journal_overlap, normalize
+import threading
+import numpy as np
+from typing import Dict, Set, List, Optional, NamedTuple, Tuple
+from collections import Counter as TCounter, OrderedDict
+from metrics import candidate_set, common_neighbors_count, adamic_adar, resource_allocation, journal_overlap, normalize
+from csr_graph import IdGraph, AuthorJournalsCSR, csr_positions
+from scoring import CandidateScores, score_candidates, normalize_array, top_k, explain_pair
+from propagation import katz_from, personalized_pagerank, lookup
+from name_index import name_index_for
+from instrument import stage, count
 
 Adjacency = Dict[str, TCounter]
 AuthorJournals = Dict[str, Set[str]]
 BAD_VENUES = {"", "nan", "none", "null", "n/a", "na", "n.a."}
+DEFAULT_WEIGHTS = (0.5, 0.3, 0.2)  # JJ, AA, CN
+DEFAULT_PATH_WEIGHTS = (0.0, 0.0, 0.0)  # RA, Katz, PPR
 
 def pick_target(adj: Adjacency, preferred: str) -> str:
-    if preferred in adj: return preferred
-    low = preferred.lower()
-    for n in adj.keys():
-        if n.lower() == low: return n
-    cand = [n for n in adj.keys() if low in n.lower()]
-    if cand: return cand[0]
-    best, best_deg = None, -1
-    for n, neigh in adj.items():
-        d = len(neigh)
-        if d > best_deg: best, best_deg = n, d
-    return best
+    with stage("pick_target"):
+        if preferred in adj: return preferred
+        if isinstance(adj, IdGraph): return name_index_for(adj).resolve(preferred)
+        low = preferred.lower()
+        for n in adj.keys():
+            if n.lower() == low: return n
+        cand = [n for n in adj.keys() if low in n.lower()]
+        if cand: return cand[0]
+        best, best_deg = None, -1
+        for n, neigh in adj.items():
+            d = len(neigh)
+            if d > best_deg: best, best_deg = n, d
+        return best
 
 def format_explanation(common_journals: List[str], jacc: float, common_neighbors: List[str]) -> str:
     cj = "; ".join(common_journals) if common_journals else "no common journal"
     cn = "; ".join(common_neighbors) if common_neighbors else "no common neighbor"
     return f"Common journals: {cj} (J={jacc:.2f}); Common neighbors: {cn}"
 
-def recommend(adj: Adjacency, author_journals: AuthorJournals, target: str, topk: int, include_neighbors: bool, w_aa: float, w_cn: float, w_jj: float, filter_journals: Optional[Set[str]] = None):
-    C = candidate_set(adj, target, include_neighbors=include_neighbors); recs = []; neighbors_target = set(adj[target].keys())
-    filter_set = None
-    if filter_journals is not None: filter_set = {j.strip().lower() for j in filter_journals if j.strip()}
-    for v in C:
-        cn = common_neighbors_count(adj, target, v); aa = adamic_adar(adj, target, v)
-        inter_j, union_j, jj = journal_overlap(author_journals, target, v)
-        clean_journals = [j for j in sorted(list(inter_j)) if j and j.strip().lower() not in BAD_VENUES]
-        if not clean_journals: continue
-        if filter_set is not None:
-            lower_j = {j.strip().lower() for j in clean_journals}
-            if not (lower_j & filter_set): continue
-        inter_neighbors = list(neighbors_target & set(adj[v].keys()))
-        inter_neighbors.sort(key=lambda z: len(adj[z]), reverse=True)
-        recs.append((v, cn, aa, jj, clean_journals[:5], inter_neighbors[:5]))
-    if not recs: return []
-    CNn = normalize([r[1] for r in recs]); AAn = normalize([r[2] for r in recs]); JJn = normalize([r[3] for r in recs])
-    scored = []
-    for (v, cn, aa, jj, common_journals, common_neighbors), cnv, aav, jjv in zip(recs, CNn, AAn, JJn):
-        score = w_aa * aav + w_cn * cnv + w_jj * jjv
-        explanation = format_explanation(common_journals, jj, common_neighbors)
-        scored.append((v, score, aa, cn, jj, common_journals, common_neighbors, explanation))
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:topk]
+def recommend(adj: Adjacency, author_journals: AuthorJournals, target: str, topk: int, include_neighbors: bool, w_aa: float, w_cn: float, w_jj: float, filter_journals: Optional[Set[str]] = None, candidate_mode: str = "two_hop",
+              w_ra: float = 0.0, w_katz: float = 0.0, w_ppr: float = 0.0):
+    """
+    Top-k collaborators for target: w_aa * AA + w_cn * CN + w_jj * JJ (+ w_ra * resource allocation, w_katz * truncated Katz,
+    w_ppr * personalized PageRank; see propagation.py), each min-max normalized over the kept candidates.
+    """
+    if isinstance(adj, IdGraph) and isinstance(author_journals, AuthorJournalsCSR):
+        return recommend_for_id(adj, author_journals, adj.id_of(target), topk, include_neighbors, w_aa, w_cn, w_jj, filter_journals, candidate_mode, w_ra, w_katz, w_ppr)
+    if candidate_mode != "two_hop": raise ValueError("Journal-community candidates need an id-based graph.")
+    if w_katz or w_ppr: raise ValueError("Katz and personalized PageRank need an id-based graph.")
+    with stage("candidate_set"):
+        C = candidate_set(adj, target, include_neighbors=include_neighbors); count(candidates=len(C))
+    with stage("scoring"):
+        recs = []; neighbors_target = set(adj[target].keys())
+        filter_set = None
+        if filter_journals is not None: filter_set = {j.strip().lower() for j in filter_journals if j.strip()}
+        for v in C:
+            cn = common_neighbors_count(adj, target, v); aa = adamic_adar(adj, target, v); ra = resource_allocation(adj, target, v) if w_ra else 0.0
+            inter_j, union_j, jj = journal_overlap(author_journals, target, v)
+            clean_journals = [j for j in sorted(list(inter_j)) if j and j.strip().lower() not in BAD_VENUES]
+            if not clean_journals: continue
+            if filter_set is not None:
+                lower_j = {j.strip().lower() for j in clean_journals}
+                if not (lower_j & filter_set): continue
+            inter_neighbors = list(neighbors_target & set(adj[v].keys()))
+            inter_neighbors.sort(key=lambda z: len(adj[z]), reverse=True)
+            recs.append((v, cn, aa, jj, clean_journals[:5], inter_neighbors[:5], ra))
+        if not recs: return []
+        CNn = normalize([r[1] for r in recs]); AAn = normalize([r[2] for r in recs]); JJn = normalize([r[3] for r in recs]); RAn = normalize([r[6] for r in recs])
+        scored = []
+        for (v, cn, aa, jj, common_journals, common_neighbors, _), cnv, aav, jjv, rav in zip(recs, CNn, AAn, JJn, RAn):
+            score = w_aa * aav + w_cn * cnv + w_jj * jjv + w_ra * rav
+            explanation = format_explanation(common_journals, jj, common_neighbors)
+            scored.append((v, score, aa, cn, jj, common_journals, common_neighbors, explanation))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:topk]
+
+class TargetFeatures(NamedTuple):
+    """Feature stage of one target: raw and min-max normalized features of every candidate, weight independent."""
+    u: int
+    scores: CandidateScores
+    common_rows: np.ndarray  # (candidate row, journal id) of every journal a candidate shares with u,
+    common_journals: np.ndarray  # so journal filters can be applied at ranking time
+    raw: Dict[str, np.ndarray]   # katz / ppr, computed the first time a ranking weights them
+    norm: Dict[str, np.ndarray]  # normalized features over all candidates, filled as used
+    explained: Dict[int, Tuple[List[str], List[str]]]  # explain_pair results, filled as rows are shown
+
+def target_features(graph: IdGraph, journals: AuthorJournalsCSR, u: int, include_neighbors: bool,
+                    filter_journals: Optional[Set[str]] = None, candidate_mode: str = "two_hop") -> TargetFeatures:
+    """Score every candidate of u once; rank_features() then combines them for any weights."""
+    with stage("score_candidates"): sc = score_candidates(graph, journals, u, include_neighbors, filter_journals, candidate_mode)
+    jmask = np.zeros(len(journals.journals), dtype=bool); jmask[journals.journals_of(u)] = True
+    rows = np.repeat(np.arange(len(sc.ids)), journals.counts(sc.ids))
+    cj = journals.indices[csr_positions(journals.indptr, sc.ids)].astype(np.int64); common = jmask[cj]
+    return TargetFeatures(u, sc, rows[common], cj[common], {}, {}, {})
+
+def feature_values(graph: IdGraph, feats: TargetFeatures, name: str) -> np.ndarray:
+    """Raw values of one feature (cn, aa, jj, ra, katz, ppr) aligned with feats.scores.ids."""
+    if name in ("cn", "aa", "jj", "ra"): return getattr(feats.scores, name).astype(float)
+    if name not in feats.raw:
+        with stage(name):
+            vector = katz_from(graph, feats.u) if name == "katz" else personalized_pagerank(graph, feats.u)
+            feats.raw[name] = lookup(vector, feats.scores.ids); count(support=len(vector[0]))
+    return feats.raw[name]
+
+def rank_features(graph: IdGraph, journals: AuthorJournalsCSR, feats: TargetFeatures, topk: int, w_aa: float, w_cn: float, w_jj: float,
+                  filter_journals: Optional[Set[str]] = None, w_ra: float = 0.0, w_katz: float = 0.0, w_ppr: float = 0.0):
+    """Ranking stage: weights, journal filter and top-k over cached features, in recommend()'s output format."""
+    weights = {"aa": w_aa, "cn": w_cn, "jj": w_jj, "ra": w_ra, "katz": w_katz, "ppr": w_ppr}
+    with stage("rank"):
+        sc = feats.scores
+        if filter_journals is None:
+            rows = np.arange(len(sc.ids))
+        else:
+            hit = np.isin(feats.common_journals, journals.journal_ids_named(filter_journals))
+            rows = np.flatnonzero(np.bincount(feats.common_rows[hit], minlength=len(sc.ids)))
+        if len(rows) == 0: return []
+        score = np.zeros(len(rows))
+        for name, w in weights.items():
+            if w == 0 and name not in ("aa", "cn", "jj"): continue
+            if filter_journals is not None: score += w * normalize_array(feature_values(graph, feats, name)[rows])
+            else:
+                if name not in feats.norm: feats.norm[name] = normalize_array(feature_values(graph, feats, name))
+                score += w * feats.norm[name]
+        scored = []
+        for r in top_k(score, topk).tolist():
+            i = int(rows[r]); v = int(sc.ids[i])
+            if v not in feats.explained: feats.explained[v] = explain_pair(graph, journals, feats.u, v)
+            common_journals, common_neighbors = feats.explained[v]; jj = float(sc.jj[i])
+            scored.append((graph.names[v], float(score[r]), float(sc.aa[i]), sc.cn[i].item(), jj, common_journals, common_neighbors, format_explanation(common_journals, jj, common_neighbors)))
+        return scored
+
+def recommend_for_id(graph: IdGraph, journals: AuthorJournalsCSR, u: int, topk: int, include_neighbors: bool, w_aa: float, w_cn: float, w_jj: float, filter_journals: Optional[Set[str]] = None, candidate_mode: str = "two_hop",
+                     w_ra: float = 0.0, w_katz: float = 0.0, w_ppr: float = 0.0):
+    """recommend() over integer ids: all candidates are scored at once, explanations only for the returned rows."""
+    feats = target_features(graph, journals, u, include_neighbors, filter_journals, candidate_mode)
+    return rank_features(graph, journals, feats, topk, w_aa, w_cn, w_jj, None, w_ra, w_katz, w_ppr)
+
+class FeatureCache:
+    """
+    Feature stage results of the last max_targets (target, include_neighbors, candidate_mode) of one graph.
+    Features are computed without a journal filter, so changing weights, filter or top-k only re-ranks.
+    Can be shared between threads (the desktop app re-ranks on a lookup thread while a run may use it).
+    """
+    def __init__(self, graph: IdGraph, journals: AuthorJournalsCSR, max_targets: int = 32):
+        self.graph, self.journals, self.max_targets = graph, journals, max_targets
+        self._entries: "OrderedDict[Tuple[int, bool, str], TargetFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def features(self, u: int, include_neighbors: bool, candidate_mode: str = "two_hop") -> TargetFeatures:
+        key = (u, include_neighbors, candidate_mode)
+        with self._lock:
+            feats = self._entries.get(key)
+            if feats is not None: self._entries.move_to_end(key); return feats
+        feats = target_features(self.graph, self.journals, u, include_neighbors, None, candidate_mode)
+        with self._lock:
+            self._entries[key] = feats
+            while len(self._entries) > self.max_targets: self._entries.popitem(last=False)
+        return feats
+
+    def recommend(self, target: str, topk: int, include_neighbors: bool, w_aa: float, w_cn: float, w_jj: float,
+                  filter_journals: Optional[Set[str]] = None, candidate_mode: str = "two_hop", w_ra: float = 0.0, w_katz: float = 0.0, w_ppr: float = 0.0):
+        """recommend() for a target name, reusing its cached features."""
+        feats = self.features(self.graph.id_of(target), include_neighbors, candidate_mode)
+        return rank_features(self.graph, self.journals, feats, topk, w_aa, w_cn, w_jj, filter_journals, w_ra, w_katz, w_ppr)
@@ -0,0 +1,126 @@
+# scoring.py
+import numpy as np
+from functools import partial
+from typing import List, NamedTuple, Optional, Set, Tuple
+from csr_graph import IdGraph, AuthorJournalsCSR, csr_positions
+from instrument import count
+
+class CandidateScores(NamedTuple):
+    """Raw features of every kept candidate of one target, as aligned arrays."""
+    ids: np.ndarray  # candidate author ids
+    cn: np.ndarray   # common neighbors count (link-strength weighted on graphs with fractional links)
+    aa: np.ndarray   # Adamic–Adar
+    jj: np.ndarray   # journal Jaccard
+    ra: np.ndarray   # resource allocation
+
+def inverse_log_degree(degree: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(degree), dtype=float); big = degree > 1
+    out[big] = 1.0 / np.log(degree[big])
+    return out
+
+def link_strength(weights: np.ndarray) -> np.ndarray:
+    """Co-author link strength in [0, 1]: 1 for authors sharing a regular paper, the summed 1/(n-1) otherwise
+    (or the summed decay of older papers on a half_life graph)."""
+    return np.minimum(weights, 1.0)
+
+CANDIDATE_MODES = ("two_hop", "journal")
+
+def filter_journal_ids(journals: AuthorJournalsCSR, among: np.ndarray, filter_journals: Optional[Set[str]]) -> Optional[np.ndarray]:
+    """Journal ids (restricted to among) whose case-folded name is in filter_journals; None means no filter."""
+    if filter_journals is None: return None
+    return np.intersect1d(journals.journal_ids_named(filter_journals), among)
+
+def pair_features(graph: IdGraph, is_nb: np.ndarray, cand: np.ndarray, link: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CN, Adamic–Adar and resource allocation between the target (is_nb marks its neighbors) and each of cand, expanding only cand's rows.
+    link (the target's link strength per author) weights each common neighbor z by strength(u, z) * strength(z, v)."""
+    rows, dst, *w = graph.expand(cand, with_weights=link is not None); hit = is_nb[dst]
+    rows, dst = rows[hit], dst[hit]; deg = graph.degree_of(dst)
+    pw = link[dst] * link_strength(w[0][hit]) if link is not None else None
+    cn = np.bincount(rows, weights=pw, minlength=len(cand))
+    aa = np.bincount(rows, weights=inverse_log_degree(deg) * (1.0 if pw is None else pw), minlength=len(cand))
+    ra = np.bincount(rows, weights=(1.0 if pw is None else pw) / deg, minlength=len(cand))
+    return cn, aa, ra
+
+def score_candidates(graph: IdGraph, journals: AuthorJournalsCSR, u: int, include_neighbors: bool,
+                     filter_journals: Optional[Set[str]] = None, candidate_mode: str = "two_hop") -> CandidateScores:
+    """
+    CN, Adamic–Adar, journal Jaccard and resource allocation for the whole candidate set of u at once.
+    Candidates without a common journal (or without one in filter_journals) are dropped, as in recommend().
+    A journal filter is pushed down: when the filtered journals' posting lists are smaller than the 2-hop
+    expansion, candidates come from those lists and only their rows are expanded.
+    candidate_mode "journal" takes every author sharing a (filtered) journal with u, also beyond 2 hops.
+    On graphs with fractional links (down-weighted mega papers, time-decayed edges) CN, AA and RA are link-strength weighted.
+    """
+    if candidate_mode not in CANDIDATE_MODES: raise ValueError(f"Unknown candidate mode: {candidate_mode}")
+    empty = CandidateScores(np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]), np.array([]), np.array([]))
+    link = None
+    if graph.fractional_links:
+        _, nb, w = graph.expand(np.array([u]), with_weights=True); link = np.zeros(graph.num_nodes); link[nb] = link_strength(w)
+    else:
+        nb = graph.neighbors(u).astype(np.int64)
+    ju = journals.journals_of(u).astype(np.int64)
+    allowed = filter_journal_ids(journals, ju, filter_journals)
+    if len(ju) == 0 or (allowed is not None and len(allowed) == 0): return empty
+    source = allowed if allowed is not None else ju
+    two_hop_cost = int(graph.degree_of(nb).sum()) + (graph.num_nodes if include_neighbors else 0)
+    if candidate_mode == "journal" or (allowed is not None and journals.posting_size(source) < two_hop_cost):
+        cand = journals.authors_of(source); cand = cand[cand != u].astype(np.int64)
+        is_nb = np.zeros(graph.num_nodes, dtype=bool); is_nb[nb] = True
+        cn, aa, ra = pair_features(graph, is_nb, cand, link)
+        if candidate_mode == "journal": keep = np.ones(len(cand), dtype=bool) if include_neighbors else ~is_nb[cand]
+        else: keep = graph.degree_of(cand) > 0 if include_neighbors else (cn > 0) & ~is_nb[cand]
+        cand, cn, aa, ra = cand[keep], cn[keep], aa[keep], ra[keep]
+    else:
+        n = graph.num_nodes
+        # without neighbors as candidates, paths through u's own papers are not needed (see IdGraph.expand_beyond)
+        hop = graph.expand if include_neighbors else partial(graph.expand_beyond, u)
+        rows, dst, *w = hop(nb, with_weights=link is not None)
+        pw = link[nb][rows] * link_strength(w[0]) if link is not None else None
+        cn_all = np.bincount(dst, weights=pw, minlength=n)
+        nb_deg = graph.degree_of(nb)
+        aa_all = np.bincount(dst, weights=inverse_log_degree(nb_deg)[rows] * (1.0 if pw is None else pw), minlength=n)
+        ra_all = np.bincount(dst, weights=(1.0 / nb_deg)[rows] * (1.0 if pw is None else pw), minlength=n)
+        if include_neighbors:
+            cand = graph.connected_ids(); cand = cand[cand != u]
+        else:
+            mask = cn_all > 0; mask[nb] = False; mask[u] = False
+            cand = np.flatnonzero(mask)
+        cn, aa, ra = cn_all[cand], aa_all[cand], ra_all[cand]
+    count(candidates=len(cand))
+    if len(cand) == 0: return empty
+    jmask = np.zeros(len(journals.journals), dtype=bool); jmask[ju] = True
+    counts = journals.counts(cand); rows = np.repeat(np.arange(len(cand)), counts)
+    cj = journals.indices[csr_positions(journals.indptr, cand)]
+    inter = np.bincount(rows, weights=jmask[cj], minlength=len(cand))
+    keep = inter > 0
+    if allowed is not None:
+        amask = np.zeros(len(journals.journals), dtype=bool); amask[allowed] = True
+        keep &= np.bincount(rows, weights=amask[cj], minlength=len(cand)) > 0
+    jj = inter[keep] / (len(ju) + counts[keep] - inter[keep]); count(kept=int(keep.sum()))
+    return CandidateScores(cand[keep], cn[keep], aa[keep], jj, ra[keep])
+
+def normalize_array(values: np.ndarray) -> np.ndarray:
+    """Array version of metrics.normalize (min-max to [0, 1], zeros when constant)."""
+    if len(values) == 0: return np.zeros(0)
+    m = values.min(); M = values.max()
+    if M <= m: return np.zeros(len(values))
+    return (values - m) / (M - m)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (ties by position); selection instead of a full sort."""
+    if k <= 0 or len(scores) == 0: return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+        # include every element tied with the k-th score so the tie-break below is stable
+        part = np.flatnonzero(scores >= scores[part].min())
+    else:
+        part = np.arange(len(scores))
+    return part[np.lexsort((part, -scores[part]))][:k]
+
+def explain_pair(graph: IdGraph, journals: AuthorJournalsCSR, u: int, v: int, limit: int = 5) -> Tuple[List[str], List[str]]:
+    """Common journals (by name) and common neighbors (by degree, descending) of u and v."""
+    cj = np.intersect1d(journals.journals_of(u), journals.journals_of(v), assume_unique=True)
+    common_journals = sorted(journals.journals[j] for j in cj.tolist())[:limit]
+    common = np.intersect1d(graph.neighbors(u), graph.neighbors(v), assume_unique=True)
+    common = common[np.argsort(-graph.degree_of(common), kind="stable")][:limit]
+    return common_journals, [graph.names[z] for z in common.tolist()]
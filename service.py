@@ -0,0 +1,280 @@
+# service.py
+"""
+Warm-graph recommendation service: the graph is loaded once (through the snapshot cache) and queries are
+answered over a small asyncio HTTP/1.1 server (standard library only). Results are cached in an LRU of
+encoded responses bounded by bytes and entries; concurrent identical queries share one computation.
+
+    python service.py serve --csv dataset/dblp_2021_2023.csv --port 8765
+    python service.py query --target "Ernesto Damiani" --topk 10
+
+Endpoints (GET query string or POST JSON body):
+    /recommend  target, topk, include_neighbors, weights=JJ,AA,CN, path_weights=RA,KATZ,PPR, journals=a;b, mode=two_hop|journal
+    /suggest    q, limit
+    /stats      graph summary and cache statistics
+"""
+import os, sys, json, time, asyncio, argparse
+import urllib.parse, urllib.request, urllib.error
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from data_loader import DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL, DEFAULT_MAX_TRAIN_ROWS
+from graph_cache import GraphCache, DEFAULT_CACHE_DIR, cached_ingest
+from graph_builder import IngestResult, default_workers
+from recommender import pick_target, recommend, DEFAULT_WEIGHTS, DEFAULT_PATH_WEIGHTS
+from name_index import name_index_for
+from scoring import CANDIDATE_MODES
+from bipartite import MEGA_PAPER_POLICIES, DEFAULT_MAX_TEAM
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_RESULT_CACHE_BYTES = 64 * 1024 ** 2
+DEFAULT_RESULT_CACHE_ENTRIES = 10_000
+MAX_BODY = 1 << 20
+
+class ResultCache:
+    """LRU of encoded responses bounded by total bytes and entry count, with hit / miss / eviction counters."""
+    def __init__(self, max_bytes: int = DEFAULT_RESULT_CACHE_BYTES, max_entries: int = DEFAULT_RESULT_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        body = self.entries.get(key)
+        if body is None: self.misses += 1; return None
+        self.entries.move_to_end(key); self.hits += 1
+        return body
+
+    def put(self, key: Tuple, body: bytes):
+        if len(body) > self.max_bytes: return
+        old = self.entries.pop(key, None)
+        if old is not None: self.bytes -= len(old)
+        self.entries[key] = body; self.bytes += len(body)
+        while self.bytes > self.max_bytes or len(self.entries) > self.max_entries:
+            _, evicted = self.entries.popitem(last=False); self.bytes -= len(evicted); self.evictions += 1
+
+    def clear(self):
+        self.entries.clear(); self.bytes = 0
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes, "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+def parse_query(params: Dict) -> Dict:
+    """Normalized recommend parameters from query-string or JSON values (strings or native types)."""
+    def flag(v): return v if isinstance(v, bool) else str(v).strip().lower() in ("1", "true", "yes", "on")
+    weights = params.get("weights", DEFAULT_WEIGHTS)
+    if isinstance(weights, str): weights = [float(x) for x in weights.split(",")]
+    if len(weights) != 3: raise ValueError("weights must be JJ,AA,CN")
+    path_weights = params.get("path_weights") or DEFAULT_PATH_WEIGHTS
+    if isinstance(path_weights, str): path_weights = [float(x) for x in path_weights.split(",")]
+    if len(path_weights) != 3: raise ValueError("path_weights must be RA,KATZ,PPR")
+    journals = params.get("journals")
+    if isinstance(journals, str): journals = [j for j in journals.split(";")]
+    journals = sorted({j.strip().lower() for j in journals if j.strip()}) if journals else None  # matched case-insensitively
+    mode = params.get("mode", "two_hop")
+    if mode not in CANDIDATE_MODES: raise ValueError(f"Unknown candidate mode: {mode}")
+    return {"target": str(params.get("target", "")).strip(), "topk": max(1, int(params.get("topk", 25))),
+            "include_neighbors": flag(params.get("include_neighbors", False)),
+            "weights": tuple(round(float(w), 6) for w in weights), "path_weights": tuple(round(float(w), 6) for w in path_weights),
+            "journals": journals, "mode": mode}
+
+class RecommendService:
+    """The warm graph plus the result cache; graph work (target lookup, type-ahead, recommend()) runs in a thread pool
+    so the event loop stays responsive."""
+    def __init__(self, result: IngestResult, cache: ResultCache, workers: Optional[int] = None, info: Optional[Dict] = None):
+        self.result = result
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.inflight: Dict[Tuple, asyncio.Future] = {}
+        self.info = info or {}
+        self.queries = 0
+        self.started = time.time()
+        name_index_for(result.adj)  # build before the first query
+
+    def _compute(self, key: Tuple, q: Dict, target: str) -> bytes:
+        r = self.result; jj, aa, cn = q["weights"]; ra, katz, ppr = q["path_weights"]
+        t0 = time.perf_counter()
+        recs = recommend(r.adj, r.author_journals, target, q["topk"], q["include_neighbors"], w_aa=aa, w_cn=cn, w_jj=jj,
+                         filter_journals=set(q["journals"]) if q["journals"] else None, candidate_mode=q["mode"], w_ra=ra, w_katz=katz, w_ppr=ppr)
+        return json.dumps({"target": target, "params": {**q, "target": target}, "compute_ms": round((time.perf_counter() - t0) * 1000, 3),
+                           "recommendations": [{"candidate": v, "score": s, "aa": a, "cn": c, "jj": j, "common_journals": cj,
+                                                "common_neighbors": cnb, "explanation": ex} for (v, s, a, c, j, cj, cnb, ex) in recs]},
+                          ensure_ascii=False).encode("utf-8")
+
+    async def recommend(self, params: Dict) -> bytes:
+        q = parse_query(params); self.queries += 1; loop = asyncio.get_running_loop()
+        target = await loop.run_in_executor(self.pool, pick_target, self.result.adj, q["target"])
+        if target is None: raise KeyError("empty graph")
+        key = (target, q["topk"], q["include_neighbors"], q["weights"], q["path_weights"], tuple(q["journals"] or ()), q["mode"])
+        body = self.cache.get(key)
+        if body is not None: return body
+        pending = self.inflight.get(key)
+        if pending is not None: return await asyncio.shield(pending)
+        fut = loop.run_in_executor(self.pool, self._compute, key, q, target)
+        self.inflight[key] = fut
+        try:
+            body = await fut
+        finally:
+            self.inflight.pop(key, None)
+        self.cache.put(key, body)
+        return body
+
+    async def suggest(self, params: Dict) -> bytes:
+        index = name_index_for(self.result.adj)
+        names = await asyncio.get_running_loop().run_in_executor(self.pool, index.suggest, str(params.get("q", "")), int(params.get("limit", 10)))
+        return json.dumps({"suggestions": names}, ensure_ascii=False).encode("utf-8")
+
+    def stats(self) -> Dict:
+        r = self.result
+        return {"graph": {"split_year": r.split_year, "used_rows": r.used_rows, "nodes": len(r.nodes), "edges": r.adj.num_edges, **self.info},
+                "queries": self.queries, "inflight": len(self.inflight), "uptime_s": round(time.time() - self.started, 1),
+                "result_cache": self.cache.stats()}
+
+async def _read_request(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line: return None
+    method, target, version = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""): break
+        name, _, value = h.decode("latin-1").partition(":"); headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY: raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version.strip(), headers, body
+
+def _response(status: int, body: bytes, keep_alive: bool) -> bytes:
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}.get(status, "Error")
+    head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+async def _dispatch(service: RecommendService, method: str, target: str, body: bytes) -> Tuple[int, bytes]:
+    url = urllib.parse.urlsplit(target)
+    params = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+    if method == "POST" and body: params.update(json.loads(body.decode("utf-8")))
+    if url.path == "/recommend": return 200, await service.recommend(params)
+    if url.path == "/suggest": return 200, await service.suggest(params)
+    if url.path == "/stats": return 200, json.dumps(service.stats()).encode("utf-8")
+    return 404, json.dumps({"error": f"unknown path {url.path}"}).encode("utf-8")
+
+async def _handle(service: RecommendService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                req = await _read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                writer.write(_response(400, b'{"error": "malformed request"}', False)); break
+            if req is None: break
+            method, target, version, headers, body = req
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            try:
+                status, out = await _dispatch(service, method, target, body)
+            except (ValueError, KeyError, TypeError) as e:
+                status, out = 400, json.dumps({"error": str(e)}).encode("utf-8")
+            except Exception as e:
+                status, out = 500, json.dumps({"error": repr(e)}).encode("utf-8")
+            writer.write(_response(status, out, keep_alive)); await writer.drain()
+            if not keep_alive: break
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(service: RecommendService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, ready=None):
+    server = await asyncio.start_server(lambda r, w: _handle(service, r, w), host, port)
+    if ready is not None: ready(server)
+    async with server: await server.serve_forever()
+
+class RecommendClient:
+    """Blocking client; recommend() returns the same tuples as recommender.recommend()."""
+    def __init__(self, url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout: float = 60.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path: str, payload: Optional[Dict] = None) -> Dict:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp: return json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read().decode("utf-8")).get("error", str(e))) from None
+
+    def recommend_raw(self, target: str, topk: int = 25, include_neighbors: bool = False, weights=DEFAULT_WEIGHTS,
+                      journals: Optional[List[str]] = None, mode: str = "two_hop", path_weights=DEFAULT_PATH_WEIGHTS) -> Dict:
+        return self._call("/recommend", {"target": target, "topk": topk, "include_neighbors": include_neighbors, "weights": list(weights),
+                                         "path_weights": list(path_weights), "journals": list(journals) if journals else None, "mode": mode})
+
+    def recommend(self, target: str, topk: int = 25, include_neighbors: bool = False, weights=DEFAULT_WEIGHTS,
+                  journals: Optional[List[str]] = None, mode: str = "two_hop", path_weights=DEFAULT_PATH_WEIGHTS) -> Tuple[str, list]:
+        """(resolved target, recommendation tuples)."""
+        out = self.recommend_raw(target, topk, include_neighbors, weights, journals, mode, path_weights)
+        return out["target"], [(r["candidate"], r["score"], r["aa"], r["cn"], r["jj"], r["common_journals"], r["common_neighbors"], r["explanation"])
+                               for r in out["recommendations"]]
+
+    def suggest(self, text: str, limit: int = 10) -> List[str]:
+        return self._call("/suggest?" + urllib.parse.urlencode({"q": text, "limit": limit}))["suggestions"]
+
+    def stats(self) -> Dict:
+        return self._call("/stats")
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Warm-graph recommendation service and client.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--csv", required=True)
+    s.add_argument("--host", default=DEFAULT_HOST)
+    s.add_argument("--port", type=int, default=DEFAULT_PORT)
+    s.add_argument("--split-year", type=int, default=None)
+    s.add_argument("--train-frac", type=float, default=0.8)
+    s.add_argument("--max-rows", type=int, default=DEFAULT_MAX_TRAIN_ROWS, help="0 = all rows")
+    s.add_argument("--incidence", action="store_true")
+    s.add_argument("--max-team", type=int, default=DEFAULT_MAX_TEAM, help="0 = no limit")
+    s.add_argument("--mega-policy", choices=MEGA_PAPER_POLICIES, default="keep")
+    s.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    s.add_argument("--ingest-workers", type=int, default=1, help="processes parsing the CSV on a cache miss (0 = one per CPU)")
+    s.add_argument("--result-cache-mb", type=float, default=DEFAULT_RESULT_CACHE_BYTES / 1024 ** 2)
+    s.add_argument("--result-cache-entries", type=int, default=DEFAULT_RESULT_CACHE_ENTRIES)
+    s.add_argument("--workers", type=int, default=None, help="query threads, default: one per CPU")
+    q = sub.add_parser("query")
+    q.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    q.add_argument("--target", default=None)
+    q.add_argument("--topk", type=int, default=25)
+    q.add_argument("--include-neighbors", action="store_true")
+    q.add_argument("--weights", type=float, nargs=3, metavar=("JJ", "AA", "CN"), default=DEFAULT_WEIGHTS)
+    q.add_argument("--path-weights", type=float, nargs=3, metavar=("RA", "KATZ", "PPR"), default=DEFAULT_PATH_WEIGHTS)
+    q.add_argument("--journals", default=None, help="journal filter, ';'-separated")
+    q.add_argument("--mode", choices=CANDIDATE_MODES, default="two_hop")
+    q.add_argument("--suggest", default=None, help="type-ahead instead of a recommendation")
+    q.add_argument("--stats", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "query":
+        client = RecommendClient(args.url)
+        if args.stats: out = client.stats()
+        elif args.suggest is not None: out = client.suggest(args.suggest)
+        else: out = client.recommend_raw(args.target or "", args.topk, args.include_neighbors, args.weights,
+                                         args.journals.split(";") if args.journals else None, args.mode, args.path_weights)
+        print(json.dumps(out, indent=2, ensure_ascii=False)); return
+
+    t0 = time.perf_counter()
+    result, hit = cached_ingest(GraphCache(args.cache_dir), args.csv, DEFAULT_AUTHORS_COL, DEFAULT_YEAR_COL, DEFAULT_VENUE_COL,
+                                args.split_year, args.train_frac, args.max_rows or None, 20000, True, args.incidence, args.max_team or None, args.mega_policy,
+                                args.ingest_workers or default_workers())
+    info = {"csv": os.path.abspath(args.csv), "storage": "bipartite" if args.incidence else "csr", "from_cache": hit}
+    service = RecommendService(result, ResultCache(int(args.result_cache_mb * 1024 ** 2), args.result_cache_entries), args.workers, info)
+    print(f"graph {'from cache' if hit else 'built'} in {time.perf_counter() - t0:.1f}s: {len(result.nodes)} nodes; "
+          f"listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
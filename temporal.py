@@ -0,0 +1,269 @@
+# temporal.py
+"""
+Year-layered co-authorship graph: one read of the CSV kept as per-year layers, so the graph as of any
+split year (or for a window of years) is assembled without reading the CSV again.
+
+Each layer holds the edge weights and the author–venue pairs of one publication year. Cumulative prefix
+aggregates (edge weights and venue counts over all years <= Y) are built on demand from the nearest cached
+prefix, so as_of(Y) costs one prefix lookup plus the CSR build, and window(Y1, Y2) is the difference of two
+prefixes. Row caps depend on file order and are not supported here; capped builds go through ingest_csv.
+
+    layers = build_year_layers("dblp.csv", "authors", "mdate", "journal")
+    res = layers.as_of(2022)   # same graph as ingest_csv(..., split_year=2022, max_rows=None, as_csr=True)
+    res = layers.window(2019, 2022, half_life=2.0)
+"""
+import numpy as np
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from data_loader import split_year_from_counts
+from graph_builder import ChunkParts, ParsedCSV, IngestResult, ReadState, parsed_chunks
+from csr_graph import CSRGraph, AuthorJournalsCSR, NameTable, encode_strings, decode_strings
+from graph_cache import GraphCache
+from instrument import stage
+from progress import checkpoint
+
+BASE = 0          # rows of chunks without a year column: part of every graph
+UNDATED_LAYER = 1 # rows whose year does not parse: only in the graph without a split year
+FIRST_YEAR = 2    # layer of years[0]; years are ascending
+DEFAULT_PREFIX_CACHE = 4
+
+class _Records:
+    """Compact (year code, a, b, w) records gathered chunk by chunk, so parsed chunks can be dropped while reading.
+    Year codes are dense (see _Collector), so any parsed year fits."""
+    def __init__(self):
+        self.cols: List[List[np.ndarray]] = [[], [], [], []]
+
+    def add(self, code: np.ndarray, a: np.ndarray, b: np.ndarray, w: np.ndarray):
+        for col, x, dt in zip(self.cols, (code, a, b, w), (np.int32, np.int32, np.int32, np.int32)): col.append(x.astype(dt))
+
+    def arrays(self) -> List[np.ndarray]:
+        out = [np.concatenate(col) if col else np.zeros(0, dtype=np.int32) for col in self.cols]
+        self.cols = [[x] for x in out]  # one block per column from now on, so the records stay valid for another finish
+        return out
+
+def _pair_table(layer, a, b, w, num_a: int, num_b: int, num_layers: int):
+    """Distinct (a, b) pairs, and per layer the (pair, summed weight) entries, sorted by layer. One sort of
+    (layer, a, b) keys aggregates records of the same pair and year from different chunks."""
+    layer = layer.astype(np.int64)
+    span = max(num_a, 1) * max(num_b, 1)
+    key, inv = np.unique(layer * span + a.astype(np.int64) * max(num_b, 1) + b, return_inverse=True)
+    w = np.bincount(inv.ravel(), weights=w, minlength=len(key)).astype(np.int32); del inv
+    ptr = np.searchsorted(key // span, np.arange(num_layers + 1))
+    pkeys, pair = np.unique(key % span, return_inverse=True)
+    return (pkeys // max(num_b, 1)).astype(np.int32), (pkeys % max(num_b, 1)).astype(np.int32), ptr, pair.ravel().astype(np.int32), w
+
+class _Collector:
+    """Records of every chunk read so far. Years are coded in first-seen order while reading (BASE for chunks
+    without a year column, UNDATED_LAYER for rows whose year does not parse, FIRST_YEAR + k for the k-th year seen);
+    finish() maps the codes to layers in year order."""
+    def __init__(self):
+        self.edges, self.venues, self.rows = _Records(), _Records(), Counter()
+        self.year_codes: Dict[int, int] = {}
+
+    def _code(self, year: int) -> int:
+        c = self.year_codes.get(year)
+        if c is None: c = self.year_codes[year] = FIRST_YEAR + len(self.year_codes)
+        return c
+
+    def _codes(self, years: np.ndarray) -> np.ndarray:
+        out = np.full(len(years), UNDATED_LAYER, dtype=np.int32); dated = ~np.isnan(years)
+        vals, inv = np.unique(years[dated], return_inverse=True)
+        out[dated] = np.asarray([self._code(int(y)) for y in vals.tolist()], dtype=np.int32)[inv.ravel()]
+        return out
+
+    def add(self, p: ChunkParts):
+        for y, c in p.row_years.items(): self.rows[BASE if not p.dated else UNDATED_LAYER if y is None else self._code(y)] += c
+        code = lambda df: self._codes(df["year"].to_numpy()) if p.dated else np.full(len(df), BASE)
+        self.edges.add(code(p.pairs), p.pairs["u"].to_numpy(), p.pairs["v"].to_numpy(), p.pairs["w"].to_numpy())
+        self.venues.add(code(p.venues), p.venues["author"].to_numpy(), p.venues["venue"].to_numpy(), np.ones(len(p.venues)))
+
+    def finish(self, authors: List[str], venues: List[str], year_counts: Counter) -> "YearLayers":
+        years = np.array(sorted(self.year_codes), dtype=np.int64)
+        layer_of = np.arange(FIRST_YEAR + len(years), dtype=np.int64)  # year code -> layer
+        layer_of[[self.year_codes[y] for y in years.tolist()]] = np.arange(FIRST_YEAR, FIRST_YEAR + len(years))
+        layer_rows = np.zeros(len(layer_of), dtype=np.int64)
+        for code, c in self.rows.items(): layer_rows[layer_of[code]] += c
+        code, a, b, w = self.edges.arrays()
+        pair_u, pair_v, edge_ptr, edge_pair, edge_w = _pair_table(layer_of[code], a, b, w, len(authors), len(authors), len(layer_of))
+        code, a, b, w = self.venues.arrays()
+        av_author, av_venue, venue_ptr, venue_pair, _ = _pair_table(layer_of[code], a, b, w, len(authors), len(venues), len(layer_of))
+        return YearLayers(authors, venues, years, layer_rows, year_counts, pair_u, pair_v, edge_ptr, edge_pair, edge_w,
+                          av_author, av_venue, venue_ptr, venue_pair)
+
+class YearLayers:
+    """
+    Edge and author–venue layers per publication year over global author / venue ids (first-seen order).
+    Edge entries (edge_pair, edge_w) and venue entries (venue_pair) are grouped by layer through edge_ptr / venue_ptr.
+    """
+    def __init__(self, authors: List[str], venues: List[str], years: np.ndarray, layer_rows: np.ndarray, year_counts: Counter,
+                 pair_u: np.ndarray, pair_v: np.ndarray, edge_ptr: np.ndarray, edge_pair: np.ndarray, edge_w: np.ndarray,
+                 av_author: np.ndarray, av_venue: np.ndarray, venue_ptr: np.ndarray, venue_pair: np.ndarray,
+                 prefix_cache: int = DEFAULT_PREFIX_CACHE):
+        self.authors, self.venues, self.years, self.layer_rows, self.year_counts = authors, venues, years, layer_rows, year_counts
+        self.pair_u, self.pair_v, self.edge_ptr, self.edge_pair, self.edge_w = pair_u, pair_v, edge_ptr, edge_pair, edge_w
+        self.av_author, self.av_venue, self.venue_ptr, self.venue_pair = av_author, av_venue, venue_ptr, venue_pair
+        self.prefix_cache = prefix_cache
+        self._prefixes: "OrderedDict[int, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._directed: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_parsed(cls, parsed: ParsedCSV) -> "YearLayers":
+        """Layers of a read_parts result read without a row cap (every chunk, nothing trimmed)."""
+        col = _Collector()
+        for p in parsed.parts: col.add(p)
+        return col.finish(parsed.authors.names, parsed.venues.names, parsed.year_counts)
+
+    _ARRAYS = ("years", "layer_rows", "pair_u", "pair_v", "edge_ptr", "edge_pair", "edge_w", "av_author", "av_venue", "venue_ptr", "venue_pair")
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """(arrays, meta) for GraphCache.save_arrays."""
+        arrs = {name: getattr(self, name) for name in self._ARRAYS}
+        arrs["author_blob"], arrs["author_off"] = encode_strings(self.authors)
+        arrs["venue_blob"], arrs["venue_off"] = encode_strings(self.venues)
+        return arrs, {"year_counts": {str(y): c for y, c in self.year_counts.items()}}
+
+    @classmethod
+    def from_arrays(cls, arrs: Dict[str, np.ndarray], meta: Dict) -> "YearLayers":
+        counts = Counter({int(y): c for y, c in meta["year_counts"].items()})
+        a = [arrs[name] for name in cls._ARRAYS]
+        return cls(decode_strings(arrs["author_blob"], arrs["author_off"]), decode_strings(arrs["venue_blob"], arrs["venue_off"]),
+                   a[0], a[1], counts, *a[2:])
+
+    @property
+    def num_pairs(self) -> int:
+        return len(self.pair_u)
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.pair_u, self.pair_v, self.edge_ptr, self.edge_pair, self.edge_w,
+                                      self.av_author, self.av_venue, self.venue_ptr, self.venue_pair))
+
+    def split_year(self, train_frac: float = 0.8) -> Optional[int]:
+        """The split year ingest_csv would pick from the same histogram."""
+        return split_year_from_counts(self.year_counts, train_frac)
+
+    def _layer_sums(self, lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Edge weights and venue counts summed over layers lo..hi-1."""
+        a, b = self.edge_ptr[lo], self.edge_ptr[hi]; c, d = self.venue_ptr[lo], self.venue_ptr[hi]
+        return (np.bincount(self.edge_pair[a:b], weights=self.edge_w[a:b], minlength=self.num_pairs).astype(np.int32),
+                np.bincount(self.venue_pair[c:d], minlength=len(self.av_author)).astype(np.int32))
+
+    def _prefix(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cumulative aggregates over years[0..k] (k = -1: empty), extended from the nearest cached prefix below k."""
+        if k in self._prefixes:
+            self._prefixes.move_to_end(k); return self._prefixes[k]
+        if k < 0: w, c = np.zeros(self.num_pairs, dtype=np.int32), np.zeros(len(self.av_author), dtype=np.int32)
+        else:
+            j = max((j for j in self._prefixes if j < k), default=-1)
+            dw, dc = self._layer_sums(FIRST_YEAR + j + 1, FIRST_YEAR + k + 1)
+            w, c = (dw, dc) if j < 0 else (self._prefixes[j][0] + dw, self._prefixes[j][1] + dc)
+        self._prefixes[k] = (w, c)
+        while len(self._prefixes) > self.prefix_cache: self._prefixes.popitem(last=False)
+        return w, c
+
+    def directed(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(target, pair) of both directions of every pair, sorted by (source, target). Filtering keeps this
+        order and ids are renumbered monotonically, so a selected graph needs no sort (built once, on first use)."""
+        if self._directed is None:
+            # pairs are sorted by (u, v) with u < v: row x lists its pairs (u, x) by u, then its pairs (x, v) by v
+            u, v, p = self.pair_u, self.pair_v, self.num_pairs; n = len(self.authors)
+            in_deg = np.bincount(v, minlength=n); out_deg = np.bincount(u, minlength=n)
+            start = np.zeros(n + 1, dtype=np.int64); np.cumsum(in_deg + out_deg, out=start[1:])
+            rank = np.arange(p, dtype=np.int64)
+            rev = np.argsort(v, kind="stable"); rv = v[rev]
+            pos_r = start[:-1][rv] + rank - (np.cumsum(in_deg) - in_deg)[rv]
+            pos_f = start[:-1][u] + in_deg[u] + rank - (np.cumsum(out_deg) - out_deg)[u]
+            dst = np.empty(2 * p, dtype=np.int32); pair = np.empty(2 * p, dtype=np.int32)
+            dst[pos_r] = u[rev]; pair[pos_r] = rev; dst[pos_f] = v; pair[pos_f] = rank
+            self._directed = dst, pair
+        return self._directed
+
+    def _select(self, lo: int, hi: int, undated: bool, split_year: Optional[int], half_life: Optional[float], min_weight: float) -> IngestResult:
+        """Graph of year indices lo..hi (plus the base layer, and undated rows when asked) as CSR."""
+        with stage("year_layers_select") as st:
+            checkpoint("year_layers_select")
+            extra = [(BASE, BASE + 1)] + ([(UNDATED_LAYER, UNDATED_LAYER + 1)] if undated else [])
+            if half_life is None:
+                w, c = self._prefix(hi if hi >= lo else -1)
+                if lo > 0 and hi >= lo: w, c = w - self._prefix(lo - 1)[0], c - self._prefix(lo - 1)[1]
+                for a, b in extra:
+                    dw, dc = self._layer_sums(a, b); w, c = w + dw, c + dc
+            else:
+                # a layer counts 0.5 ** (age / half_life), age relative to the split (or last) year
+                ref = split_year if split_year is not None else (self.years[hi] if hi >= 0 else 0)
+                factor = np.zeros(len(self.edge_ptr) - 1)
+                for a, b in extra: factor[a:b] = 1.0
+                if hi >= lo: factor[FIRST_YEAR + lo:FIRST_YEAR + hi + 1] = 0.5 ** ((ref - self.years[lo:hi + 1]) / half_life)
+                layer = np.repeat(np.arange(len(factor)), np.diff(self.edge_ptr))
+                w = np.bincount(self.edge_pair, weights=self.edge_w * factor[layer], minlength=self.num_pairs)
+                c = np.bincount(self.venue_pair, weights=(factor > 0)[np.repeat(np.arange(len(factor)), np.diff(self.venue_ptr))],
+                                minlength=len(self.av_author))
+            keep = (w > 0) & (w >= min_weight); vk = c > 0
+            u, v = self.pair_u[keep], self.pair_v[keep]
+            aa, jj = self.av_author[vk], self.av_venue[vk]
+            # same ids and layout as assemble_csr: authors / venues in use, kept in global (first-seen) order
+            mark = np.zeros(len(self.authors), dtype=bool); mark[u] = True; mark[v] = True; mark[aa] = True
+            jmark = np.zeros(len(self.venues), dtype=bool); jmark[jj] = True
+            remap = (np.cumsum(mark) - 1).astype(np.int32); jremap = (np.cumsum(jmark) - 1).astype(np.int32)
+            names = NameTable.from_list([self.authors[i] for i in np.flatnonzero(mark).tolist()])
+            journals = NameTable.from_list([self.venues[j] for j in np.flatnonzero(jmark).tolist()])
+            dst, pair = self.directed(); kd = keep[pair]; pair = pair[kd]; n = len(names)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(remap[u], minlength=n) + np.bincount(remap[v], minlength=n), out=indptr[1:])
+            graph = CSRGraph(names, indptr, remap[dst[kd]], w[pair].astype(np.int32 if half_life is None else np.float32, copy=False))
+            # venue pairs are distinct and sorted by (author, venue), so the renumbered ones are CSR order already
+            jptr = np.zeros(n + 1, dtype=np.int64); np.cumsum(np.bincount(remap[aa], minlength=n), out=jptr[1:])
+            author_journals = AuthorJournalsCSR(names, journals, jptr, jremap[jj])
+            rows = np.zeros(len(self.layer_rows), dtype=bool)
+            for a, b in extra: rows[a:b] = True
+            if hi >= lo: rows[FIRST_YEAR + lo:FIRST_YEAR + hi + 1] = True
+            used_rows = int(self.layer_rows[rows].sum()); st.add(rows=used_rows)
+        return IngestResult(split_year, self.year_counts, graph, graph.nodes(), author_journals, used_rows)
+
+    def as_of(self, year: Optional[int], half_life: Optional[float] = None, min_weight: float = 0) -> IngestResult:
+        """
+        The training graph for split year `year` (rows dated <= year; all rows when None). half_life (in years)
+        decays edge weights by age relative to `year`; min_weight drops edges whose (decayed) weight is below it.
+        """
+        if year is None: return self._select(0, len(self.years) - 1, True, None, half_life, min_weight)
+        return self._select(0, int(np.searchsorted(self.years, year, "right")) - 1, False, year, half_life, min_weight)
+
+    def window(self, first_year: int, last_year: int, half_life: Optional[float] = None, min_weight: float = 0) -> IngestResult:
+        """The graph of rows dated first_year..last_year (inclusive); see as_of for half_life and min_weight."""
+        lo = int(np.searchsorted(self.years, first_year, "left")); hi = int(np.searchsorted(self.years, last_year, "right")) - 1
+        return self._select(lo, hi, False, last_year, half_life, min_weight)
+
+def build_year_layers(csv_path, authors_col, year_col, venue_col, chunksize=20000, workers=1, state: Optional[ReadState] = None) -> YearLayers:
+    """
+    One full read of the CSV into year layers (workers > 1 parses chunks in a process pool). Each parsed chunk
+    is reduced to compact records right away, so peak memory stays near the size of the final tables.
+    With state (kind "layers"), a read cancelled earlier continues after its last chunk.
+    """
+    if state is None: state = ReadState("layers")
+    state.check("layers")
+    if state.collector is None: state.collector = (_Collector(), Counter())
+    col, counts = state.collector
+    with stage("year_layers") as st:
+        if not state.complete:
+            for chunk_counts, p, n in parsed_chunks(csv_path, authors_col, year_col, venue_col, state.authors, state.venues, chunksize, False,
+                                                    workers, state.rows):
+                counts.update(chunk_counts)
+                if p is not None: col.add(p); st.add(rows=n, chunks=1)
+                state.rows += n
+            state.complete = True
+        checkpoint("year_layers")
+        return col.finish(state.authors.names, state.venues.names, counts)
+
+def cached_year_layers(cache: Optional[GraphCache], csv_path, authors_col, year_col, venue_col, chunksize=20000, workers=1,
+                       state: Optional[ReadState] = None) -> Tuple[YearLayers, bool]:
+    """build_year_layers behind the snapshot cache (arrays memory-mapped on a hit); returns (layers, cache_hit)."""
+    build = lambda: build_year_layers(csv_path, authors_col, year_col, venue_col, chunksize, workers, state)
+    with stage("cached_year_layers") as st:
+        if cache is None: return build(), False
+        key = cache.key_for_layers(csv_path, authors_col, year_col, venue_col)
+        stored = cache.load_arrays(key)
+        st.add(hit=int(stored is not None))
+        if stored is not None: return YearLayers.from_arrays(*stored), True
+        layers = build()
+        try: cache.save_arrays(key, *layers.to_arrays())
+        except OSError: pass  # as in cached_ingest, a failed write does not fail the build
+        return layers, False
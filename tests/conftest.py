@@ -0,0 +1,38 @@
+# conftest.py
+import os, sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COLUMNS = ("authors", "mdate", "journal")
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """write_csv(rows, name=...) -> path of a CSV with title/authors/mdate/journal columns (rows as tuples or dicts)."""
+    def write(rows, name="papers.csv"):
+        if rows and not isinstance(rows[0], dict):
+            rows = [dict(zip(("title", "authors", "mdate", "journal"), r)) for r in rows]
+        path = str(tmp_path / name)
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return path
+    return write
+
+@pytest.fixture(scope="session")
+def synth_csv(tmp_path_factory):
+    """A small generated DBLP-like CSV (3,000 rows, mega papers and bad years included)."""
+    from synth_data import generate_csv
+    return generate_csv(str(tmp_path_factory.mktemp("synth") / "synth_3k.csv"), 3000, seed=7, max_team=120)
+
+@pytest.fixture(scope="session")
+def cancel_after():
+    """cancel_after(n) -> a ProgressReporter that cancels its run at the n-th checkpoint."""
+    from progress import ProgressReporter
+    class CancelAfter(ProgressReporter):
+        def __init__(self, n):
+            super().__init__(min_interval=0); self.n = n
+
+        def post(self, *args, **kwargs):
+            super().post(*args, **kwargs); self.n -= 1
+            if self.n <= 0: self.token.cancel()
+    return CancelAfter
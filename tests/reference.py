@@ -0,0 +1,112 @@
+# reference.py
+"""
+Frozen copy of the original pure-Python graph build and recommend(), before the vectorized and id-based paths.
+The equivalence tests compare the current code against it; keep it unchanged.
+"""
+import math, re
+import pandas as pd
+from collections import Counter, defaultdict
+from itertools import combinations
+
+BAD_VENUES = {"", "nan", "none", "null", "n/a", "na", "n.a."}
+
+def parse_year_like(x):
+    if pd.isna(x): return None
+    s = str(x)
+    m = re.search(r"(19|20)\d{2}", s)
+    if m:
+        try: return int(m.group(0))
+        except: return None
+    try: return int(float(s))
+    except: return None
+
+def split_authors(s):
+    if not isinstance(s, str): return []
+    parts = [p.strip() for p in s.split(";")]
+    return list({p for p in parts if p})
+
+def clean_venue(raw):
+    if raw is None: return ""
+    v = str(raw).strip()
+    return "" if v.lower() in BAD_VENUES else v
+
+def build_graph_and_journals(csv_path, authors_col, year_col, venue_col, split_year, max_rows=200000, chunksize=20000):
+    adj = defaultdict(Counter); author_journals = defaultdict(set); nodes_seen = set(); used_rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str):
+        df = chunk
+        if split_year is not None and year_col in df.columns:
+            yrs = df[year_col].map(parse_year_like)
+            mask = yrs.apply(lambda v: (v is not None and v <= split_year))
+            df = df[mask.fillna(False)].copy()
+        if authors_col not in df.columns: continue
+        for _, row in df.iterrows():
+            authors = split_authors(row.get(authors_col, ""))
+            venue_val = clean_venue(row.get(venue_col, "")) if venue_col in df.columns else ""
+            if len(authors) >= 2:
+                for u, v in combinations(authors, 2):
+                    adj[u][v] += 1; adj[v][u] += 1; nodes_seen.add(u); nodes_seen.add(v)
+            if venue_val:
+                for a in authors: author_journals[a].add(venue_val)
+        used_rows += len(df)
+        if used_rows >= max_rows: break
+    return adj, nodes_seen, author_journals, used_rows
+
+def candidate_set(adj, u, include_neighbors=False):
+    neighbors = set(adj[u].keys())
+    if include_neighbors: return set(adj.keys()) - {u}
+    two_hop = set()
+    for x in neighbors: two_hop.update(adj[x].keys())
+    two_hop.discard(u)
+    return two_hop - neighbors
+
+def common_neighbors_count(adj, u, v):
+    return len(set(adj[u].keys()) & set(adj[v].keys()))
+
+def adamic_adar(adj, u, v):
+    inter = set(adj[u].keys()) & set(adj[v].keys()); s = 0.0
+    for z in inter:
+        deg = len(adj[z])
+        if deg > 1: s += 1.0 / math.log(deg)
+    return s
+
+def journal_overlap(author_journals, u, v):
+    Ju = author_journals.get(u, set()); Jv = author_journals.get(v, set())
+    inter = Ju & Jv; union = Ju | Jv
+    jacc = (len(inter) / len(union)) if union else 0.0
+    return inter, union, jacc
+
+def normalize(values):
+    if not values: return []
+    m = min(values); M = max(values)
+    if M <= m: return [0.0 for _ in values]
+    return [(x - m) / (M - m) for x in values]
+
+def format_explanation(common_journals, jacc, common_neighbors):
+    cj = "; ".join(common_journals) if common_journals else "no common journal"
+    cn = "; ".join(common_neighbors) if common_neighbors else "no common neighbor"
+    return f"Common journals: {cj} (J={jacc:.2f}); Common neighbors: {cn}"
+
+def recommend(adj, author_journals, target, topk, include_neighbors, w_aa, w_cn, w_jj, filter_journals=None):
+    C = candidate_set(adj, target, include_neighbors=include_neighbors); recs = []; neighbors_target = set(adj[target].keys())
+    filter_set = None
+    if filter_journals is not None: filter_set = {j.strip().lower() for j in filter_journals if j.strip()}
+    for v in C:
+        cn = common_neighbors_count(adj, target, v); aa = adamic_adar(adj, target, v)
+        inter_j, union_j, jj = journal_overlap(author_journals, target, v)
+        clean_journals = [j for j in sorted(list(inter_j)) if j and j.strip().lower() not in BAD_VENUES]
+        if not clean_journals: continue
+        if filter_set is not None:
+            lower_j = {j.strip().lower() for j in clean_journals}
+            if not (lower_j & filter_set): continue
+        inter_neighbors = list(neighbors_target & set(adj[v].keys()))
+        inter_neighbors.sort(key=lambda z: len(adj[z]), reverse=True)
+        recs.append((v, cn, aa, jj, clean_journals[:5], inter_neighbors[:5]))
+    if not recs: return []
+    CNn = normalize([r[1] for r in recs]); AAn = normalize([r[2] for r in recs]); JJn = normalize([r[3] for r in recs])
+    scored = []
+    for (v, cn, aa, jj, common_journals, common_neighbors), cnv, aav, jjv in zip(recs, CNn, AAn, JJn):
+        score = w_aa * aav + w_cn * cnv + w_jj * jjv
+        explanation = format_explanation(common_journals, jj, common_neighbors)
+        scored.append((v, score, aa, cn, jj, common_journals, common_neighbors, explanation))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:topk]
@@ -0,0 +1,16 @@
+# test_batch_recommend.py
+import json
+import pytest
+import batch_recommend
+
+def test_batch_writes_every_connected_author(synth_csv, tmp_path):
+    out = str(tmp_path / "recs.jsonl")
+    batch_recommend.main(["--csv", synth_csv, "--out", out, "--workers", "1", "--topk", "3", "--cache-dir", str(tmp_path / "cache")])
+    with open(out, encoding="utf-8") as f: lines = [json.loads(l) for l in f]
+    assert lines and all(len(l["recommendations"]) <= 3 for l in lines)
+    assert len({l["target"] for l in lines}) == len(lines)
+
+def test_unwritable_cache_is_reported(synth_csv, tmp_path):
+    blocker = tmp_path / "cache"; blocker.write_text("not a directory")
+    with pytest.raises(SystemExit, match="Cannot write the graph snapshot"):
+        batch_recommend.main(["--csv", synth_csv, "--out", str(tmp_path / "recs.csv"), "--workers", "1", "--cache-dir", str(blocker)])
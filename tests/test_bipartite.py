@@ -0,0 +1,26 @@
+# test_bipartite.py
+import pytest
+from conftest import COLUMNS
+from graph_builder import ingest_csv
+from recommender import recommend_for_id
+
+PAPERS = [("mega", "U;M1;M2;M3;M4", "2000", "J"), ("r", "U;R", "2000", "J"), ("rw", "R;W", "2000", "J"),
+          ("v1", "M1;V", "2000", "J"), ("v2", "M2;V", "2000", "J"), ("v3", "M3;V", "2000", "J")]
+
+def ranking(path, policy, include_neighbors=False):
+    g = ingest_csv(path, *COLUMNS, 2000, max_rows=None, incidence=True, max_team=3, mega_policy=policy)
+    return [(v, cn) for v, _, _, cn, *_ in recommend_for_id(g.adj, g.author_journals, g.adj.id_of("U"), 10, include_neighbors, 0.0, 1.0, 0.0)]
+
+def test_downweight_changes_the_ranking(write_csv):
+    path = write_csv(PAPERS)
+    assert ranking(path, "keep") == [("V", 3), ("W", 1)]
+    # V is only reached through co-authors of the 5-author paper: 3 links of strength 1/4
+    assert ranking(path, "downweight") == [("W", 1.0), ("V", 0.75)]
+
+def test_keep_matches_pair_storage(write_csv):
+    path = write_csv(PAPERS)
+    csr = ingest_csv(path, *COLUMNS, 2000, max_rows=None, as_csr=True)
+    for include_neighbors in (False, True):
+        expected = recommend_for_id(csr.adj, csr.author_journals, csr.adj.id_of("U"), 10, include_neighbors, 0.5, 0.3, 0.2)
+        got = ranking(path, "keep", include_neighbors)
+        assert sorted(got) == sorted((v, cn) for v, _, _, cn, *_ in expected)
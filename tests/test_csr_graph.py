@@ -0,0 +1,25 @@
+# test_csr_graph.py
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from csr_graph import AuthorJournalsCSR, CSRGraph, IdGraph, NameTable
+
+def test_from_edges_is_symmetric_and_sorted():
+    g = CSRGraph.from_edges(NameTable.from_list(["a", "b", "c", "d"]), np.array([0, 0, 1]), np.array([2, 1, 2]), np.array([1, 3, 2]))
+    assert g.neighbors(0).tolist() == [1, 2] and g.neighbor_weights(0).tolist() == [3, 1]
+    assert g.num_edges == 3 and sorted(g) == ["a", "b", "c"] and dict(g["c"]) == {"a": 1, "b": 2}
+
+def test_storages_must_implement_the_scoring_primitives():
+    class Partial(IdGraph):
+        def expand(self, ids, with_weights=False): return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    with pytest.raises(TypeError, match="connected_ids"): Partial()
+
+def test_lazy_lookups_are_safe_across_threads():
+    authors = NameTable.from_list(["a", "b"]); journals = NameTable.from_list([f"Journal {i}" for i in range(50_000)])
+    for _ in range(3):
+        journals._ids = None; aj = AuthorJournalsCSR(authors, journals, np.array([0, 1, 2]), np.array([3, 49_999], dtype=np.int32))
+        with ThreadPoolExecutor(8) as ex:
+            named = list(ex.map(lambda _: aj.journal_ids_named([" journal 49999 "]).tolist(), range(8)))
+            posted = list(ex.map(lambda _: aj.authors_of(np.array([49_999])).tolist(), range(8)))
+            ids = list(ex.map(lambda _: aj.journals.id_of("Journal 40000"), range(8)))
+        assert named == [[49_999]] * 8 and posted == [[1]] * 8 and ids == [40_000] * 8
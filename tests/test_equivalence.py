@@ -0,0 +1,55 @@
+# test_equivalence.py
+"""The vectorized builds and id-based ranking against the original pure-Python code (reference.py)."""
+import random
+import pytest
+import reference
+from conftest import COLUMNS
+from graph_builder import build_graph_and_journals, ingest_csv
+from recommender import FeatureCache, recommend
+
+SPLIT = 2015
+
+def as_dicts(adj, journals, names):
+    return {a: dict(adj[a]) for a in names}, {a: set(journals[a]) for a in names if a in journals and journals[a]}
+
+@pytest.fixture(scope="module")
+def ref(synth_csv):
+    return reference.build_graph_and_journals(synth_csv, *COLUMNS, SPLIT, 10 ** 9)
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("split_year, max_rows, chunksize", [(SPLIT, 10 ** 9, 20000), (None, 10 ** 9, 20000), (SPLIT, 700, 250)])
+def test_builds_match_the_reference(synth_csv, split_year, max_rows, chunksize, workers):
+    adj, nodes, journals, used = reference.build_graph_and_journals(synth_csv, *COLUMNS, split_year, max_rows, chunksize)
+    expected = as_dicts(adj, journals, nodes) + (nodes, used)
+    got = build_graph_and_journals(synth_csv, *COLUMNS, split_year, max_rows, chunksize, workers)
+    assert as_dicts(got[0], got[2], got[1]) + got[1:2] + got[3:] == expected
+    if split_year is None: return  # ingest_csv then derives a split year from the histogram
+    for kw in ({"as_csr": True}, {"incidence": True, "max_team": None}):
+        res = ingest_csv(synth_csv, *COLUMNS, split_year, max_rows=max_rows, chunksize=chunksize, workers=workers, **kw)
+        assert as_dicts(res.adj, res.author_journals, res.nodes) + (set(res.nodes), res.used_rows) == expected
+
+def rows_by_candidate(recs, adj):
+    """Per candidate: score, AA, CN, JJ, common journals and the degrees of the listed common neighbors (their
+    order among equal degrees, and so the explanation, depends on set iteration in the reference)."""
+    return {v: (pytest.approx(s), pytest.approx(aa), cn, pytest.approx(jj), cj, sorted(len(adj[z]) for z in cnb))
+            for v, s, aa, cn, jj, cj, cnb, _ in recs}
+
+@pytest.mark.parametrize("include_neighbors, filter_journals", [(False, None), (True, None), (False, "first")])
+def test_recommend_matches_the_reference(synth_csv, ref, include_neighbors, filter_journals):
+    adj, nodes, journals, _ = ref; weights = (0.5, 0.3, 0.2)
+    csr = ingest_csv(synth_csv, *COLUMNS, SPLIT, max_rows=None, as_csr=True)
+    dict_adj, _, dict_journals, _ = build_graph_and_journals(synth_csv, *COLUMNS, SPLIT, None)
+    cache = FeatureCache(csr.adj, csr.author_journals)
+    targets = random.Random(3).sample(sorted(nodes), 15)
+    for t in targets:
+        fj = {sorted(journals[t])[0].upper()} if filter_journals and journals.get(t) else None
+        expected = reference.recommend(adj, journals, t, 10 ** 6, include_neighbors, *weights, fj)
+        want = rows_by_candidate(expected, adj)
+        for recs in (recommend(csr.adj, csr.author_journals, t, 10 ** 6, include_neighbors, *weights, fj),
+                     recommend(dict_adj, dict_journals, t, 10 ** 6, include_neighbors, *weights, fj),
+                     cache.recommend(t, 10 ** 6, include_neighbors, *weights, fj)):
+            assert rows_by_candidate(recs, adj) == want
+            scores = [r[1] for r in recs]
+            assert scores == sorted(scores, reverse=True)
+        top = recommend(csr.adj, csr.author_journals, t, 5, include_neighbors, *weights, fj)
+        assert [r[1] for r in top] == pytest.approx(sorted((r[1] for r in expected), reverse=True)[:5])
@@ -0,0 +1,19 @@
+# test_evaluate.py
+from conftest import COLUMNS
+from evaluate import holdout_pairs
+from graph_builder import ingest_csv
+
+def truth(h, names):
+    return {(names[int(u)], names[int(v)]) for k, u in enumerate(h.targets) for v in h.truth_of(k) if names[int(u)] < names[int(v)]}
+
+def test_pairs_before_the_split_are_never_new(write_csv):
+    path = write_csv([("p1", "A;B;C", "2000", "J"), ("p2", "B;D", "2000", "J"), ("p3", "A;D", "2000", "J"),
+                      ("p4", "A;D", "2001", "J"), ("p5", "C;D", "2001", "J")])
+    full = ingest_csv(path, *COLUMNS, 2000, max_rows=None, as_csr=True)
+    h = holdout_pairs(path, COLUMNS[0], COLUMNS[1], full.adj, 2000, used_rows=full.used_rows)
+    assert truth(h, full.adj.names) == {("C", "D")} and h.stats["repeat_pairs_beyond_max_rows"] == 0
+    # p3 is beyond the row cap, so A-D is not in the graph, but it is still not a new collaboration in 2001
+    capped = ingest_csv(path, *COLUMNS, 2000, max_rows=2, chunksize=2, as_csr=True)
+    assert capped.used_rows == 2 and "D" not in capped.adj["A"]
+    h = holdout_pairs(path, COLUMNS[0], COLUMNS[1], capped.adj, 2000, chunksize=2, used_rows=capped.used_rows)
+    assert truth(h, capped.adj.names) == {("C", "D")} and h.stats["repeat_pairs_beyond_max_rows"] == 1
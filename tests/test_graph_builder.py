@@ -0,0 +1,35 @@
+# test_graph_builder.py
+import pytest
+from collections import Counter
+from conftest import COLUMNS
+from graph_builder import ReadState, build_graph_and_journals, ingest_csv, read_parts
+
+def edges(adj):
+    return {(a, b): c for a, nb in adj.items() for b, c in nb.items() if a < b}
+
+def test_negative_and_undated_years(write_csv):
+    path = write_csv([("p1", "A;B", "-5", "J1"), ("p2", "B;C", "2020", "J2"), ("p3", "C;D", "", "J3"),
+                      ("p4", "D;E", "n/a", "J4"), ("p5", "E;F", "2021", "J5")])
+    adj, nodes, journals, used = build_graph_and_journals(path, *COLUMNS, 2020)
+    assert edges(adj) == {("A", "B"): 1, ("B", "C"): 1}
+    assert nodes == {"A", "B", "C"} and journals["B"] == {"J1", "J2"} and used == 2
+    res = ingest_csv(path, *COLUMNS, None, train_frac=0.3, max_rows=None)
+    assert res.split_year == -5 and res.year_counts == {-5: 1, 2020: 1, 2021: 1}
+    assert edges(res.adj) == {("A", "B"): 1}
+    assert edges(ingest_csv(path, *COLUMNS, 2020, max_rows=None, incidence=True).adj.to_adjacency()) == {("A", "B"): 1, ("B", "C"): 1}
+
+def test_read_state_keeps_only_the_row_budget(synth_csv):
+    state = ReadState(); max_rows, chunksize = 20, 100
+    parsed = read_parts(synth_csv, *COLUMNS, None, max_rows, chunksize, stop_early=False, state=state)
+    stored = [p for _, p in state.chunks if p is not None]
+    assert state.complete and len(stored) == len(parsed.parts) and all(a is b for a, b in zip(stored, parsed.parts))
+    kept = Counter()
+    for p in parsed.parts:
+        for y, c in p.row_years.items():
+            if (p.pairs["year"].isna() if y is None else p.pairs["year"] == y).any(): kept[y] += c
+    # a year is dropped from the chunks after the one in which max_rows of its rows were reached
+    assert kept and max(kept.values()) < max_rows + chunksize and sum(parsed.year_counts.values()) > 2 * sum(kept.values())
+    with pytest.raises(ValueError, match="max_rows"): read_parts(synth_csv, *COLUMNS, None, None, chunksize, state=state)
+    with pytest.raises(ValueError, match="max_rows"): ingest_csv(synth_csv, *COLUMNS, None, max_rows=2 * max_rows, chunksize=chunksize, state=state)
+    again = read_parts(synth_csv, *COLUMNS, None, max_rows, chunksize, stop_early=False, state=state)  # the same cap reuses the state
+    assert again.year_counts == parsed.year_counts and all(a is b for a, b in zip(again.parts, parsed.parts))
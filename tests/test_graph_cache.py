@@ -0,0 +1,48 @@
+# test_graph_cache.py
+import os
+import numpy as np
+import pytest
+from conftest import COLUMNS
+from graph_cache import GraphCache, cached_ingest
+
+PAPERS = [("p1", "A;B", "2020", "J1"), ("p2", "B;C", "2020", "J2"), ("p3", "C;D;A", "2021", "J1")]
+
+def test_snapshot_round_trip(write_csv, tmp_path):
+    path = write_csv(PAPERS); cache = GraphCache(str(tmp_path / "cache"))
+    for incidence in (False, True):
+        built, hit = cached_ingest(cache, path, *COLUMNS, 2021, max_rows=None, incidence=incidence)
+        loaded, hit_again = cached_ingest(cache, path, *COLUMNS, 2021, max_rows=None, incidence=incidence)
+        assert (hit, hit_again) == (False, True) and type(loaded.adj) is type(built.adj)
+        assert isinstance(loaded.adj.names.blob, np.memmap)
+        assert {a: dict(loaded.adj[a]) for a in loaded.adj} == {a: dict(built.adj[a]) for a in built.adj}
+        assert loaded.author_journals["A"] == {"J1"} and loaded.year_counts == built.year_counts and loaded.used_rows == 3
+        key = cache.key_for(path, *COLUMNS, 2021, 0.8, None, 20000, incidence)
+        as_dicts = cache.load(key, as_csr=False, mmap=False)
+        assert as_dicts.adj["A"] == {"B": 1, "C": 1, "D": 1} and as_dicts.author_journals["C"] == {"J1", "J2"}
+    assert len(cache.entries()) == 2
+
+def test_keys_cover_the_file_and_build_parameters(write_csv, tmp_path):
+    path = write_csv(PAPERS); cache = GraphCache(str(tmp_path / "cache"))
+    cached_ingest(cache, path, *COLUMNS, 2021, max_rows=None)
+    assert cache.load(cache.key_for(path, *COLUMNS, 2020, 0.8, None, 20000)) is None
+    # train_frac only matters without a split year
+    assert cache.load(cache.key_for(path, *COLUMNS, 2021, 0.5, None, 20000)) is not None
+    write_csv(PAPERS + [("p4", "D;E", "2021", "J3")])  # same path, new content
+    assert cache.load(cache.key_for(path, *COLUMNS, 2021, 0.8, None, 20000)) is None
+    assert cache.invalidate(path, stale_only=True) == 1 and cache.entries() == []
+
+def test_least_recently_used_snapshots_are_evicted(write_csv, tmp_path):
+    path = write_csv(PAPERS); cache = GraphCache(str(tmp_path / "cache"), max_entries=2)
+    keys = []
+    for split in (2019, 2020, 2021):
+        cached_ingest(cache, path, *COLUMNS, split, max_rows=None); keys.append(cache.key_for(path, *COLUMNS, split, 0.8, None, 20000))
+        os.utime(os.path.join(cache.snapshot_dir(keys[-1]), "meta.json"), (split, split))  # deterministic LRU order
+    assert [e[3] for e in cache.entries()] == [keys[2], keys[1]]
+    cache.load(keys[1]); cache.max_entries = 1
+    assert cache.enforce_limits() == 1 and [e[3] for e in cache.entries()] == [keys[1]]
+
+def test_unwritable_cache_does_not_fail_the_build(write_csv, tmp_path):
+    blocker = tmp_path / "file"; blocker.write_text("")
+    result, hit = cached_ingest(GraphCache(str(blocker / "cache")), write_csv(PAPERS), *COLUMNS, 2021, max_rows=None)
+    assert not hit and result.used_rows == 3
+    with pytest.raises(OSError): GraphCache(str(blocker / "cache")).save({"k": 1}, result)
@@ -0,0 +1,67 @@
+# test_graph_update.py
+import numpy as np
+from conftest import COLUMNS
+from graph_builder import ingest_csv
+from graph_cache import GraphCache, cached_ingest
+from graph_update import DeltaLedger, apply_delta, apply_delta_to_snapshot
+
+def apply(base, delta, key_cols=None):
+    result = ingest_csv(base, *COLUMNS, None, train_frac=1.0, max_rows=None, as_csr=True)
+    ledger = DeltaLedger(); ledger.seed_base(base, *COLUMNS, result.split_year, None, key_cols=key_cols)
+    return apply_delta(result, delta, *COLUMNS, ledger, key_cols=key_cols)
+
+def test_same_title_different_authors_is_a_new_paper(write_csv):
+    base = write_csv([("Editorial", "A;B", "2020", "J"), ("Graphs", "B;C", "2020", "J")], "base.csv")
+    delta = write_csv([("Editorial", "C;D", "2021", "J"), ("Graphs", "B;C", "2020", "J")], "delta.csv")
+    result, stats = apply(base, delta)
+    assert (stats.papers_applied, stats.duplicates_skipped, stats.new_authors) == (1, 1, 1)
+    assert dict(result.adj["C"]) == {"B": 1, "D": 1}
+    # keyed on the title alone, the delta's "Editorial" would be taken for the base one
+    assert apply(base, delta, ["title"])[1].duplicates_skipped == 2
+
+def test_snapshot_update_does_not_map_the_directory_it_replaces(write_csv, tmp_path, monkeypatch):
+    base = write_csv([("p1", "A;B", "2020", "J")], "base.csv"); delta = write_csv([("p2", "B;C", "2020", "K")], "delta.csv")
+    cache = GraphCache(str(tmp_path / "cache"))
+    cached_ingest(cache, base, *COLUMNS, 2020, max_rows=None)
+    key = cache.key_for(base, *COLUMNS, 2020, 0.8, None, 20000)
+    modes = []; load = np.load
+    monkeypatch.setattr(np, "load", lambda *a, **kw: modes.append(kw.get("mmap_mode")) or load(*a, **kw))
+    stats = apply_delta_to_snapshot(cache, key, delta, *COLUMNS)
+    assert stats.papers_applied == 1 and modes and set(modes) == {None}
+    monkeypatch.undo()
+    result = cache.load(key)
+    assert dict(result.adj["B"]) == {"A": 1, "C": 1} and result.author_journals["C"] == {"K"}
+    assert len(DeltaLedger.load(cache.snapshot_dir(key)).sources) == 2
+
+def test_ledger_ranges_keys_and_round_trip(tmp_path):
+    ledger = DeltaLedger()
+    assert ledger.pending_ranges("h") == [(0, None)] and not ledger.seen(np.array([1])).any()
+    ledger.record({"path": "d.csv", "sha256": "h"}, [(10, 20), (30, 40)], np.array([5, 3, 9]), {"papers": 3})
+    assert ledger.pending_ranges("h") == [(0, 10), (20, 30), (40, None)]
+    assert ledger.pending_ranges("h", 15, 35) == [(20, 30)] and ledger.pending_ranges("other", 15, 35) == [(15, 35)]
+    assert ledger.seen(np.array([3, 4, 9, 10])).tolist() == [True, False, True, False]
+    ledger.save(str(tmp_path)); loaded = DeltaLedger.load(str(tmp_path))
+    assert loaded.sources == ledger.sources and loaded.keys.tolist() == [3, 5, 9]
+    assert DeltaLedger.load(str(tmp_path / "missing")).sources == []
+
+def test_reapplying_a_delta_is_a_no_op(write_csv):
+    base = write_csv([("p1", "A;B", "2020", "J")], "base.csv"); delta = write_csv([("p2", "B;C", "2020", "J"), ("p3", "C;D", "2020", "J")], "delta.csv")
+    result = ingest_csv(base, *COLUMNS, None, train_frac=1.0, max_rows=None, as_csr=True); ledger = DeltaLedger()
+    result, first = apply_delta(result, delta, *COLUMNS, ledger, end_row=1)
+    result, rest = apply_delta(result, delta, *COLUMNS, ledger)
+    result, again = apply_delta(result, delta, *COLUMNS, ledger)
+    assert (first.papers_applied, rest.papers_applied, again.rows_read) == (1, 1, 0)
+    assert result.adj.num_edges == 3 and dict(result.adj["C"]) == {"B": 1, "D": 1}
+
+def test_paper_repeated_across_chunks_is_applied_once(write_csv):
+    base = write_csv([("p1", "A;B", "2020", "J")], "base.csv")
+    delta = write_csv([("p2", "B;C", "2020", "J"), ("p3", "C;D", "2020", "J"), ("p2", "B;C", "2020", "J")], "delta.csv")
+    result = ingest_csv(base, *COLUMNS, None, train_frac=1.0, max_rows=None, as_csr=True)
+    result, stats = apply_delta(result, delta, *COLUMNS, DeltaLedger(), chunksize=1)
+    assert (stats.papers_applied, stats.duplicates_skipped) == (2, 1) and dict(result.adj["C"]) == {"B": 1, "D": 1}
+
+def test_remodified_record_keeps_its_key(write_csv):
+    base = write_csv([("Graphs", "A;B", "2020-03-01", "J")], "base.csv")
+    delta = write_csv([("Graphs", "A;B", "2021-07-15", "J"), ("Graphs", "A;B", "2021-07-15", "K")], "delta.csv")
+    result, stats = apply(base, delta)
+    assert (stats.papers_applied, stats.duplicates_skipped) == (1, 1) and dict(result.adj["A"]) == {"B": 2}
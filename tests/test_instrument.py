@@ -0,0 +1,45 @@
+# test_instrument.py
+import json, time
+import pytest
+import instrument
+from instrument import RunRecorder, count, format_record, stage
+
+def test_nested_stages_and_counters(tmp_path):
+    log = tmp_path / "runs.jsonl"
+    rec = RunRecorder("query", log_path=str(log), target="A")
+    with rec.active():
+        with stage("outer") as outer:
+            outer.add(rows=10)
+            with stage("inner") as inner:
+                time.sleep(0.01); inner.add(rows=500); count(candidates=3); count(candidates=4)
+            count(kept=2)  # back on the outer stage once inner is closed
+        count(ignored=1)  # no open stage
+    out = rec.finish()
+    assert out["run"] == "query" and out["target"] == "A"
+    first, second = out["stages"]  # listed in start order
+    assert (first["stage"], first["depth"], first["rows"], first["kept"]) == ("outer", 0, 10, 2) and "candidates" not in first
+    assert (second["stage"], second["depth"], second["rows"], second["candidates"]) == ("inner", 1, 500, 7)
+    assert second["rows_per_sec"] == pytest.approx(500 / second["seconds"], rel=1e-3) and first["seconds"] >= second["seconds"] >= 0.01
+    assert "ignored" not in json.dumps(out)
+    rec2 = RunRecorder("second", log_path=str(log))
+    with rec2.active(), stage("only"): pass
+    rec2.finish()
+    lines = [json.loads(l) for l in log.read_text(encoding="utf-8").splitlines()]
+    assert [l["run"] for l in lines] == ["query", "second"] and lines[0] == out  # appended, one record per line
+    assert format_record(out, max_depth=0).startswith("outer ") and "inner" in format_record(out)
+
+def test_stage_is_a_no_op_without_a_recorder():
+    assert stage("x") is stage("y") is instrument._NULL
+    with stage("x") as st: st.add(rows=1); count(rows=1)
+    rec = RunRecorder("later")
+    with rec.active(): pass
+    assert rec.finish()["stages"] == []
+
+def test_memory_tracing_reports_allocation_peaks():
+    rec = RunRecorder("mem", memory=True)
+    with rec.active():
+        with stage("outer"):
+            with stage("alloc"): block = bytearray(8 * 1024 ** 2); del block
+    outer, alloc = rec.finish()["stages"]
+    assert alloc["tracemalloc_peak_mb"] >= 7.9 and outer["tracemalloc_peak_mb"] >= alloc["tracemalloc_peak_mb"]
+    assert not instrument.tracemalloc.is_tracing()
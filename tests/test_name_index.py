@@ -0,0 +1,52 @@
+# test_name_index.py
+import numpy as np
+import pytest
+from conftest import COLUMNS
+from graph_builder import ingest_csv
+from graph_cache import GraphCache, cached_ingest
+from name_index import NameIndex, name_index_for
+
+ROWS = [("p1", "Anna Li;Bob Smith;Li Wei", "2010", "J"), ("p2", "Li Wei;Carl Lindqvist", "2011", "J"), ("p3", "Li Wei;Dora Lima", "2011", "J"),
+        ("p4", "Carl Lindqvist;Dora Lima;Eve Li", "2012", "J"), ("p5", "Bob Smith;Lina Ng", "2012", "J"), ("p6", "Solo Author", "2012", "J")]
+
+@pytest.fixture(params=["csr", "bipartite"])
+def graph(request, write_csv):
+    kw = {"as_csr": True} if request.param == "csr" else {"incidence": True, "max_team": None}
+    return ingest_csv(write_csv(ROWS), *COLUMNS, 2020, max_rows=None, **kw).adj
+
+def names(graph, ids):
+    return [graph.names[i] for i in ids]
+
+def test_search_ranks_by_degree(graph):
+    index = NameIndex(graph)
+    # degrees: Li Wei 4, Carl / Dora / Bob 3, Anna / Eve 2, Lina 1; ties by id (first seen)
+    assert names(graph, index.search("li", None)) == ["Li Wei", "Carl Lindqvist", "Dora Lima", "Anna Li", "Eve Li", "Lina Ng"]
+    assert names(graph, index.search("LI", 2)) == ["Li Wei", "Carl Lindqvist"]
+    assert names(graph, index.search("li", None, prefix=True)) == ["Li Wei", "Lina Ng"]
+    assert names(graph, index.search("lindq", prefix=True)) == [] and names(graph, index.search("lindq")) == ["Carl Lindqvist"]
+    assert index.search("solo") == [] and index.search("") == []  # authors without co-authors are not indexed
+
+def test_exact_and_resolve(graph):
+    index = NameIndex(graph)
+    assert graph.names[index.exact("li WEI")] == "Li Wei" and index.exact("li") is None
+    assert index.resolve("Li Wei") == "Li Wei"
+    assert index.resolve("eve li") == "Eve Li"
+    assert index.resolve("LINDQ") == "Carl Lindqvist"
+    assert index.resolve("nobody") == "Li Wei"  # falls back to the highest-degree author
+
+def test_suggest_puts_prefix_matches_first(graph):
+    index = name_index_for(graph)
+    assert index.suggest("Lin") == ["Lina Ng", "Carl Lindqvist"]
+    assert index.suggest("Lin", 1) == ["Lina Ng"]
+    assert index.suggest("li") == [] and index.suggest("  ") == []  # too short to use the trigram index
+
+def test_snapshot_keeps_the_index(write_csv, tmp_path):
+    cache = GraphCache(str(tmp_path / "cache")); path = write_csv(ROWS)
+    built, _ = cached_ingest(cache, path, *COLUMNS, 2020, max_rows=None)
+    loaded, hit = cached_ingest(cache, path, *COLUMNS, 2020, max_rows=None)
+    assert hit and "_name_index" in loaded.adj.__dict__
+    index, fresh = loaded.adj._name_index, NameIndex(built.adj)
+    assert isinstance(index.tri_rows, np.memmap)
+    for name in ("ids", "blob", "offsets", "degree", "tri_codes", "tri_indptr", "tri_rows"):
+        assert np.array_equal(getattr(index, name), getattr(fresh, name))
+    assert index.folded == fresh.folded and index.suggest("Lin") == ["Lina Ng", "Carl Lindqvist"]
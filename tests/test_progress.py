@@ -0,0 +1,51 @@
+# test_progress.py
+"""Cancelling builds at a checkpoint and resuming them from their ReadState, against straight builds."""
+import numpy as np
+import pytest
+from conftest import COLUMNS
+from graph_builder import ReadState, ingest_csv
+from progress import Cancelled, Progress, ProgressReporter, format_progress
+from temporal import build_year_layers
+
+CHUNK = 200
+
+def assert_same_result(a, b):
+    assert a.adj.names.to_list() == b.adj.names.to_list() and a.author_journals.journals.to_list() == b.author_journals.journals.to_list()
+    for x, y in ((a.adj.indptr, b.adj.indptr), (a.adj.indices, b.adj.indices), (a.adj.weights, b.adj.weights),
+                 (a.author_journals.indptr, b.author_journals.indptr), (a.author_journals.indices, b.author_journals.indices)):
+        assert np.array_equal(x, y)
+    assert (a.split_year, a.year_counts, a.used_rows) == (b.split_year, b.year_counts, b.used_rows)
+
+def cancelled_twice(cancel_after, build, state, workers):
+    """Run build(state) cancelled twice a few chunks in; the state must have moved on each time.
+    A process pool passes a checkpoint per chunk sent, up to 2 * workers chunks ahead of the ones merged."""
+    rows = []
+    for n in (3 + 2 * workers, 4):
+        with pytest.raises(Cancelled), cancel_after(n).active(): build(state)
+        rows.append(state.rows)
+    assert 0 < rows[0] < rows[1] < 3000 and not state.complete
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("split_year, max_rows", [(2015, None), (None, None), (2015, 1500), (None, 1500)])
+def test_ingest_resumes_after_cancel(synth_csv, cancel_after, workers, split_year, max_rows):
+    build = lambda state=None: ingest_csv(synth_csv, *COLUMNS, split_year, max_rows=max_rows, chunksize=CHUNK, as_csr=True,
+                                          workers=workers, state=state)
+    state = ReadState(); cancelled_twice(cancel_after, build, state, workers)
+    assert_same_result(build(state), ingest_csv(synth_csv, *COLUMNS, split_year, max_rows=max_rows, chunksize=CHUNK, as_csr=True))
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_year_layers_resume_after_cancel(synth_csv, cancel_after, workers):
+    build = lambda state=None: build_year_layers(synth_csv, *COLUMNS, chunksize=CHUNK, workers=workers, state=state)
+    state = ReadState("layers"); cancelled_twice(cancel_after, build, state, workers)
+    got, want = build(state), build_year_layers(synth_csv, *COLUMNS, chunksize=CHUNK)
+    assert got.years.tolist() == want.years.tolist() and got.year_counts == want.year_counts
+    for year in (1995, 2015, None): assert_same_result(got.as_of(year), want.as_of(year))
+    with pytest.raises(ValueError): ingest_csv(synth_csv, *COLUMNS, 2015, state=state)  # a layers state is not a parts state
+
+def test_progress_reports_bytes_until_done(synth_csv):
+    rep = ProgressReporter(min_interval=0)
+    with rep.active(): ingest_csv(synth_csv, *COLUMNS, 2015, max_rows=None, chunksize=CHUNK)
+    reads = [m for m in rep.drain() if isinstance(m, Progress) and m.stage == "read_csv"]
+    assert len(reads) == 15 and [m.rows for m in reads] == list(range(0, 3000, CHUNK))
+    assert all(a.bytes_read <= b.bytes_read for a, b in zip(reads, reads[1:])) and 0 < reads[-1].fraction <= 1
+    assert format_progress(reads[1]).startswith("read_csv: 200 rows")
@@ -0,0 +1,78 @@
+# test_propagation.py
+"""Sparse propagation scores against dense NumPy on a small graph, through both the push and the pull / dense paths."""
+import random
+import numpy as np
+import pytest
+import propagation
+import reference
+from conftest import COLUMNS
+from graph_builder import ingest_csv
+from propagation import katz_from, personalized_pagerank, resource_allocation_from
+from recommender import recommend, rank_features, target_features
+
+ROWS = [("p0", "W", "2009", "J1"), ("p1", "A;B;C", "2010", "J1"), ("p2", "A;B", "2011", "J1"), ("p3", "C;D", "2012", "J2"), ("p4", "D;E;F;G", "2013", "J2"),
+        ("p5", "E;H", "2014", "J3"), ("p6", "X;Y", "2014", "J4"), ("p7", "Z", "2014", "J4")]
+
+@pytest.fixture(params=["csr", "bipartite"])
+def graph(request, write_csv):
+    kw = {"as_csr": True} if request.param == "csr" else {"incidence": True, "max_team": None}
+    return ingest_csv(write_csv(ROWS), *COLUMNS, 2020, max_rows=None, **kw).adj
+
+@pytest.fixture(params=["push", "pull"])
+def path(request, monkeypatch):
+    """push: expand the support and sort-combine; pull: pull every CSR row and sum in dense arrays."""
+    calls = []; pull = propagation._pull
+    monkeypatch.setattr(propagation, "_pull", lambda g, x: calls.append(1) or pull(g, x))
+    big = request.param == "pull"
+    monkeypatch.setattr(propagation, "PULL_RATIO", 10 ** 9 if big else 0)
+    monkeypatch.setattr(propagation, "DENSE_RATIO", 10 ** 9 if big else 0)
+    return request.param, calls
+
+def dense_adjacency(graph):
+    A = np.zeros((graph.num_nodes, graph.num_nodes))
+    for i in range(graph.num_nodes): A[i, graph.neighbors(i)] = 1.0
+    return A
+
+def to_dense(x, n):
+    out = np.zeros(n); out[x[0]] = x[1]
+    assert np.all(np.diff(x[0]) > 0)
+    return out
+
+def check_path(graph, path):
+    name, calls = path
+    assert bool(calls) == (name == "pull" and not hasattr(graph, "paper_indptr"))
+
+def test_katz_is_exact(graph, path):
+    A = dense_adjacency(graph); u = graph.id_of("A"); beta = 0.1
+    e = np.zeros(len(A)); e[u] = 1.0
+    want = sum(beta ** l * np.linalg.matrix_power(A, l) @ e for l in (1, 2, 3))
+    assert to_dense(katz_from(graph, u, beta, 3), len(A)) == pytest.approx(want, rel=1e-12, abs=1e-15)
+    check_path(graph, path)
+
+def test_resource_allocation_is_exact(graph, path):
+    A = dense_adjacency(graph); u = graph.id_of("A")
+    want = A @ (A[u] / np.maximum(A.sum(axis=1), 1))
+    assert to_dense(resource_allocation_from(graph, u), len(A)) == pytest.approx(want, rel=1e-12, abs=1e-15)
+    check_path(graph, path)
+
+def test_personalized_pagerank_converges(graph, path):
+    A = dense_adjacency(graph); u = graph.id_of("D"); alpha = 0.15; deg = A.sum(axis=1)
+    W = A / np.where(deg > 0, deg, 1)[None, :]  # column-stochastic over authors with co-authors
+    e = np.zeros(len(A)); e[u] = 1.0
+    want = alpha * np.linalg.solve(np.eye(len(A)) - (1 - alpha) * W, e)
+    assert to_dense(personalized_pagerank(graph, u, alpha, eps=1e-12, max_rounds=2000), len(A)) == pytest.approx(want, abs=1e-9)
+    got = to_dense(personalized_pagerank(graph, u, alpha, eps=1e-4, max_rounds=2000), len(A))
+    assert np.abs(got - want).sum() <= 1e-4 * deg.sum()  # the residual left behind is below eps * degree per node
+    assert to_dense(personalized_pagerank(graph, graph.id_of("Z")), len(A)).sum() == 0  # no co-authors, nothing to rank
+    check_path(graph, path)
+
+def test_zero_path_weights_leave_rankings_unchanged(synth_csv):
+    res = ingest_csv(synth_csv, *COLUMNS, 2015, max_rows=None, as_csr=True)
+    adj, nodes, journals, _ = reference.build_graph_and_journals(synth_csv, *COLUMNS, 2015, 10 ** 9)
+    for t in random.Random(5).sample(sorted(nodes), 10):
+        feats = target_features(res.adj, res.author_journals, res.adj.id_of(t), False)
+        got = rank_features(res.adj, res.author_journals, feats, 10 ** 6, 0.5, 0.3, 0.2, None, 0.0, 0.0, 0.0)
+        assert feats.raw == {}  # Katz and PPR are not even computed
+        assert got == recommend(res.adj, res.author_journals, t, 10 ** 6, False, 0.5, 0.3, 0.2)
+        want = reference.recommend(adj, journals, t, 10 ** 6, False, 0.5, 0.3, 0.2)
+        assert {r[0]: r[1] for r in got} == pytest.approx({r[0]: r[1] for r in want})
@@ -0,0 +1,72 @@
+# test_service.py
+import asyncio, threading
+from concurrent import futures
+import pytest
+from conftest import COLUMNS
+from graph_builder import ingest_csv
+from recommender import DEFAULT_WEIGHTS
+import service
+from name_index import NameIndex
+from service import RecommendClient, RecommendService, ResultCache, serve
+
+PAPERS = [("p1", "Ann Lee;Bob Stone", "2020", "J1"), ("p2", "Bob Stone;Cat Wu", "2020", "J1"), ("p3", "Cat Wu;Dan Roe", "2020", "J2"),
+          ("p4", "Ann Lee;Eve Fox", "2020", "J2"), ("p5", "Eve Fox;Dan Roe", "2020", "J2"), ("p6", "Ann Lee;Cat Wu", "2019", "J2")]
+
+@pytest.fixture
+def graph(write_csv):
+    return ingest_csv(write_csv(PAPERS), *COLUMNS, 2020, max_rows=None, as_csr=True)
+
+@pytest.fixture
+def client(graph):
+    """A RecommendClient talking to a service on an ephemeral port, served from a background event loop."""
+    svc = RecommendService(graph, ResultCache(), workers=2); loop = asyncio.new_event_loop(); ready = threading.Event(); port = []
+    thread = threading.Thread(target=loop.run_forever, daemon=True); thread.start()
+    task = asyncio.run_coroutine_threadsafe(serve(svc, "127.0.0.1", 0, lambda srv: (port.append(srv.sockets[0].getsockname()[1]), ready.set())), loop)
+    assert ready.wait(10)
+    yield RecommendClient(f"http://127.0.0.1:{port[0]}", timeout=10), svc, loop
+    task.cancel(); futures.wait([task], 10)
+    loop.call_soon_threadsafe(loop.stop); thread.join(10); loop.close(); svc.pool.shutdown()
+
+def test_result_cache_hits_and_eviction():
+    cache = ResultCache(max_bytes=10, max_entries=2)
+    assert cache.get("a") is None
+    cache.put("a", b"1234"); cache.put("b", b"5678")
+    assert cache.get("a") == b"1234"  # a is now the most recently used
+    cache.put("c", b"9")
+    assert cache.get("b") is None and cache.get("c") == b"9" and cache.evictions == 1
+    cache.put("d", b"123456")  # over max_bytes: evicts from the LRU end until it fits
+    assert list(cache.entries) == ["c", "d"] and cache.bytes == 7 and cache.evictions == 2
+    cache.put("e", b"x" * 11)  # larger than the whole cache: not stored
+    assert "e" not in cache.entries
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+def test_equivalent_queries_share_a_cache_entry(graph):
+    svc = RecommendService(graph, ResultCache(), workers=1)
+    async def run():
+        first = await svc.recommend({"target": "ann lee", "weights": ",".join(map(str, DEFAULT_WEIGHTS)), "journals": "J2; j1 ;", "topk": "5"})
+        again = await svc.recommend({"target": "Ann Lee", "weights": list(DEFAULT_WEIGHTS), "journals": ["j1", "J2"], "topk": 5})
+        other = await svc.recommend({"target": "Ann Lee", "topk": 5, "include_neighbors": "true"})
+        return first, again, other
+    first, again, other = asyncio.run(run()); svc.pool.shutdown()
+    assert first == again and other != first
+    assert (svc.cache.hits, svc.cache.misses, len(svc.cache.entries)) == (1, 2, 2)
+
+def test_http_endpoints(client):
+    cl, svc, _ = client
+    target, recs = cl.recommend("ann", topk=5)
+    assert target == "Ann Lee" and [r[0] for r in recs] == ["Dan Roe"] and recs[0][3] == 2
+    assert cl.recommend("Ann Lee", topk=5) == (target, recs)
+    assert cl.suggest("dan") == ["Dan Roe"]
+    stats = cl.stats()
+    assert stats["queries"] == 2 and stats["result_cache"]["hits"] == 1 and stats["graph"]["nodes"] == 5
+    with pytest.raises(RuntimeError, match="unknown path"): cl._call("/nope")
+    with pytest.raises(RuntimeError, match="weights"): cl._call("/recommend", {"target": "Ann Lee", "weights": [1, 2]})
+
+def test_lookups_run_off_the_event_loop(client, monkeypatch):
+    cl, _, loop = client; threads = []
+    pick, suggest = service.pick_target, NameIndex.suggest
+    monkeypatch.setattr(service, "pick_target", lambda *a: threads.append(threading.current_thread()) or pick(*a))
+    monkeypatch.setattr(NameIndex, "suggest", lambda *a: threads.append(threading.current_thread()) or suggest(*a))
+    cl.recommend("Ann Lee"); cl.suggest("ann")
+    loop_thread = [t for t in threading.enumerate() if t.ident == loop._thread_id]
+    assert len(threads) == 2 and loop_thread and loop_thread[0] not in threads
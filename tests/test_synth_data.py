@@ -0,0 +1,15 @@
+# test_synth_data.py
+import os
+from synth_data import dataset_path, ensure_dataset
+
+def test_datasets_are_cached_per_generator_arguments(tmp_path):
+    d = str(tmp_path)
+    plain = ensure_dataset(d, 300, seed=1)
+    assert plain == dataset_path(d, 300, 1) and os.path.basename(plain) == "synth_300_s1.csv"
+    small = ensure_dataset(d, 300, seed=1, max_team=5)
+    wide = ensure_dataset(d, 300, seed=1, max_team=5, num_venues=3)
+    assert len({plain, small, wide}) == 3 and dataset_path(d, 300, 1, num_venues=3, max_team=5) == wide
+    with open(small, encoding="utf-8") as f:
+        assert max(len(line.split(",")[1].split(";")) for line in list(f)[1:]) <= 5
+    mtime = os.stat(small).st_mtime_ns
+    assert ensure_dataset(d, 300, seed=1, max_team=5) == small and os.stat(small).st_mtime_ns == mtime  # reused, not regenerated
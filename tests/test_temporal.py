@@ -0,0 +1,56 @@
+# test_temporal.py
+import numpy as np
+import pytest
+from conftest import COLUMNS
+from graph_builder import ingest_csv
+from graph_cache import GraphCache
+from scoring import score_candidates
+from temporal import build_year_layers, cached_year_layers
+
+def assert_same_graph(a, b):
+    assert a.adj.names.to_list() == b.adj.names.to_list()
+    for x, y in ((a.adj.indptr, b.adj.indptr), (a.adj.indices, b.adj.indices), (a.adj.weights, b.adj.weights),
+                 (a.author_journals.indptr, b.author_journals.indptr), (a.author_journals.indices, b.author_journals.indices)):
+        assert np.array_equal(x, y)
+    assert a.author_journals.journals.to_list() == b.author_journals.journals.to_list()
+    assert a.used_rows == b.used_rows
+
+@pytest.mark.parametrize("year", [1989, 1995, 2010, 2023])
+def test_as_of_matches_ingest(synth_csv, year):
+    layers = build_year_layers(synth_csv, *COLUMNS, chunksize=500)
+    assert_same_graph(layers.as_of(year), ingest_csv(synth_csv, *COLUMNS, year, max_rows=None, chunksize=500, as_csr=True))
+
+def test_years_beyond_int16_get_their_own_layer(write_csv):
+    path = write_csv([("p1", "A;B", "2020", "J"), ("p2", "B;C", "99999", "J"), ("p3", "C;D", "40000", "J"), ("p4", "D;E", "", "J")])
+    layers = build_year_layers(path, *COLUMNS)
+    assert layers.years.tolist() == [2020, 40000, 99999]
+    for year in (2020, 40000, 99999):
+        assert_same_graph(layers.as_of(year), ingest_csv(path, *COLUMNS, year, max_rows=None, as_csr=True))
+    assert sorted(layers.as_of(2020).adj) == ["A", "B"]
+    assert layers.window(40000, 99999).adj.num_edges == 2
+
+def test_cached_layers_match_a_fresh_build(synth_csv, tmp_path):
+    cache = GraphCache(str(tmp_path / "cache"))
+    built, hit = cached_year_layers(cache, synth_csv, *COLUMNS, chunksize=500)
+    assert not hit
+    loaded, hit = cached_year_layers(cache, synth_csv, *COLUMNS, chunksize=500)
+    assert hit and isinstance(loaded.edge_pair, np.memmap)
+    assert loaded.year_counts == built.year_counts and loaded.split_year(0.8) == built.split_year(0.8)
+    for year in (1995, 2010, None):
+        assert_same_graph(loaded.as_of(year), built.as_of(year))
+    assert_same_graph(loaded.window(2000, 2010), built.window(2000, 2010))
+    assert cache.load(cache.key_for_layers(synth_csv, *COLUMNS)) is None
+    assert cache.invalidate(synth_csv) == 1
+
+def test_half_life_weights_recent_common_neighbors(write_csv):
+    path = write_csv([("p1", "T;A", "2020", "J"), ("p2", "T;B", "2000", "J"), ("p3", "A;C", "2020", "J"), ("p4", "B;D", "2020", "J")])
+    layers = build_year_layers(path, *COLUMNS)
+    def cn(res):
+        graph, journals = res.adj, res.author_journals
+        s = score_candidates(graph, journals, graph.id_of("T"), False)
+        return dict(zip((graph.names[i] for i in s.ids.tolist()), s.cn.tolist()))
+    plain = layers.as_of(2020)
+    assert not plain.adj.fractional_links and cn(plain) == {"C": 1, "D": 1}
+    decayed = layers.as_of(2020, half_life=2.0)
+    assert decayed.adj.fractional_links
+    assert cn(decayed) == pytest.approx({"C": 1.0, "D": 0.5 ** 10})